@@ -0,0 +1,424 @@
+import argparse
+import ast
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shlex
+import statistics
+import sys
+import time
+from queue import Empty
+
+from PIL import Image
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import get_path
+from src.config import QUALITY_TIERS
+
+PERMUTATIONS_DIR = get_path("examples/permutations")
+DEFAULT_BASELINE = get_path("benchmarks/baseline.json")
+DEFAULT_REPORT = get_path("benchmarks/REPORT.md")
+DEFAULT_OUT_DIR = get_path("benchmarks/out")
+
+# Small fixed language subset so each flag can be measured on its own without
+# --sine_delay exploding the frame count.
+ISOLATION_BASE = "--text Hello --languages en es fr de it pt ru ja"
+ISOLATION_FLAGS = {
+    "--use_icons": "--use_icons",
+    "--smart_color": "--smart_color",
+    "--rainbow": "--rainbow",
+    "--use_flag_colors": "--use_flag_colors",
+    "--sine_delay": "--sine_delay 1000 --delay 100",
+}
+
+# Options that have no permutation script, on the same language subset
+FEATURE_SCENARIOS = {
+    "multi_size": "--use_icons --size 256,256 512,512 1024,256",
+    "multi_size_shared": "--use_icons --size 256,256 512,512 1024,256 --share_palettes",
+    "rainbow_steps": "--use_icons --rainbow --rainbow_steps 5",
+}
+
+# Scenarios that call src.api instead of create_gif: (function, extra flags).
+# render_arrays writes no GIF, so its output bytes are the arrays' size.
+API_SCENARIOS = {
+    "api_gifs": ("render_gifs", "--use_icons"),
+    "api_arrays": ("render_arrays", "--use_icons"),
+}
+
+METRICS = ["wall_s", "cpu_s", "peak_rss_mb", "frames", "output_bytes"]
+
+# Seconds a single run may take before it is killed and recorded as failed
+DEFAULT_TIMEOUT = 600
+
+
+def _read_permutation_cmd(path):
+    """Pull the `cmd = '...'` string literal out of a permutation script."""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant):
+            targets = [t.id for t in node.targets if isinstance(t, ast.Name)]
+            if "cmd" in targets and isinstance(node.value.value, str):
+                return node.value.value
+    return None
+
+
+def _strip_gif_path(argv):
+    """Drop any --gif_path so the runner decides where outputs go."""
+    res = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        if arg == "--gif_path":
+            skip = True
+            continue
+        if arg.startswith("--gif_path="):
+            continue
+        res.append(arg)
+    return res
+
+
+def load_scenarios(include_isolation=True):
+    """Returns an ordered {name: argv} mapping of every benchmark scenario."""
+    scenarios = {}
+    for filename in sorted(os.listdir(PERMUTATIONS_DIR)):
+        if not filename.endswith(".py"):
+            continue
+        cmd = _read_permutation_cmd(os.path.join(PERMUTATIONS_DIR, filename))
+        if not cmd:
+            continue
+        argv = shlex.split(cmd)
+        # Drop the interpreter and script path, keep only the CLI flags
+        while argv and not argv[0].startswith("--"):
+            argv.pop(0)
+        scenarios[filename[:-3]] = _strip_gif_path(argv)
+
+    if include_isolation:
+        scenarios["isolate_base"] = shlex.split(ISOLATION_BASE)
+        for flag, extra in ISOLATION_FLAGS.items():
+            name = "isolate_" + flag.lstrip("-")
+            scenarios[name] = shlex.split(ISOLATION_BASE) + shlex.split(extra)
+    for name, extra in FEATURE_SCENARIOS.items():
+        scenarios[name] = shlex.split(ISOLATION_BASE) + shlex.split(extra)
+    for name, (_, extra) in API_SCENARIOS.items():
+        scenarios[name] = shlex.split(ISOLATION_BASE) + shlex.split(extra)
+    return scenarios
+
+
+def with_quality(scenarios, tiers):
+    """Every scenario once per quality tier; non-standard names get "@tier"."""
+    expanded = {}
+    for tier in tiers:
+        for name, argv in scenarios.items():
+            key = name if tier == "standard" else f"{name}@{tier}"
+            expanded[key] = argv + ["--quality", tier]
+    return expanded
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes everywhere else
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _run_scenario(argv, gif_path, seed, queue, entry="create_gif"):
+    """Child process body: render one scenario in-process and report metrics.
+
+    entry is create_gif or the name of a src.api function (API_SCENARIOS).
+    """
+    from src import api
+    from src.mr_worldwide import build_parser, create_gif
+    from src.render_plan import sized_path
+
+    params = build_parser().parse_args(argv + ["--gif_path", gif_path])
+    random.seed(seed)
+    if entry == "create_gif":
+        run = lambda: create_gif(params)
+    else:
+        config = api.RenderConfig.from_args(params)
+        run = lambda: getattr(api, entry)(config)
+
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            out = run()
+            cpu_s = time.process_time() - cpu_start
+            wall_s = time.perf_counter() - wall_start
+
+    if entry == "render_arrays":
+        arrays, info = out
+        frames = len(info) * len(arrays)
+        output_bytes = sum(array.nbytes for array in arrays.values())
+    elif entry == "render_gifs":
+        frames = 0
+        output_bytes = 0
+        for size, buffer in out.items():
+            frames += Image.open(buffer).n_frames
+            output_bytes += len(buffer.getvalue())
+    else:
+        gif_paths = [gif_path]
+        if isinstance(out, dict):
+            # Several --size values write one GIF each
+            gif_paths = [sized_path(gif_path, size) for size in out]
+            out = [frame for size_frames in out.values() for frame in size_frames]
+        frames = len(out) if out else 0
+        output_bytes = sum(
+            os.path.getsize(path) for path in gif_paths if os.path.exists(path)
+        )
+
+    queue.put(
+        {
+            "wall_s": wall_s,
+            "cpu_s": cpu_s,
+            "peak_rss_mb": _peak_rss_mb(),
+            "frames": frames,
+            "output_bytes": output_bytes,
+        }
+    )
+
+
+def _collect(proc, queue, timeout):
+    """(metrics, None) from a child, or (None, error) if it died or timed out."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return queue.get(timeout=1), None
+        except Empty:
+            pass
+        if not proc.is_alive():
+            # The result may have been sent just before the child exited
+            try:
+                return queue.get(timeout=1), None
+            except Empty:
+                return None, f"exited with code {proc.exitcode}"
+        if time.monotonic() > deadline:
+            proc.terminate()
+            return None, f"timed out after {timeout}s"
+
+
+def measure(name, argv, out_dir, repeat=1, seed=0, timeout=DEFAULT_TIMEOUT):
+    """Runs a scenario `repeat` times, each in a fresh process, and keeps the median.
+
+    A run that crashes, is killed (e.g. by the OOM killer) or exceeds timeout
+    seconds fails the scenario: every metric is None and "error" says why.
+    """
+    ctx = multiprocessing.get_context()
+    gif_path = os.path.join(out_dir, f"{name}.gif")
+    entry = API_SCENARIOS.get(name.split("@")[0], ("create_gif",))[0]
+    runs = []
+    for _ in range(repeat):
+        queue = ctx.Queue()
+        proc = ctx.Process(
+            target=_run_scenario, args=(argv, gif_path, seed, queue, entry)
+        )
+        proc.start()
+        result, error = _collect(proc, queue, timeout)
+        proc.join()
+        if error is None and proc.exitcode != 0:
+            error = f"exited with code {proc.exitcode}"
+        if error is not None:
+            res = {metric: None for metric in METRICS}
+            res["error"] = error
+            return res
+        runs.append(result)
+
+    res = {}
+    for metric in METRICS:
+        values = [r[metric] for r in runs]
+        res[metric] = round(statistics.median(values), 4)
+    return res
+
+
+def _fmt(metric, value):
+    if value is None:
+        return "-"
+    if metric in ("wall_s", "cpu_s"):
+        return f"{value:.2f}"
+    if metric == "peak_rss_mb":
+        return f"{value:.1f}"
+    return str(int(value))
+
+
+def _ratio(current, base):
+    if not base:
+        return "-"
+    return f"{current / base:.2f}x"
+
+
+def write_report(results, baseline, scenarios, report_path, threshold):
+    lines = ["# Benchmark Matrix", ""]
+    lines.append(
+        "Each scenario runs in-process in a fresh worker. "
+        "Ratios compare against `benchmarks/baseline.json`."
+    )
+    lines.append("")
+    lines.append(
+        "| Scenario | Wall (s) | vs base | CPU (s) | Peak RSS (MB) | Frames | Output bytes |"
+    )
+    lines.append("| :--- | ---: | ---: | ---: | ---: | ---: | ---: |")
+
+    regressions = []
+    failures = []
+    for name, res in results.items():
+        if res.get("error"):
+            failures.append(name)
+            lines.append(f"| {name} | - | failed: {res['error']} | - | - | - | - |")
+            continue
+        base = baseline.get(name, {})
+        ratio = _ratio(res["wall_s"], base.get("wall_s"))
+        if base.get("wall_s") and res["wall_s"] > base["wall_s"] * (1 + threshold):
+            regressions.append(name)
+            ratio += " ⚠"
+        lines.append(
+            f"| {name} | {_fmt('wall_s', res['wall_s'])} | {ratio} "
+            f"| {_fmt('cpu_s', res['cpu_s'])} | {_fmt('peak_rss_mb', res['peak_rss_mb'])} "
+            f"| {_fmt('frames', res['frames'])} | {_fmt('output_bytes', res['output_bytes'])} |"
+        )
+
+    if results.get("isolate_base", {}).get("wall_s") is not None:
+        base_wall = results["isolate_base"]["wall_s"]
+        lines += ["", "## Flag Cost", ""]
+        lines.append(f"Added on top of `{ISOLATION_BASE}`.")
+        lines.append("")
+        lines.append("| Flag | Wall (s) | Added (s) | Relative |")
+        lines.append("| :--- | ---: | ---: | ---: |")
+        for flag in ISOLATION_FLAGS:
+            name = "isolate_" + flag.lstrip("-")
+            if results.get(name, {}).get("wall_s") is None:
+                continue
+            wall = results[name]["wall_s"]
+            lines.append(
+                f"| `{flag}` | {wall:.2f} | {wall - base_wall:+.2f} | {_ratio(wall, base_wall)} |"
+            )
+
+    tiers = [t for t in QUALITY_TIERS if t != "standard"]
+    tiered = [
+        n
+        for n in results
+        if results[n]["wall_s"] is not None
+        and any(f"{n}@{t}" in results for t in tiers)
+    ]
+    if tiered:
+        lines += ["", "## Quality Tiers", ""]
+        lines.append("Wall time per `--quality` tier; ratios are standard / tier.")
+        lines.append("")
+        lines.append(
+            "| Scenario | standard (s) | "
+            + " | ".join(f"{t} (s) | {t} speedup" for t in tiers)
+            + " |"
+        )
+        lines.append("| :--- | ---: |" + " ---: | ---: |" * len(tiers))
+        for name in tiered:
+            wall = results[name]["wall_s"]
+            cells = [f"{wall:.2f}"]
+            for tier in tiers:
+                res = results.get(f"{name}@{tier}")
+                tier_wall = res and res["wall_s"]
+                cells.append(_fmt("wall_s", tier_wall))
+                cells.append(_ratio(wall, tier_wall) if tier_wall else "-")
+            lines.append(f"| {name} | " + " | ".join(cells) + " |")
+
+    if regressions:
+        lines += [
+            "",
+            f"**Regressions (> {threshold:.0%} slower):** {', '.join(regressions)}",
+        ]
+    if failures:
+        lines += ["", f"**Failed:** {', '.join(failures)}"]
+
+    lines += ["", "## Scenario Arguments", ""]
+    for name in results:
+        lines.append(
+            f"- `{name}`: `{' '.join(shlex.quote(a) for a in scenarios[name])}`"
+        )
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return regressions, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the permutation scenarios")
+    parser.add_argument("--only", nargs="+", help="Run only these scenarios")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed per run")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--report", default=DEFAULT_REPORT)
+    parser.add_argument("--out_dir", default=DEFAULT_OUT_DIR)
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="Allowed slowdown vs baseline"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help="Seconds before a run is killed and recorded as failed",
+    )
+    parser.add_argument(
+        "--no_isolation", action="store_true", help="Skip the per-flag scenarios"
+    )
+    parser.add_argument(
+        "--quality",
+        nargs="+",
+        choices=list(QUALITY_TIERS),
+        default=["standard"],
+        help="Run every scenario at each of these quality tiers",
+    )
+    parser.add_argument(
+        "--update_baseline", action="store_true", help="Overwrite the baseline"
+    )
+    args = parser.parse_args()
+
+    scenarios = load_scenarios(include_isolation=not args.no_isolation)
+    if args.only:
+        scenarios = {k: v for k, v in scenarios.items() if k in args.only}
+    scenarios = with_quality(scenarios, args.quality)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    results = {}
+    for name, argv in scenarios.items():
+        print(f"Running {name}...", end=" ", flush=True)
+        results[name] = measure(
+            name, argv, args.out_dir, args.repeat, args.seed, args.timeout
+        )
+        if results[name].get("error"):
+            print(f"failed ({results[name]['error']})")
+        else:
+            print(f"{results[name]['wall_s']:.2f}s")
+
+    regressions, failures = write_report(
+        results, baseline, scenarios, args.report, args.threshold
+    )
+    print(f"Report written to {args.report}")
+
+    if args.update_baseline:
+        # A failed run says nothing about speed, so keep the old entry
+        baseline.update({k: v for k, v in results.items() if not v.get("error")})
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline updated at {args.baseline}")
+    elif regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+    if failures:
+        print(f"Failed: {', '.join(failures)}")
+    if failures or (regressions and not args.update_baseline):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,17 @@
 import os
 import re
+import sys
 import json
+import hashlib
+import argparse
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
 
 # Get the project root directory
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from src.flag_raster import flag_palette
 
 
 def get_path(path):
@@ -11,57 +19,74 @@ def get_path(path):
     return os.path.join(ROOT_DIR, path)
 
 
-def extract_colors_with_positions(svg_content):
-    # Find all tags that might have colors
-    tag_pattern = re.compile(r"<(path|rect|circle|polygon|ellipse|g)\s+([^>]+)>")
+OVERRIDES_PATH = get_path("flag_overrides.json")
+CACHE_PATH = get_path(".cache/flag_analysis.json")
+OUTPUT_PATH = get_path("flag_colors.json")
+# Bump when the analysis changes so cached results are recomputed
+ANALYSIS_VERSION = 2
+
+COLOR_TAGS = {"path", "rect", "circle", "polygon", "ellipse", "g"}
+NUMBER = re.compile(r"[-?0-9.]+$")
+PATH_START = re.compile(r"M\s*([-?0-9.]+)[,\s]([-?0-9.]+)")
+
+
+def _attr(attrib, suffix, pattern=None):
+    """First attribute (in document order) named *suffix whose value matches.
+
+    Returns the value, or the match object when a pattern is given. Suffix
+    matching keeps the results of the old regex scan, where e.g. x=" also
+    matched cx=" and width=" matched stroke-width=".
+    """
+    for name, value in attrib.items():
+        if not name.endswith(suffix) or not value:
+            continue
+        if pattern is None:
+            return value
+        match = pattern.match(value)
+        if match:
+            return match
+    return None
 
+
+def _number(attrib, suffix):
+    match = _attr(attrib, suffix, NUMBER)
+    return float(match.group(0)) if match else None
+
+
+def extract_colors_with_positions(source):
+    """Ordered fill colors of an SVG file, parsed as a stream of start tags."""
     color_positions = []
-    for tag_type, attrs in tag_pattern.findall(svg_content):
+    for _, elem in ET.iterparse(source, events=("start",)):
+        tag = elem.tag.rsplit("}", 1)[-1]
+        if tag not in COLOR_TAGS or not elem.attrib:
+            continue
+        attrib = elem.attrib
+
         # Extract color
-        color_match = re.search(r'fill="([^"]+)"', attrs)
-        if not color_match:
-            color_match = re.search(r'stroke="([^"]+)"', attrs)
-
-        if color_match:
-            color = color_match.group(1)
-            if color == "none":
-                continue
-
-            # Try to find a representative X and Y position
-            # We use the midpoint of bounding boxes if available
-            x_pos = 0.0
-            y_pos = 0.0
-
-            width = 0.0
-            height = 0.0
-
-            x_match = re.search(r'x="([-?0-9.]+)"', attrs)
-            w_match = re.search(r'width="([-?0-9.]+)"', attrs)
-            y_match = re.search(r'y="([-?0-9.]+)"', attrs)
-            h_match = re.search(r'height="([-?0-9.]+)"', attrs)
-
-            if x_match:
-                x_pos = float(x_match.group(1))
-            if w_match:
-                width = float(w_match.group(1))
-            if y_match:
-                y_pos = float(y_match.group(1))
-            if h_match:
-                height = float(h_match.group(1))
-
-            if not x_match or not y_match:
-                d_match = re.search(r'd="M\s*([-?0-9.]+)[,\s]([-?0-9.]+)', attrs)
-                if d_match:
-                    if not x_match:
-                        x_pos = float(d_match.group(1))
-                    if not y_match:
-                        y_pos = float(d_match.group(2))
-
-            # Centroid approximation
-            cx = x_pos + width / 2
-            cy = y_pos + height / 2
-
-            color_positions.append((cx, cy, color))
+        color = _attr(attrib, "fill") or _attr(attrib, "stroke")
+        if color is None or color == "none":
+            continue
+
+        # Try to find a representative X and Y position
+        # We use the midpoint of bounding boxes if available
+        x_pos = _number(attrib, "x")
+        y_pos = _number(attrib, "y")
+        width = _number(attrib, "width") or 0.0
+        height = _number(attrib, "height") or 0.0
+
+        if x_pos is None or y_pos is None:
+            d_match = _attr(attrib, "d", PATH_START)
+            if d_match:
+                if x_pos is None:
+                    x_pos = float(d_match.group(1))
+                if y_pos is None:
+                    y_pos = float(d_match.group(2))
+
+        # Centroid approximation
+        cx = (x_pos or 0.0) + width / 2
+        cy = (y_pos or 0.0) + height / 2
+
+        color_positions.append((cx, cy, color))
 
     # Determine if the flag is more vertical or horizontal based on centroid distribution
     if not color_positions:
@@ -98,56 +123,137 @@ def extract_colors_with_positions(svg_content):
     return ordered_colors
 
 
-def analyze_flags(banderas_dir):
+def analyze_file(path):
+    """Area-weighted palette of one flag, or [] if unreadable.
+
+    Falls back to the attribute-position heuristic for SVGs the rasterizer
+    cannot handle.
+    """
+    try:
+        colors = flag_palette(path)
+        if colors:
+            return colors
+    except Exception as e:
+        print(f"Could not rasterize {path}: {e}")
+    try:
+        colors = extract_colors_with_positions(path)
+    except ET.ParseError as e:
+        print(f"Could not parse {path}: {e}")
+        return []
+    # Remove duplicates while preserving order
+    unique_colors = []
+    for c in colors:
+        if c not in unique_colors:
+            unique_colors.append(c)
+    return unique_colors
+
+
+def load_json(path, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except:
+        return default
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def file_sha1(path):
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha1").hexdigest()
+
+
+def analyze_flags(banderas_dir, cache_path=CACHE_PATH, workers=None):
+    """{country: colors} for every SVG, re-analyzing only changed files.
+
+    The cache maps each filename to its size, mtime, content hash and colors.
+    Unchanged size and mtime skip even the hash; a new hash sends the file to a
+    process pool.
+    """
+    cache = load_json(cache_path, {})
+    overrides = load_json(OVERRIDES_PATH, {})
+
+    filenames = sorted(f for f in os.listdir(banderas_dir) if f.endswith(".svg"))
+    todo = []
+    for filename in filenames:
+        path = os.path.join(banderas_dir, filename)
+        st = os.stat(path)
+        entry = cache.get(filename)
+        if entry and entry.get("version") != ANALYSIS_VERSION:
+            entry = None
+        if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime:
+            continue
+        sha1 = file_sha1(path)
+        if entry and entry["sha1"] == sha1:
+            entry.update(size=st.st_size, mtime=st.st_mtime)
+            continue
+        cache[filename] = {
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "sha1": sha1,
+            "version": ANALYSIS_VERSION,
+        }
+        todo.append(filename)
+
+    if todo:
+        paths = [os.path.join(banderas_dir, f) for f in todo]
+        if len(todo) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(analyze_file, paths, chunksize=8))
+        else:
+            results = [analyze_file(p) for p in paths]
+        for filename, colors in zip(todo, results):
+            cache[filename]["colors"] = colors
+
+    for filename in list(cache):
+        if filename not in filenames:
+            del cache[filename]
+    write_json(cache_path, cache)
+
     flag_data = {}
-    # Manual overrides for accuracy on major flags
-    overrides = {
-        "France": ["#002654", "#FFFFFF", "#CE1126"],
-        "Germany": ["#000000", "#FF0000", "#FFCE00"],
-        "Italy": ["#009246", "#FFFFFF", "#CE2B37"],
-        "Spain": ["#AA151B", "#F1BF00", "#AA151B"],
-        "Russia": ["#FFFFFF", "#0039A6", "#D52B1E"],
-        "India": ["#FF9933", "#FFFFFF", "#128807"],
-        "Brazil": ["#009739", "#FEDF00", "#012169"],
-        "United_States": ["#B22234", "#FFFFFF", "#3C3B6E"],
-        "United_Kingdom": ["#012169", "#FFFFFF", "#C8102E"],
-        "Japan": ["#FFFFFF", "#BC002D", "#FFFFFF"],
-        "South_Korea": ["#FFFFFF", "#CD2E3A", "#0047A0", "#000000"],
-        "China": ["#DE2910", "#FFDE00"],
-        "Netherlands": ["#AE1C28", "#FFFFFF", "#21468B"],
-        "Belgium": ["#000000", "#FDDA24", "#EF3340"],
-        "Ireland": ["#169B62", "#FFFFFF", "#FF883E"],
-        "Republic_of_Ireland": ["#169B62", "#FFFFFF", "#FF883E"],
-        "Poland": ["#FFFFFF", "#DC143C"],
-        "Ukraine": ["#0057B7", "#FFD700"],
-        "Esperanto": ["#009900", "#FFFFFF"],
-    }
-
-    filenames = os.listdir(banderas_dir)
     for filename in filenames:
-        if filename.endswith(".svg"):
-            country = filename[:-4]
-            if country in overrides:
-                flag_data[country] = overrides[country]
-                continue
-
-            with open(os.path.join(banderas_dir, filename), "r") as f:
-                content = f.read()
-                colors = extract_colors_with_positions(content)
-                # Remove duplicates while preserving order
-                unique_colors = []
-                for c in colors:
-                    if c not in unique_colors:
-                        unique_colors.append(c)
-
-                if unique_colors:
-                    flag_data[country] = unique_colors
-    return flag_data
+        country = filename[:-4]
+        # Manual overrides for accuracy on major flags
+        colors = overrides.get(country) or cache[filename]["colors"]
+        if colors:
+            flag_data[country] = colors
+    return flag_data, len(todo)
+
+
+def merge_flag_colors(flag_data, output_path=OUTPUT_PATH):
+    """Update the output JSON in place, keeping existing key order.
+
+    Returns the number of countries added, changed or removed; the file is only
+    rewritten when that is non-zero.
+    """
+    current = load_json(output_path, {})
+    merged = {k: flag_data[k] for k in current if k in flag_data}
+    merged.update(flag_data)
+    changes = sum(current.get(k) != v for k, v in merged.items())
+    changes += sum(k not in merged for k in current)
+    if changes:
+        write_json(output_path, merged)
+    return changes
 
 
 if __name__ == "__main__":
-    banderas_dir = get_path("banderas")
-    data = analyze_flags(banderas_dir)
-    with open(get_path("flag_colors.json"), "w") as f:
-        json.dump(data, f, indent=2)
-    print(f"Analyzed {len(data)} flags.")
+    parser = argparse.ArgumentParser(description="Extract flag colors from SVGs")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--rebuild", action="store_true", help="Ignore the per-SVG analysis cache"
+    )
+    args = parser.parse_args()
+
+    if args.rebuild and os.path.exists(CACHE_PATH):
+        os.remove(CACHE_PATH)
+    data, analyzed = analyze_flags(get_path("banderas"), workers=args.workers)
+    changes = merge_flag_colors(data)
+    print(
+        f"Analyzed {analyzed} changed flags, {len(data)} total; "
+        f"{changes} entries updated in flag_colors.json."
+    )
@@ -0,0 +1,170 @@
+import io
+import os
+import json
+from typing import NamedTuple
+import numpy as np
+from PIL import Image
+from src.render_config import RenderConfig, Size
+from src.render_plan import (
+    compile_plan,
+    encode_plan,
+    frame_shape,
+    frame_steps,
+    plan_sizes,
+    render_frames,
+    render_into,
+)
+
+__all__ = [
+    "RenderConfig",
+    "Frame",
+    "FrameInfo",
+    "iter_frames",
+    "render_gifs",
+    "render_gif",
+    "render_arrays",
+    "render_array",
+]
+
+
+class Frame(NamedTuple):
+    """One rendered translation; images holds it at every size of the config.
+
+    duration is the frame's delay in ms. With rainbow_steps a translation is
+    config.steps frames, numbered by step, whose durations are
+    config.step_durations and add up to config.delay. --sine_delay style
+    repetition only happens when a GIF is encoded, so it is not reflected here.
+    """
+
+    index: int
+    lang: str
+    text: str
+    duration: int
+    images: dict[Size, Image.Image]
+    step: int = 0
+
+
+class FrameInfo(NamedTuple):
+    """Metadata of one slot of the arrays from render_arrays()."""
+
+    index: int
+    lang: str
+    text: str
+    duration: int
+    step: int = 0
+
+
+def iter_frames(config):
+    """Lazily render config, yielding a Frame per output frame in order.
+
+    Nothing is printed or written to disk (an unreadable asset pack is
+    reported through logging); backgrounds are still loaded config.prefetch
+    frames ahead of the one being yielded.
+    """
+    plan = compile_plan(config)
+    sizes = plan_sizes(plan)
+    rendered = render_frames(plan, prefetch=config.prefetch)
+    for (entry, step), images in zip(frame_steps(plan), rendered):
+        yield Frame(
+            entry["index"],
+            entry["lang"],
+            entry["text"],
+            config.step_durations[step],
+            dict(zip(sizes, images)),
+            step,
+        )
+
+
+def render_gifs(config):
+    """{size: BytesIO} with the encoded GIF of every size of config.
+
+    Each buffer is rewound and ready to read. Returns {} when none of the
+    texts could be rendered.
+    """
+    plan = compile_plan(config)
+    sizes = plan_sizes(plan)
+    frames = {size: [] for size in sizes}
+    for images in render_frames(plan, prefetch=config.prefetch):
+        for size, image in zip(sizes, images):
+            frames[size].append(image)
+    if not plan["frames"]:
+        return {}
+
+    outputs = {size: io.BytesIO() for size in sizes}
+    encode_plan(plan, frames, outputs)
+    for output in outputs.values():
+        output.seek(0)
+    return outputs
+
+
+def render_gif(config):
+    """The encoded GIF of a single-size config as a BytesIO, or None."""
+    if len(config.sizes) != 1:
+        raise ValueError("render_gif takes a single size, use render_gifs")
+    return render_gifs(config).get(tuple(config.sizes[0]))
+
+
+def metadata_path(npy_path):
+    """frames.npy -> frames.json"""
+    return os.path.splitext(npy_path)[0] + ".json"
+
+
+def render_arrays(config, out=None, paths=None):
+    """Render config into (frames, height, width, 3) uint8 arrays, one per size.
+
+    out maps sizes to preallocated arrays (for example views into a larger
+    buffer) and paths maps sizes to .npy files, which are created
+    memory-mapped with the frame metadata written next to them as JSON
+    (metadata_path()). Other sizes get a new array. Every frame is rendered
+    straight into its slot. Returns ({size: array}, [FrameInfo]).
+    """
+    out = dict(out or {})
+    paths = paths or {}
+    plan = compile_plan(config)
+    sizes = plan_sizes(plan)
+    info = [
+        FrameInfo(
+            entry["index"],
+            entry["lang"],
+            entry["text"],
+            config.step_durations[step],
+            step,
+        )
+        for entry, step in frame_steps(plan)
+    ]
+
+    for size in sizes:
+        if size in out:
+            continue
+        shape = frame_shape(plan, size)
+        if size in paths:
+            out[size] = np.lib.format.open_memmap(
+                paths[size], mode="w+", dtype=np.uint8, shape=shape
+            )
+            with open(metadata_path(paths[size]), "w", encoding="utf-8") as f:
+                json.dump(
+                    {"size": list(size), "frames": [i._asdict() for i in info]},
+                    f,
+                    ensure_ascii=False,
+                )
+        else:
+            out[size] = np.empty(shape, np.uint8)
+
+    render_into(plan, out, prefetch=config.prefetch)
+    for array in out.values():
+        if isinstance(array, np.memmap):
+            array.flush()
+    return {size: out[size] for size in sizes}, info
+
+
+def render_array(config, out=None, path=None):
+    """render_arrays() for a single-size config: (array, [FrameInfo])."""
+    if len(config.sizes) != 1:
+        raise ValueError("render_array takes a single size, use render_arrays")
+    size = tuple(config.sizes[0])
+    arrays, info = render_arrays(
+        config,
+        out={size: out} if out is not None else None,
+        paths={size: path} if path is not None else None,
+    )
+    return arrays[size], info
@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import get_path
+from src.languages import get_registry
+from src.asset_index import AssetIndex, ASSET_DIRS
+
+REPORT_PATH = get_path(".cache/asset_audit.json")
+TRANSLATIONS_PATH = get_path("translations.json")
+# Anything smaller on either side cannot fill a frame
+MIN_DIMENSION = 100
+DUMMY_PREFIX = "dummy_"
+
+
+def inspect_image(path, verify=False):
+    """Returns (width, height, error) for one image.
+
+    Only the header is parsed unless verify is set, in which case the whole
+    image is decoded.
+    """
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            if verify:
+                img.load()
+        return width, height, None
+    except Exception as e:
+        return None, None, str(e) or type(e).__name__
+
+
+def _inspect(args):
+    return inspect_image(*args)
+
+
+def is_dummy(rel_path):
+    return rel_path.rsplit("/", 1)[-1].startswith(DUMMY_PREFIX)
+
+
+def inspect_all(index, rel_paths, verify=False, workers=None):
+    """{rel_path: (width, height, error)} for every path.
+
+    Dimensions and passing decodes are stored in the index, so unchanged files
+    are not opened again; only the rest go to a process pool. With verify,
+    files without a recorded successful decode are fully decoded.
+    """
+    results = {}
+    todo = []
+    for rel_path in rel_paths:
+        entry = index.entries.get(rel_path, {})
+        if "width" in entry and (entry.get("valid") or not verify):
+            results[rel_path] = (entry["width"], entry["height"], None)
+        else:
+            todo.append(rel_path)
+
+    jobs = [(index.abs(p), verify) for p in todo]
+    if len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            inspected = list(pool.map(_inspect, jobs, chunksize=16))
+    else:
+        inspected = [_inspect(job) for job in jobs]
+
+    for rel_path, (width, height, error) in zip(todo, inspected):
+        results[rel_path] = (width, height, error)
+        if error is None:
+            fields = {"width": width, "height": height}
+            if verify:
+                fields["valid"] = True
+            index.annotate(rel_path, **fields)
+    return results
+
+
+def load_translations(path=TRANSLATIONS_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error loading {path}: {e}")
+        return {}
+
+
+def string_deficits(word, translations, usable_counts):
+    """Images each translated string is still short of, per country.
+
+    Languages that share a string each need their own image, so a string used
+    by three languages of one country needs three images in that folder.
+    """
+    string_groups = {}
+    for lang, text in translations.items():
+        string_groups.setdefault(text, []).append(lang)
+
+    deficits = []
+    for text, langs in string_groups.items():
+        needed = {}
+        for lang in langs:
+            country = get_registry().country(lang, "global")
+            needed[country] = needed.get(country, 0) + 1
+        missing = {
+            country: count - usable_counts.get(country, 0)
+            for country, count in needed.items()
+            if usable_counts.get(country, 0) < count
+        }
+        if missing:
+            deficits.append(
+                {"word": word, "text": text, "languages": langs, "missing": missing}
+            )
+    return deficits
+
+
+def audit_assets(
+    index=None,
+    verify=False,
+    workers=None,
+    min_dimension=MIN_DIMENSION,
+    translations=None,
+):
+    """Audit both asset trees in one pass and return a JSON-ready report.
+
+    The trees are walked once (through the asset index) and every image header
+    is read once; coverage is then computed from those results against
+    translations.json. Corrupt files and dummy placeholders do not count
+    towards coverage.
+    """
+    index = index or AssetIndex.load()
+    if translations is None:
+        translations = load_translations()
+
+    rel_paths = [p for d in ASSET_DIRS for p in index.files(d)]
+    images = inspect_all(index, rel_paths, verify=verify, workers=workers)
+
+    corrupt = []
+    undersized = []
+    dummies = []
+    usable = {assets_dir: {} for assets_dir in ASSET_DIRS}
+    for rel_path in rel_paths:
+        assets_dir, country, _ = index.split(rel_path)
+        width, height, error = images[rel_path]
+        if error is not None:
+            corrupt.append({"path": rel_path, "error": error})
+            continue
+        if width < min_dimension or height < min_dimension:
+            undersized.append({"path": rel_path, "width": width, "height": height})
+        if is_dummy(rel_path):
+            dummies.append(rel_path)
+            continue
+        counts = usable[assets_dir]
+        counts[country] = counts.get(country, 0) + 1
+
+    registry = get_registry()
+    all_countries = registry.countries()
+    missing_countries = {}
+    for assets_dir in ASSET_DIRS:
+        missing = {}
+        for country in all_countries:
+            if not os.path.isdir(index.abs(f"{assets_dir}/{country}")):
+                missing[country] = "missing"
+            elif not usable[assets_dir].get(country):
+                missing[country] = "empty"
+        missing_countries[assets_dir] = missing
+
+    used_countries = {
+        registry.country(lang, "global")
+        for word_translations in translations.values()
+        for lang in word_translations
+    }
+
+    deficits = []
+    for word, word_translations in translations.items():
+        assets_dir = f"{word}_assets"
+        if assets_dir in usable:
+            deficits += string_deficits(word, word_translations, usable[assets_dir])
+
+    index.save()
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "verified": verify,
+        "summary": {
+            "files": len(rel_paths),
+            "corrupt": len(corrupt),
+            "undersized": len(undersized),
+            "dummies": len(dummies),
+            "missing_countries": sum(len(m) for m in missing_countries.values()),
+            "deficits": len(deficits),
+        },
+        "usable": usable,
+        "corrupt": corrupt,
+        "undersized": undersized,
+        "dummies": dummies,
+        "missing_countries": missing_countries,
+        "unused_countries": sorted(set(all_countries) - used_countries),
+        "deficits": deficits,
+    }
+
+
+def write_report(report, path=REPORT_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Audit background assets and their coverage of translations.json"
+    )
+    parser.add_argument(
+        "--verify", action="store_true", help="Fully decode images not yet verified"
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--min_dimension", type=int, default=MIN_DIMENSION)
+    parser.add_argument(
+        "--output", default=REPORT_PATH, help="Where to write the report"
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Print the report to stdout as JSON"
+    )
+    args = parser.parse_args()
+
+    report = audit_assets(
+        verify=args.verify, workers=args.workers, min_dimension=args.min_dimension
+    )
+    write_report(report, args.output)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    summary = report["summary"]
+    print(
+        f"Audited {summary['files']} files: {summary['corrupt']} corrupt, "
+        f"{summary['undersized']} undersized, {summary['dummies']} dummies, "
+        f"{summary['missing_countries']} missing countries, "
+        f"{summary['deficits']} strings short of images."
+    )
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import os
+import sys
+import json
+import hashlib
+import threading
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import get_path, ROOT_DIR
+
+INDEX_PATH = get_path(".cache/asset_index.json")
+ASSET_DIRS = ["hello_assets", "love_assets"]
+
+
+def file_sha1(path):
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha1").hexdigest()
+
+
+class AssetIndex:
+    """Persistent index of every background asset, its photo ID and content hash.
+
+    Entries are keyed by path relative to the project root, e.g.
+    "hello_assets/france/224756.jpeg". Loading reconciles the index with the disk
+    using one directory scan and only re-hashes files whose size or mtime changed.
+    """
+
+    def __init__(self, path=INDEX_PATH, root=ROOT_DIR):
+        self.path = path
+        self.root = root
+        self.entries = {}
+        self.names = {}
+        self.folders = {}
+        self.hashes = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path=INDEX_PATH, root=ROOT_DIR, refresh=True):
+        index = cls(path, root)
+        try:
+            with open(path, "r") as f:
+                index.entries = json.load(f).get("entries", {})
+        except:
+            index.entries = {}
+        if refresh:
+            index.refresh()
+        index._rebuild_lookups()
+        return index
+
+    def _rebuild_lookups(self):
+        self.names = {}
+        self.folders = {}
+        self.hashes = {}
+        for rel_path, entry in self.entries.items():
+            self._link(rel_path, entry)
+
+    def _link(self, rel_path, entry):
+        assets_dir, country, filename = self.split(rel_path)
+        self.names.setdefault(assets_dir, set()).add(filename)
+        self.folders.setdefault((assets_dir, country), set()).add(rel_path)
+        if entry.get("sha1"):
+            self.hashes.setdefault(entry["sha1"], set()).add(rel_path)
+
+    def _unlink(self, rel_path, entry):
+        assets_dir, country, filename = self.split(rel_path)
+        self.names.get(assets_dir, set()).discard(filename)
+        self.folders.get((assets_dir, country), set()).discard(rel_path)
+        paths = self.hashes.get(entry.get("sha1"))
+        if paths is not None:
+            paths.discard(rel_path)
+            if not paths:
+                del self.hashes[entry["sha1"]]
+
+    @staticmethod
+    def split(rel_path):
+        """Returns (assets_dir, country, filename) for an indexed path."""
+        parts = rel_path.split("/")
+        return parts[0], parts[1], parts[-1]
+
+    def rel(self, path):
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.root)
+        return path.replace(os.sep, "/")
+
+    def abs(self, rel_path):
+        return os.path.join(self.root, *rel_path.split("/"))
+
+    def _stat_entry(self, full_path, previous=None):
+        st = os.stat(full_path)
+        if (
+            previous
+            and previous.get("size") == st.st_size
+            and previous.get("mtime") == st.st_mtime
+        ):
+            return previous
+        return {
+            "id": os.path.splitext(os.path.basename(full_path))[0],
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "sha1": file_sha1(full_path),
+        }
+
+    def refresh(self):
+        """Reconcile with the asset trees on disk in a single scan."""
+        seen = set()
+        for assets_dir in ASSET_DIRS:
+            base = os.path.join(self.root, assets_dir)
+            if not os.path.isdir(base):
+                continue
+            for country in os.scandir(base):
+                if not country.is_dir() or country.name.startswith("."):
+                    continue
+                for f in os.scandir(country.path):
+                    if f.name.startswith(".") or not f.is_file():
+                        continue
+                    rel_path = f"{assets_dir}/{country.name}/{f.name}"
+                    seen.add(rel_path)
+                    previous = self.entries.get(rel_path)
+                    entry = self._stat_entry(f.path, previous)
+                    if entry is not previous:
+                        self.entries[rel_path] = entry
+                        self.dirty = True
+
+        for rel_path in list(self.entries):
+            if rel_path not in seen:
+                del self.entries[rel_path]
+                self.dirty = True
+
+    def add(self, path, unique=False):
+        """Index a newly written file; returns its entry.
+
+        With unique=True nothing is added (and None is returned) when a file
+        with the same content is already indexed under another path.
+        """
+        rel_path = self.rel(path)
+        entry = self._stat_entry(self.abs(rel_path))
+        with self.lock:
+            if unique and self.hashes.get(entry["sha1"], {rel_path}) != {rel_path}:
+                return None
+            old = self.entries.get(rel_path)
+            if old:
+                self._unlink(rel_path, old)
+            self.entries[rel_path] = entry
+            self._link(rel_path, entry)
+            self.dirty = True
+        return entry
+
+    def annotate(self, path, **fields):
+        """Attach derived data (hashes, validation results) to an entry.
+
+        Fields live until the file's size or mtime changes, at which point the
+        entry is rebuilt and they have to be derived again.
+        """
+        rel_path = self.rel(path)
+        with self.lock:
+            entry = self.entries.get(rel_path)
+            if entry is not None:
+                entry.update(fields)
+                self.dirty = True
+
+    def remove(self, path):
+        rel_path = self.rel(path)
+        with self.lock:
+            entry = self.entries.pop(rel_path, None)
+            if entry:
+                self._unlink(rel_path, entry)
+                self.dirty = True
+
+    def has_filename(self, assets_dir, filename):
+        return filename in self.names.get(self.rel(assets_dir), ())
+
+    def has_hash(self, sha1):
+        return sha1 in self.hashes
+
+    def files(self, assets_dir, country=None):
+        """Indexed paths (relative to the root) under an assets dir or one country."""
+        assets_dir = self.rel(assets_dir)
+        if country:
+            return sorted(self.folders.get((assets_dir, country), ()))
+        return sorted(
+            p
+            for (d, _), paths in self.folders.items()
+            if d == assets_dir
+            for p in paths
+        )
+
+    def countries(self, assets_dir):
+        assets_dir = self.rel(assets_dir)
+        return sorted(
+            c for (d, c), paths in self.folders.items() if d == assets_dir and paths
+        )
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with self.lock:
+            with open(tmp_path, "w") as f:
+                json.dump({"entries": self.entries}, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+
+if __name__ == "__main__":
+    index = AssetIndex.load()
+    index.save()
+    for assets_dir in ASSET_DIRS:
+        print(
+            f"{assets_dir}: {len(index.files(assets_dir))} files in "
+            f"{len(index.countries(assets_dir))} countries"
+        )
+    duplicates = [paths for paths in index.hashes.values() if len(paths) > 1]
+    print(f"{len(duplicates)} groups of byte-identical files")
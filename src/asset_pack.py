@@ -0,0 +1,381 @@
+import os
+import sys
+import json
+import struct
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import get_path, ROOT_DIR
+from src.asset_index import AssetIndex, ASSET_DIRS
+
+logger = logging.getLogger(__name__)
+
+PACK_PATH = get_path(".cache/assets.pack")
+PACK_VERSION = 2
+# The trailer is the magic followed by the byte offset of the JSON table
+MAGIC = b"MWPACK01"
+TRAILER = struct.Struct("<8sQ")
+# Tiles start on page boundaries so every view maps whole pages
+ALIGN = 4096
+# Canvas sizes the --use_icons permutations render at
+STANDARD_SIZES = [(256, 256), (512, 512)]
+# Color statistics are summed per cell of a STATS_GRID x STATS_GRID grid
+STATS_GRID = 32
+PALETTE_SIZE = 8
+# Channel sums, sums of squares, then one pixel count per palette color
+STATS_CHANNELS = 6 + PALETTE_SIZE
+# Summed channel variance below which a region is treated as one flat color
+FLAT_VARIANCE = 100.0
+
+
+def size_key(size):
+    return f"{size[0]}x{size[1]}"
+
+
+def parse_size(value):
+    width, height = (int(x) for x in value.replace("x", ",").split(","))
+    return width, height
+
+
+def fit_image(img, size, resample=Image.Resampling.LANCZOS):
+    """Scale img to cover size and center-crop the overflow."""
+    target_w, target_h = size
+    img_w, img_h = img.size
+    aspect_target = target_w / target_h
+    aspect_img = img_w / img_h
+
+    if aspect_img > aspect_target:
+        new_h = target_h
+        new_w = int(aspect_img * new_h)
+        img = img.resize((new_w, new_h), resample)
+        left = (new_w - target_w) // 2
+        img = img.crop((left, 0, left + target_w, target_h))
+    else:
+        new_w = target_w
+        new_h = int(new_w / aspect_img)
+        img = img.resize((new_w, new_h), resample)
+        top = (new_h - target_h) // 2
+        img = img.crop((0, top, target_w, top + target_h))
+    return img
+
+
+def color_stats(tile):
+    """Summed-area table and cluster palette of one (height, width, 3) tile.
+
+    The table has shape (STATS_GRID + 1, STATS_GRID + 1, STATS_CHANNELS) and
+    holds, for each grid corner, the channel sums, sums of squares and palette
+    counts of everything above and to the left of it.
+    """
+    height, width = tile.shape[:2]
+    # Cluster a thumbnail, then map every pixel to its nearest palette color
+    image = Image.fromarray(tile)
+    thumbnail = image.copy()
+    thumbnail.thumbnail((64, 64))
+    quantized = thumbnail.quantize(PALETTE_SIZE, Image.Quantize.MEDIANCUT)
+    labels = np.asarray(image.quantize(palette=quantized, dither=Image.Dither.NONE))
+    colors = np.array(quantized.getpalette()[: 3 * PALETTE_SIZE]).reshape(-1, 3)
+    palette = np.zeros((PALETTE_SIZE, 3), np.uint8)
+    palette[: len(colors)] = colors
+
+    # Grid cell of every pixel, then one bincount per statistic
+    rows = np.linspace(0, height, STATS_GRID + 1).round().astype(int)
+    cols = np.linspace(0, width, STATS_GRID + 1).round().astype(int)
+    row_cells = np.repeat(np.arange(STATS_GRID), np.diff(rows))
+    col_cells = np.repeat(np.arange(STATS_GRID), np.diff(cols))
+    cells = (row_cells[:, None] * STATS_GRID + col_cells).ravel()
+    n_cells = STATS_GRID * STATS_GRID
+
+    sums = np.empty((n_cells, STATS_CHANNELS))
+    pixels = tile.reshape(-1, 3).astype(np.float64)
+    for c in range(3):
+        sums[:, c] = np.bincount(cells, pixels[:, c], n_cells)
+        sums[:, 3 + c] = np.bincount(cells, pixels[:, c] ** 2, n_cells)
+    label_cells = cells * PALETTE_SIZE + labels.ravel()
+    sums[:, 6:] = np.bincount(label_cells, minlength=n_cells * PALETTE_SIZE).reshape(
+        n_cells, PALETTE_SIZE
+    )
+
+    grid = sums.reshape(STATS_GRID, STATS_GRID, STATS_CHANNELS)
+    table = np.zeros((STATS_GRID + 1, STATS_GRID + 1, STATS_CHANNELS), np.float32)
+    table[1:, 1:] = grid.cumsum(axis=0).cumsum(axis=1)
+    return table, palette.tolist()
+
+
+def render_tiles(args):
+    """(pixels, stats, palette) of one asset at every size, or None if unreadable.
+
+    Sizes smaller than the stats grid get no stats or palette.
+    """
+    path, sizes = args
+    try:
+        with Image.open(path) as img:
+            img = img.convert("RGB")
+        tiles = []
+        for size in sizes:
+            tile = np.asarray(fit_image(img, size))
+            if min(size) >= STATS_GRID:
+                table, palette = color_stats(tile)
+            else:
+                table, palette = None, None
+            tiles.append((tile, table, palette))
+        return tiles
+    except Exception as e:
+        print(f"Error packing {path}: {e}")
+        return None
+
+
+class ColorStats:
+    """Constant-time color statistics for any rectangle of a packed tile."""
+
+    def __init__(self, table, palette, size):
+        self.table = table
+        self.palette = palette
+        self.size = size
+
+    def _cells(self, start, end, extent):
+        first = int(np.clip(np.floor(start * STATS_GRID / extent), 0, STATS_GRID - 1))
+        last = int(np.clip(np.ceil(end * STATS_GRID / extent), first + 1, STATS_GRID))
+        return first, last
+
+    def region_colors(self, region, top=PALETTE_SIZE):
+        """(colors, weights) of the dominant colors in region, or None.
+
+        The region is widened to whole grid cells. Near-flat regions return
+        their mean color; the rest return their top palette colors weighted by
+        their share of the region, like the clusters of a k-means pass. This is
+        an approximation: the palette is fixed per tile and the region is
+        snapped to the grid, so get_contrast_colors() can pick another hue than
+        k-means would (see its docstring).
+        """
+        x0, x1 = self._cells(region[0], region[2], self.size[0])
+        y0, y1 = self._cells(region[1], region[3], self.size[1])
+        t = self.table
+        sums = (t[y1, x1] - t[y0, x1] - t[y1, x0] + t[y0, x0]).astype(np.float64)
+        counts = sums[6:]
+        n = counts.sum()
+        if n <= 0:
+            return None
+        mean = sums[:3] / n
+        variance = np.maximum(sums[3:6] / n - mean**2, 0.0)
+        if variance.sum() < FLAT_VARIANCE:
+            return [mean], [1.0]
+        order = np.argsort(counts)[::-1][:top]
+        order = order[counts[order] > 0]
+        weights = counts[order] / counts[order].sum()
+        return [np.array(self.palette[i], np.float64) for i in order], weights.tolist()
+
+
+class AssetPack:
+    """Read-only view of a packed background archive.
+
+    The archive is one file of raw RGB tiles, each asset pre-scaled to every
+    standard size, followed by a JSON table keyed by "<assets_dir>/<country>".
+    It is memory-mapped read-only, so tiles are served as NumPy views straight
+    from the page cache and every process rendering at once shares one copy.
+    """
+
+    def __init__(self, path=PACK_PATH):
+        self.path = path
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, table_offset = TRAILER.unpack(bytes(self.data[-TRAILER.size :]))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an asset pack")
+        table = json.loads(bytes(self.data[table_offset : -TRAILER.size]))
+        if table.get("version") != PACK_VERSION:
+            raise ValueError(f"{path} was written by another pack version")
+        self.sizes = [tuple(size) for size in table["sizes"]]
+        self.countries = table["countries"]
+        self.entries = {}
+        for folder, files in self.countries.items():
+            for filename, entry in files.items():
+                self.entries[f"{folder}/{filename}"] = entry
+
+    @classmethod
+    def open(cls, path=PACK_PATH):
+        """The pack at path, or None if there is none or it is unreadable."""
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring asset pack %s: %s", path, e)
+            return None
+
+    def _fresh_entry(self, path):
+        """(rel_path, entry) if path is packed and unchanged since, else None."""
+        rel_path = os.path.relpath(path, ROOT_DIR).replace(os.sep, "/")
+        entry = self.entries.get(rel_path)
+        if entry is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if st.st_size != entry["size"] or st.st_mtime != entry["mtime"]:
+            return None
+        return rel_path, entry
+
+    def raw_tile(self, rel_path, size):
+        entry = self.entries.get(rel_path)
+        offset = entry and entry["tiles"].get(size_key(size))
+        if offset is None:
+            return None
+        width, height = size
+        return self.data[offset : offset + width * height * 3].reshape(height, width, 3)
+
+    def raw_stats(self, rel_path, size):
+        entry = self.entries.get(rel_path)
+        offset = entry and entry["stats"].get(size_key(size))
+        if offset is None:
+            return None, None
+        shape = (STATS_GRID + 1, STATS_GRID + 1, STATS_CHANNELS)
+        table = np.ndarray(shape, np.float32, self.data, offset)
+        return table, entry["palettes"][size_key(size)]
+
+    def tile(self, path, size):
+        """Zero-copy (height, width, 3) view of path at size, or None.
+
+        None means the size was not packed or the file changed since packing;
+        callers then decode the file itself.
+        """
+        fresh = self._fresh_entry(path)
+        return self.raw_tile(fresh[0], size) if fresh else None
+
+    def color_stats(self, path, size):
+        """ColorStats of path at size, or None under the same rules as tile()."""
+        fresh = self._fresh_entry(path)
+        if fresh is None:
+            return None
+        table, palette = self.raw_stats(fresh[0], size)
+        return ColorStats(table, palette, size) if table is not None else None
+
+
+_PACK = None
+_PACK_LOADED = False
+
+
+def get_asset_pack():
+    """The shared AssetPack of this process, opened on first use."""
+    global _PACK, _PACK_LOADED
+    if not _PACK_LOADED:
+        _PACK = AssetPack.open()
+        _PACK_LOADED = True
+    return _PACK
+
+
+def write_aligned(f, array):
+    """Write array's bytes at the next page boundary; returns their offset."""
+    f.seek(-f.tell() % ALIGN, os.SEEK_CUR)
+    offset = f.tell()
+    f.write(np.ascontiguousarray(array).tobytes())
+    return offset
+
+
+def build_pack(index, path=PACK_PATH, sizes=STANDARD_SIZES, workers=None):
+    """Write every indexed asset to a pack at path; returns (packed, reused).
+
+    Each tile is stored with the summed-area table and palette of its colors
+    (see color_stats). Tiles of files unchanged since the previous pack at path
+    are copied from it instead of being decoded again; the rest are decoded and
+    scaled in a process pool. The new pack replaces the old one atomically.
+    """
+    sizes = [tuple(size) for size in sizes]
+    previous = AssetPack.open(path)
+    if previous is not None and not set(sizes) <= set(previous.sizes):
+        previous = None
+
+    rel_paths = [p for d in ASSET_DIRS for p in index.files(d)]
+    reusable = {}
+    todo = []
+    for rel_path in rel_paths:
+        entry = index.entries[rel_path]
+        old = previous.entries.get(rel_path) if previous else None
+        if old and old["size"] == entry["size"] and old["mtime"] == entry["mtime"]:
+            reusable[rel_path] = [
+                (previous.raw_tile(rel_path, s), *previous.raw_stats(rel_path, s))
+                for s in sizes
+            ]
+        else:
+            todo.append(rel_path)
+
+    countries = {}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f, ProcessPoolExecutor(workers) as pool:
+            rendered = pool.map(
+                render_tiles, [(index.abs(p), sizes) for p in todo], chunksize=4
+            )
+            for rel_path in rel_paths:
+                if rel_path in reusable:
+                    tiles = reusable[rel_path]
+                else:
+                    tiles = next(rendered)
+                if tiles is None:
+                    continue
+                offsets = {}
+                stats = {}
+                palettes = {}
+                for size, (tile, table, palette) in zip(sizes, tiles):
+                    offsets[size_key(size)] = write_aligned(f, tile)
+                    if table is not None:
+                        stats[size_key(size)] = write_aligned(f, table)
+                        palettes[size_key(size)] = palette
+                entry = index.entries[rel_path]
+                assets_dir, country, filename = index.split(rel_path)
+                countries.setdefault(f"{assets_dir}/{country}", {})[filename] = {
+                    "size": entry["size"],
+                    "mtime": entry["mtime"],
+                    "tiles": offsets,
+                    "stats": stats,
+                    "palettes": palettes,
+                }
+
+            table_offset = f.tell()
+            table = {"version": PACK_VERSION, "sizes": sizes, "countries": countries}
+            f.write(json.dumps(table).encode("utf-8"))
+            f.write(TRAILER.pack(MAGIC, table_offset))
+        # The old map stays valid for readers that still hold it
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    packed = sum(len(files) for files in countries.values())
+    return packed, len(reusable)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pack background assets into a memory-mapped archive"
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=parse_size,
+        default=STANDARD_SIZES,
+        help="Canvas sizes to pre-scale to, e.g. 256,256 512,128",
+    )
+    parser.add_argument("--output", default=PACK_PATH)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    index = AssetIndex.load()
+    index.save()
+    packed, reused = build_pack(index, args.output, args.sizes, args.workers)
+    size_mb = os.path.getsize(args.output) / 1e6
+    print(
+        f"Packed {packed} assets at {', '.join(size_key(s) for s in args.sizes)} "
+        f"({reused} reused): {size_mb:.1f} MB in {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
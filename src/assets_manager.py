@@ -3,16 +3,19 @@ import glob
 import json
 import random
 import colorsys
+import itertools
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image, ImageFont, ImageDraw
-from src.utils import get_path, get_lang_sort_key, hex_to_rgb
-from src.config import LANG_TO_COUNTRY, FONT_MAP
+from src.utils import get_path, get_lang_sort_key
+from src.config import QUALITY_TIERS
+from src.languages import get_registry
+from src.asset_index import AssetIndex
+from src.asset_pack import fit_image, get_asset_pack
+from src.perceptual_hash import is_near_duplicate
 
-FLAG_COLORS = {}
-try:
-    with open(get_path("flag_colors.json"), "r") as f:
-        FLAG_COLORS = json.load(f)
-except:
-    pass
+# A chosen frame background: an asset path, or a solid color when path is None
+Background = namedtuple("Background", ["path", "color"])
 
 
 def get_font_for_lang(lang_code, text, preferred_path):
@@ -35,8 +38,9 @@ def get_font_for_lang(lang_code, text, preferred_path):
             return True
         return False
 
-    if lang_code in FONT_MAP:
-        font_path = get_path(FONT_MAP[lang_code])
+    font = get_registry().font(lang_code)
+    if font:
+        font_path = get_path(font)
         if os.path.exists(font_path):
             return font_path
 
@@ -94,8 +98,40 @@ def get_font_for_lang(lang_code, text, preferred_path):
     return None
 
 
-def get_background_image(lang_code, size, word="hello", used_images=None):
-    """Find a random image for the language and resize/crop it to fill the size."""
+_ASSET_HASHES = None
+
+
+def get_asset_hashes():
+    """{absolute path: index entry} for every asset with perceptual hashes."""
+    global _ASSET_HASHES
+    if _ASSET_HASHES is None:
+        # No refresh: rendering should never hash files, stale entries just miss
+        index = AssetIndex.load(refresh=False)
+        _ASSET_HASHES = {
+            index.abs(rel_path): entry
+            for rel_path, entry in index.entries.items()
+            if "phash" in entry
+        }
+    return _ASSET_HASHES
+
+
+def looks_used(path, used_images):
+    """True if path is a near-duplicate of an image already shown."""
+    hashes = get_asset_hashes()
+    entry = hashes.get(path)
+    if entry is None:
+        return False
+    return any(
+        is_near_duplicate(entry, hashes[used]) for used in used_images if used in hashes
+    )
+
+
+def choose_background(lang_code, word="hello", used_images=None):
+    """Pick a random, not yet used background for the language.
+
+    Only selects; nothing is read or decoded, so a whole GIF's backgrounds can
+    be chosen up front and loaded later in any order.
+    """
     if used_images is None:
         used_images = set()
 
@@ -104,7 +140,7 @@ def get_background_image(lang_code, size, word="hello", used_images=None):
         get_path("hello_assets") if word_clean == "hello" else get_path("love_assets")
     )
 
-    country = LANG_TO_COUNTRY.get(lang_code)
+    country = get_registry().country(lang_code)
     img_path = None
 
     if country:
@@ -116,14 +152,20 @@ def get_background_image(lang_code, size, word="hello", used_images=None):
                 if os.path.isfile(f)
             ]
             random.shuffle(images)
+            fallback = None
             for potential_path in images:
                 if potential_path not in used_images:
                     try:
-                        if os.path.getsize(potential_path) > 500:
-                            img_path = potential_path
-                            break
+                        if os.path.getsize(potential_path) <= 500:
+                            continue
                     except:
                         continue
+                    if not looks_used(potential_path, used_images):
+                        img_path = potential_path
+                        break
+                    fallback = fallback or potential_path
+            # Only near-duplicates left: still better than repeating an image
+            img_path = img_path or fallback
 
     if not img_path:
         global_dir = os.path.join(assets_dir, "global")
@@ -134,6 +176,8 @@ def get_background_image(lang_code, size, word="hello", used_images=None):
                 if os.path.isfile(f)
             ]
             unused_global = [f for f in images if f not in used_images]
+            fresh_global = [f for f in unused_global if not looks_used(f, used_images)]
+            unused_global = fresh_global or unused_global
             img_path = (
                 random.choice(unused_global)
                 if unused_global
@@ -142,31 +186,97 @@ def get_background_image(lang_code, size, word="hello", used_images=None):
 
     if not img_path:
         color = (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
-        return Image.new("RGB", size, color), f"solid_color_{color}"
+        return Background(None, color)
+    return Background(img_path, None)
 
-    try:
-        img = Image.open(img_path).convert("RGB")
-        target_w, target_h = size
-        img_w, img_h = img.size
-        aspect_target = target_w / target_h
-        aspect_img = img_w / img_h
-
-        if aspect_img > aspect_target:
-            new_h = target_h
-            new_w = int(aspect_img * new_h)
-            img = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-            left = (new_w - target_w) // 2
-            img = img.crop((left, 0, left + target_w, target_h))
-        else:
-            new_w = target_w
-            new_h = int(new_w / aspect_img)
-            img = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-            top = (new_h - target_h) // 2
-            img = img.crop((0, top, target_w, top + target_h))
 
-        return img, img_path
-    except Exception as e:
-        return Image.new("RGB", size, (128, 128, 128)), None
+def load_backgrounds(background, sizes, quality="standard"):
+    """Read a chosen background once and resize/crop it to fill every size.
+
+    Returns [(image, path)] in the order of sizes. Sizes packed with
+    `python src/asset_pack.py` are served straight from the memory-mapped pack;
+    the rest share one decode of the file and are fitted from it, with the
+    quality tier picking the decode scale and resampling filter.
+    """
+    img_path = background.path
+    if img_path is None:
+        color = background.color
+        return [
+            (Image.new("RGB", size, color), f"solid_color_{color}") for size in sizes
+        ]
+
+    pack = get_asset_pack()
+    loaded = {}
+    for size in sizes:
+        tile = pack.tile(img_path, size) if pack else None
+        if tile is not None:
+            # The frame is drawn on, so this is the one copy out of the mapped pixels
+            loaded[size] = Image.fromarray(tile, "RGB"), img_path
+
+    unpacked = [size for size in sizes if size not in loaded]
+    if unpacked:
+        tier = QUALITY_TIERS[quality]
+        try:
+            with Image.open(img_path) as img:
+                if tier["reduced_decode"]:
+                    # Never decodes below the largest size, so crops only downscale
+                    largest = (max(w for w, _ in unpacked), max(h for _, h in unpacked))
+                    img.draft("RGB", largest)
+                img = img.convert("RGB")
+            resample = Image.Resampling[tier["resample"].upper()]
+            for size in unpacked:
+                loaded[size] = fit_image(img, size, resample), img_path
+        except Exception as e:
+            for size in unpacked:
+                loaded[size] = Image.new("RGB", size, (128, 128, 128)), None
+    return [loaded[size] for size in sizes]
+
+
+def load_background(background, size, quality="standard"):
+    """Read a chosen background and resize/crop it to fill the size."""
+    return load_backgrounds(background, [size], quality)[0]
+
+
+def get_background_stats(img_path, size):
+    """Precomputed ColorStats of a packed background, or None."""
+    pack = get_asset_pack()
+    return pack.color_stats(img_path, size) if pack else None
+
+
+def get_background_image(
+    lang_code, size, word="hello", used_images=None, quality="standard"
+):
+    """Find a random image for the language and resize/crop it to fill the size."""
+    background = choose_background(lang_code, word, used_images)
+    return load_background(background, size, quality)
+
+
+def prefetch_backgrounds(backgrounds, sizes, depth=4, quality="standard"):
+    """Yield load_backgrounds() for each chosen background, in order.
+
+    Up to depth backgrounds are read and decoded ahead in a thread pool while
+    the caller draws the current frames; depth 0 loads each one on demand.
+    """
+    if depth <= 0:
+        for background in backgrounds:
+            yield load_backgrounds(background, sizes, quality)
+        return
+
+    # Open the shared pack before the threads race to do it
+    get_asset_pack()
+    backgrounds = iter(backgrounds)
+    with ThreadPoolExecutor(max_workers=depth) as pool:
+        pending = deque(
+            pool.submit(load_backgrounds, background, sizes, quality)
+            for background in itertools.islice(backgrounds, depth)
+        )
+        while pending:
+            loaded = pending.popleft().result()
+            for background in itertools.islice(backgrounds, 1):
+                pending.append(
+                    pool.submit(load_backgrounds, background, sizes, quality)
+                )
+            yield loaded
 
 
 def get_trans(text, languages=None):
@@ -201,19 +311,17 @@ def get_trans(text, languages=None):
 
 
 def get_flag_colors_for_text(text, lang_code):
-    country_key = LANG_TO_COUNTRY.get(lang_code, "global")
-    formatted_country = "_".join([w.capitalize() for w in country_key.split("_")])
-    colors_hex = FLAG_COLORS.get(formatted_country, ["#FFFFFF"])
+    colors = get_registry().flag_colors(lang_code)
 
     n_chars = len(text)
-    n_colors = len(colors_hex)
+    n_colors = len(colors)
     if n_chars == 0:
         return []
 
     char_colors = []
     for i in range(n_chars):
         color_idx = min(int((i / n_chars) * n_colors), n_colors - 1)
-        char_colors.append(hex_to_rgb(colors_hex[color_idx]))
+        char_colors.append(colors[color_idx])
     return char_colors
 
 
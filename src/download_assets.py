@@ -1,114 +1,321 @@
-import urllib.request
-import urllib.parse
-import json
 import os
 import sys
+import json
 import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
 
 # Get the project root directory
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+import requests
+from PIL import Image
+
+from src.config import MAX_ASSET_DIMENSION
+from src.http_cache import HttpCache, MODES as HTTP_CACHE_MODES, HTTP_CACHE_DIR
+from src.ingest import CHUNK_SIZE, stream_image
+from src.utils import get_path
 
+TASKS_PATH = get_path("download_tasks.json")
+STATE_PATH = get_path(".cache/download_assets_state.json")
+MIN_BYTES = 5000
 
-def get_path(path):
-    """Returns the absolute path to a file or directory relative to the project root."""
-    return os.path.join(ROOT_DIR, path)
+# Requests per second per host. Metadata lookups are cheap for Commons; the
+# upload servers are the ones that answer 429 to bursts of file downloads.
+HOST_RATES = {
+    "commons.wikimedia.org": 5.0,
+    "upload.wikimedia.org": 0.5,
+}
+DEFAULT_RATE = 1.0
 
 
 UA = "MrWorldwideBot/1.0 (https://github.com/enrique/mr.worldwide; enrique@example.com) Python/3.x"
 
 
+WIKIMEDIA_API_URL = "https://commons.wikimedia.org/w/api.php"
+# Search hits and file URLs on Commons hardly ever change
+METADATA_TTL = 30 * 24 * 60 * 60
+
+SESSION = requests.Session()
+SESSION.headers["User-Agent"] = UA
+HTTP_CACHE = HttpCache(ttl=METADATA_TTL)
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average with bursts of `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            # Going negative reserves a future slot, so waiters queue up fairly
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        if delay:
+            time.sleep(delay)
+
+
+class HostLimiter:
+    """One token bucket per host, created on first use."""
+
+    def __init__(self, rates=None, default_rate=DEFAULT_RATE):
+        self.rates = dict(HOST_RATES if rates is None else rates)
+        self.default_rate = default_rate
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                rate = self.rates.get(host, self.default_rate)
+                self.buckets[host] = TokenBucket(rate)
+            return self.buckets[host]
+
+    def wait(self, url):
+        self.bucket(url).wait()
+
+
+LIMITER = HostLimiter()
+
+
+def wikimedia_query(params):
+    params = dict(params, action="query", format="json")
+    response = HTTP_CACHE.get(
+        SESSION,
+        WIKIMEDIA_API_URL,
+        params=params,
+        before_request=lambda: LIMITER.wait(WIKIMEDIA_API_URL),
+        timeout=30,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
 def get_image_url(query):
     try:
         # Search for file
-        search_url = f"https://commons.wikimedia.org/w/api.php?action=query&list=search&srsearch={urllib.parse.quote(query)}&srnamespace=6&format=json"
-        req = urllib.request.Request(search_url, headers={"User-Agent": UA})
-        with urllib.request.urlopen(req) as response:
-            data = json.loads(response.read().decode())
-            if not data["query"]["search"]:
-                return None
-            filename = data["query"]["search"][0]["title"]
+        data = wikimedia_query({"list": "search", "srsearch": query, "srnamespace": 6})
+        if not data["query"]["search"]:
+            return None
+        filename = data["query"]["search"][0]["title"]
 
         # Get direct URL
-        info_url = f"https://commons.wikimedia.org/w/api.php?action=query&titles={urllib.parse.quote(filename)}&prop=imageinfo&iiprop=url&format=json"
-        req = urllib.request.Request(info_url, headers={"User-Agent": UA})
-        with urllib.request.urlopen(req) as response:
-            data = json.loads(response.read().decode())
-            pages = data["query"]["pages"]
-            page = next(iter(pages.values()))
-            url = page["imageinfo"][0]["url"]
-
-            # Use a thumbnail URL to avoid 429s on original files
+        data = wikimedia_query(
+            {"titles": filename, "prop": "imageinfo", "iiprop": "url"}
+        )
+        pages = data["query"]["pages"]
+        page = next(iter(pages.values()))
+        url = page["imageinfo"][0]["url"]
+
+        # Use a thumbnail URL to avoid 429s on original files
+        # Original: https://upload.wikimedia.org/wikipedia/commons/d/da/Filename.jpg
+        # Thumb: https://upload.wikimedia.org/wikipedia/commons/thumb/d/da/Filename.jpg/1024px-Filename.jpg
+        if "upload.wikimedia.org/wikipedia/commons/" in url:
+            parts = url.split("/")
             # Original: https://upload.wikimedia.org/wikipedia/commons/d/da/Filename.jpg
-            # Thumb: https://upload.wikimedia.org/wikipedia/commons/thumb/d/da/Filename.jpg/1024px-Filename.jpg
-            if "upload.wikimedia.org/wikipedia/commons/" in url:
-                parts = url.split("/")
-                # Original: https://upload.wikimedia.org/wikipedia/commons/d/da/Filename.jpg
-                # parts: 0:https, 1:, 2:upload.wikimedia.org, 3:wikipedia, 4:commons, 5:d, 6:da, 7:Filename.jpg
-                if len(parts) >= 8:
-                    hash1 = parts[5]
-                    hash2 = parts[6]
-                    filename_only = parts[7]
-                    thumb_url = f"https://upload.wikimedia.org/wikipedia/commons/thumb/{hash1}/{hash2}/{filename_only}/1024px-{filename_only}"
-                    return thumb_url
-
-            return url
+            # parts: 0:https, 1:, 2:upload.wikimedia.org, 3:wikipedia, 4:commons, 5:d, 6:da, 7:Filename.jpg
+            if len(parts) >= 8:
+                hash1 = parts[5]
+                hash2 = parts[6]
+                filename_only = parts[7]
+                thumb_url = f"https://upload.wikimedia.org/wikipedia/commons/thumb/{hash1}/{hash2}/{filename_only}/1024px-{filename_only}"
+                return thumb_url
+
+        return url
 
     except Exception as e:
         print(f"Error fetching {query}: {e}", file=sys.stderr)
         return None
 
 
-def download_image(query, target_path):
-    url = get_image_url(query)
-    if not url:
-        print(f"No URL found for {query}")
-        return
+def is_usable(path):
+    """Header-only check that an existing file is an image worth keeping."""
+    try:
+        if os.path.getsize(path) <= MIN_BYTES:
+            return False
+        with Image.open(path) as img:
+            return all(img.size)
+    except Exception:
+        return False
+
+
+def load_tasks(path=TASKS_PATH):
+    """Returns [{"query": ..., "path": ...}] with paths relative to the root."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
-    # Check if file exists and is not a dummy
-    if os.path.exists(target_path):
+
+class DownloadRunner:
+    """Runs the download tasks in parallel and checkpoints every result.
+
+    The state file maps each task's target path to its resolved image URL and,
+    once downloaded, the file's size and mtime. A later run skips finished tasks
+    whose file is unchanged and reuses resolved URLs, so an interrupted run picks
+    up where it stopped without repeating any lookups or downloads.
+    """
+
+    def __init__(self, state_path=STATE_PATH, workers=4, max_dimension=None):
+        self.state_path = state_path
+        self.workers = workers
+        self.max_dimension = (
+            MAX_ASSET_DIMENSION if max_dimension is None else max_dimension
+        )
+        self.state = {}
+        self.lock = threading.Lock()
         try:
-            from PIL import Image
+            with open(state_path, "r") as f:
+                self.state = json.load(f)
+        except:
+            self.state = {}
+
+    def checkpoint(self, rel_path, **fields):
+        with self.lock:
+            self.state.setdefault(rel_path, {}).update(fields)
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            tmp_path = self.state_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.state, f, indent=1)
+            os.replace(tmp_path, self.state_path)
+
+    def is_done(self, rel_path):
+        entry = self.state.get(rel_path, {})
+        path = get_path(rel_path)
+        if entry.get("status") != "done" or not os.path.exists(path):
+            return False
+        st = os.stat(path)
+        return entry.get("size") == st.st_size and entry.get("mtime") == st.st_mtime
+
+    def mark_done(self, rel_path):
+        st = os.stat(get_path(rel_path))
+        self.checkpoint(rel_path, status="done", size=st.st_size, mtime=st.st_mtime)
 
-            with Image.open(target_path) as img:
-                img.load()
-            if os.path.getsize(target_path) > 5000:
+    def run_task(self, task):
+        query, rel_path = task["query"], task["path"]
+        target_path = get_path(rel_path)
+        if self.is_done(rel_path):
+            return "skipped"
+        if os.path.exists(target_path):
+            if is_usable(target_path):
                 print(f"Skipping {target_path}, already exists and seems valid.")
-                return
-        except:
+                self.mark_done(rel_path)
+                return "skipped"
             print(f"Existing file {target_path} is invalid, redownloading...")
             os.remove(target_path)
 
-    print(f"Downloading {query} from {url} to {target_path}...")
-    try:
-        time.sleep(2)  # Be nice to Wikimedia
-        req = urllib.request.Request(url, headers={"User-Agent": UA})
-        with urllib.request.urlopen(req) as response:
-            with open(target_path, "wb") as f:
-                f.write(response.read())
+        url = self.state.get(rel_path, {}).get("url")
+        if not url:
+            url = get_image_url(query)
+            if not url:
+                print(f"No URL found for {query}")
+                self.checkpoint(rel_path, status="no_url")
+                return "failed"
+            self.checkpoint(rel_path, url=url, status="resolved")
+
+        print(f"Downloading {query} from {url} to {target_path}...")
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        try:
+            download_image(url, target_path, self.max_dimension)
+        except Exception as e:
+            print(f"Error downloading {target_path}: {e}")
+            self.checkpoint(rel_path, status="failed", error=str(e))
+            return "failed"
         print(f"Successfully downloaded {target_path}")
-    except Exception as e:
-        print(f"Error downloading {target_path}: {e}")
-        # Try original URL if thumb fails
-        # (omitted for brevity, or just rely on the thumb)
-
-
-tasks = [
-    ("Hallgrimskirkja", get_path("hello_assets/iceland/hallgrimskirkja.jpg")),
-    ("Skogafoss", get_path("hello_assets/iceland/skogafoss.jpg")),
-    ("Cliffs of Moher", get_path("hello_assets/ireland/cliffs_of_moher.jpg")),
-    ("Rock of Cashel", get_path("hello_assets/ireland/rock_of_cashel.jpg")),
-    ("Angkor Wat", get_path("hello_assets/cambodia/angkor_wat.jpg")),
-    ("Shwedagon Pagoda", get_path("hello_assets/myanmar/shwedagon.jpg")),
-    ("Table Mountain", get_path("hello_assets/south_africa/table_mountain.jpg")),
-    ("Milford Sound", get_path("hello_assets/new_zealand/milford_sound.jpg")),
-    ("Zuma Rock", get_path("hello_assets/nigeria/zuma_rock.jpg")),
-    ("Lalibela Church", get_path("hello_assets/ethiopia/lalibela.jpg")),
-    ("Edinburgh Castle", get_path("hello_assets/united_kingdom/edinburgh_castle.jpg")),
-    ("Snowdonia National Park", get_path("hello_assets/united_kingdom/snowdonia.jpg")),
-    ("Mount Ararat Khor Virap", get_path("hello_assets/armenia/khor_virap.jpg")),
-    ("Gergeti Trinity Church", get_path("hello_assets/georgia/gergeti.jpg")),
-]
-
-for query, path in tasks:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    download_image(query, path)
+        self.mark_done(rel_path)
+        return "downloaded"
+
+    def run(self, tasks):
+        """Returns {"downloaded": n, "skipped": n, "failed": n}."""
+        counts = {"downloaded": 0, "skipped": 0, "failed": 0}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.run_task, task): task for task in tasks}
+            for future in as_completed(futures):
+                try:
+                    counts[future.result()] += 1
+                except Exception as e:
+                    print(f"Error processing {futures[future]['query']}: {e}")
+                    counts["failed"] += 1
+        return counts
+
+
+def download_image(url, target_path, max_dimension=MAX_ASSET_DIMENSION):
+    with HTTP_CACHE.get(
+        SESSION,
+        url,
+        before_request=lambda: LIMITER.wait(url),
+        fixture_only=True,
+        stream=True,
+        timeout=60,
+    ) as response:
+        response.raise_for_status()
+        stream_image(
+            response.iter_content(CHUNK_SIZE),
+            target_path,
+            max_dimension,
+            min_bytes=MIN_BYTES,
+        )
+
+
+def parse_rate(value):
+    host, _, rate = value.partition("=")
+    if not host or not rate:
+        raise argparse.ArgumentTypeError("expected HOST=REQUESTS_PER_SECOND")
+    return host, float(rate)
+
+
+def main():
+    global HTTP_CACHE, LIMITER
+
+    parser = argparse.ArgumentParser(description="Download landmark images")
+    parser.add_argument("--tasks", default=TASKS_PATH, help="JSON task list")
+    parser.add_argument("--state", default=STATE_PATH, help="Checkpoint file")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--restart", action="store_true", help="Ignore the checkpoint and start over"
+    )
+    parser.add_argument(
+        "--rate",
+        type=parse_rate,
+        action="append",
+        default=[],
+        metavar="HOST=RPS",
+        help="Override a host's request rate (repeatable)",
+    )
+    parser.add_argument(
+        "--max_dimension",
+        type=int,
+        default=MAX_ASSET_DIMENSION,
+        help="Downscale images so their shorter side fits (0 keeps originals)",
+    )
+    parser.add_argument("--http_cache", choices=HTTP_CACHE_MODES, default="cache")
+    parser.add_argument("--http_cache_dir", default=HTTP_CACHE_DIR)
+    args = parser.parse_args()
+
+    HTTP_CACHE = HttpCache(args.http_cache_dir, ttl=METADATA_TTL, mode=args.http_cache)
+    LIMITER = HostLimiter(dict(HOST_RATES, **dict(args.rate)))
+
+    if args.restart and os.path.exists(args.state):
+        os.remove(args.state)
+
+    tasks = load_tasks(args.tasks)
+    runner = DownloadRunner(args.state, args.workers, args.max_dimension)
+    counts = runner.run(tasks)
+    print(
+        f"Downloaded {counts['downloaded']}, skipped {counts['skipped']}, "
+        f"failed {counts['failed']} of {len(tasks)} tasks."
+    )
+
+
+if __name__ == "__main__":
+    main()
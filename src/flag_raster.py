@@ -0,0 +1,711 @@
+import re
+import math
+import xml.etree.ElementTree as ET
+
+import numpy as np
+from PIL import ImageColor
+
+# Flags are rasterized onto a coarse grid: GRID_WIDTH samples across, with the
+# height following the flag's aspect ratio. Area is estimated by point sampling
+# at cell centers, which is plenty for stripes and large emblems.
+GRID_WIDTH = 180
+# Curves and arcs are flattened into this many segments
+CURVE_STEPS = 8
+# Colors covering less of the flag are detail (coats of arms, text) and dropped
+MIN_AREA = 0.02
+# Stripe runs thinner than this fraction of the axis are absorbed by neighbors
+MIN_RUN = 0.03
+# Longer stripe sequences collapse to unique colors in order of appearance
+MAX_COLORS = 8
+
+SKIP_TAGS = {
+    "defs",
+    "clipPath",
+    "mask",
+    "pattern",
+    "symbol",
+    "marker",
+    "linearGradient",
+    "radialGradient",
+    "title",
+    "desc",
+    "metadata",
+    "style",
+    "text",
+}
+INHERITED = {
+    "fill",
+    "stroke",
+    "stroke-width",
+    "fill-rule",
+    "fill-opacity",
+    "stroke-opacity",
+    "visibility",
+}
+
+IDENTITY = np.eye(3)
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def _float(value, default=0.0):
+    if value is None:
+        return default
+    match = re.match(r"\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)", str(value))
+    return float(match.group(1)) if match else default
+
+
+def parse_transform(value):
+    """SVG transform list -> 3x3 affine matrix."""
+    matrix = IDENTITY.copy()
+    for name, args in re.findall(r"(\w+)\s*\(([^)]*)\)", value or ""):
+        a = [
+            float(x)
+            for x in re.findall(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?", args)
+        ]
+        m = IDENTITY.copy()
+        if name == "matrix" and len(a) == 6:
+            m[:2] = [[a[0], a[2], a[4]], [a[1], a[3], a[5]]]
+        elif name == "translate" and a:
+            m[0, 2] = a[0]
+            m[1, 2] = a[1] if len(a) > 1 else 0.0
+        elif name == "scale" and a:
+            m[0, 0] = a[0]
+            m[1, 1] = a[1] if len(a) > 1 else a[0]
+        elif name == "rotate" and a:
+            t = math.radians(a[0])
+            c, s = math.cos(t), math.sin(t)
+            m[:2, :2] = [[c, -s], [s, c]]
+            if len(a) == 3:
+                pre = IDENTITY.copy()
+                pre[:2, 2] = [a[1], a[2]]
+                post = IDENTITY.copy()
+                post[:2, 2] = [-a[1], -a[2]]
+                m = pre @ m @ post
+        elif name == "skewX" and a:
+            m[0, 1] = math.tan(math.radians(a[0]))
+        elif name == "skewY" and a:
+            m[1, 0] = math.tan(math.radians(a[0]))
+        matrix = matrix @ m
+    return matrix
+
+
+def _translate(x, y):
+    m = IDENTITY.copy()
+    m[:2, 2] = [x, y]
+    return m
+
+
+class _PathReader:
+    """Tokenizer for path data; arc flags may be written without separators."""
+
+    NUMBER = re.compile(r"[\s,]*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)")
+    FLAG = re.compile(r"[\s,]*([01])")
+    COMMAND = re.compile(r"[\s,]*([MmZzLlHhVvCcSsQqTtAa])")
+
+    def __init__(self, d):
+        self.d = d
+        self.pos = 0
+
+    def command(self):
+        match = self.COMMAND.match(self.d, self.pos)
+        if not match:
+            return None
+        self.pos = match.end()
+        return match.group(1)
+
+    def has_number(self):
+        return self.NUMBER.match(self.d, self.pos) is not None
+
+    def number(self):
+        match = self.NUMBER.match(self.d, self.pos)
+        if not match:
+            raise ValueError(f"bad path data at {self.pos}")
+        self.pos = match.end()
+        return float(match.group(1))
+
+    def flag(self):
+        match = self.FLAG.match(self.d, self.pos)
+        if not match:
+            raise ValueError(f"bad arc flag at {self.pos}")
+        self.pos = match.end()
+        return match.group(1) == "1"
+
+
+_T = np.linspace(0, 1, CURVE_STEPS + 1)[1:, None]
+CUBIC_BASIS = np.hstack(
+    [(1 - _T) ** 3, 3 * (1 - _T) ** 2 * _T, 3 * (1 - _T) * _T**2, _T**3]
+)
+QUADRATIC_BASIS = np.hstack([(1 - _T) ** 2, 2 * (1 - _T) * _T, _T**2])
+
+
+def _bezier(p0, p1, p2, p3):
+    return (CUBIC_BASIS @ np.array([p0, p1, p2, p3])).tolist()
+
+
+def _quadratic(p0, p1, p2):
+    return (QUADRATIC_BASIS @ np.array([p0, p1, p2])).tolist()
+
+
+def _arc(p0, rx, ry, phi, large, sweep, p1):
+    """Endpoint-parameterized elliptical arc -> points after p0."""
+    rx, ry = abs(rx), abs(ry)
+    if rx == 0 or ry == 0 or np.allclose(p0, p1):
+        return [list(p1)]
+    phi = math.radians(phi)
+    cp, sp = math.cos(phi), math.sin(phi)
+    dx, dy = (p0[0] - p1[0]) / 2, (p0[1] - p1[1]) / 2
+    x1 = cp * dx + sp * dy
+    y1 = -sp * dx + cp * dy
+    scale = x1**2 / rx**2 + y1**2 / ry**2
+    if scale > 1:
+        rx *= math.sqrt(scale)
+        ry *= math.sqrt(scale)
+    num = rx**2 * ry**2 - rx**2 * y1**2 - ry**2 * x1**2
+    den = rx**2 * y1**2 + ry**2 * x1**2
+    coef = math.sqrt(max(0.0, num / den)) if den else 0.0
+    if large == sweep:
+        coef = -coef
+    cx1 = coef * rx * y1 / ry
+    cy1 = -coef * ry * x1 / rx
+    cx = cp * cx1 - sp * cy1 + (p0[0] + p1[0]) / 2
+    cy = sp * cx1 + cp * cy1 + (p0[1] + p1[1]) / 2
+    t0 = math.atan2((y1 - cy1) / ry, (x1 - cx1) / rx)
+    t1 = math.atan2((-y1 - cy1) / ry, (-x1 - cx1) / rx)
+    delta = t1 - t0
+    if sweep and delta < 0:
+        delta += 2 * math.pi
+    elif not sweep and delta > 0:
+        delta -= 2 * math.pi
+    steps = max(2, int(CURVE_STEPS * abs(delta) / (math.pi / 2)))
+    t = t0 + delta * np.linspace(0, 1, steps + 1)[1:]
+    xs = cx + rx * np.cos(t) * cp - ry * np.sin(t) * sp
+    ys = cy + rx * np.cos(t) * sp + ry * np.sin(t) * cp
+    return np.stack([xs, ys], axis=1).tolist()
+
+
+def parse_path(d):
+    """Path data -> [(points, closed)] with curves flattened."""
+    reader = _PathReader(d or "")
+    subpaths = []
+    points = []
+    closed = False
+    cur = np.zeros(2)
+    start = np.zeros(2)
+    last_ctrl = None
+    last_cmd = ""
+
+    def finish():
+        if len(points) > 1:
+            subpaths.append((np.array(points, dtype=float), closed))
+
+    cmd = reader.command()
+    while cmd:
+        rel = cmd.islower()
+        op = cmd.upper()
+        first = True
+        while first or reader.has_number():
+            base = cur if rel else np.zeros(2)
+            if op == "M":
+                finish()
+                cur = np.array([reader.number(), reader.number()]) + base
+                start = cur.copy()
+                points = [cur.tolist()]
+                closed = False
+                # Extra coordinate pairs after a moveto are linetos
+                op = "L"
+                last_ctrl = None
+            elif op == "Z":
+                closed = True
+                cur = start.copy()
+                finish()
+                points = [cur.tolist()]
+                closed = False
+                last_ctrl = None
+                break
+            elif op == "L":
+                cur = np.array([reader.number(), reader.number()]) + base
+                points.append(cur.tolist())
+                last_ctrl = None
+            elif op == "H":
+                cur = np.array([reader.number() + (cur[0] if rel else 0), cur[1]])
+                points.append(cur.tolist())
+                last_ctrl = None
+            elif op == "V":
+                cur = np.array([cur[0], reader.number() + (cur[1] if rel else 0)])
+                points.append(cur.tolist())
+                last_ctrl = None
+            elif op in ("C", "S"):
+                if op == "C":
+                    c1 = np.array([reader.number(), reader.number()]) + base
+                else:
+                    c1 = (
+                        2 * cur - last_ctrl
+                        if last_ctrl is not None and last_cmd in "CS"
+                        else cur.copy()
+                    )
+                c2 = np.array([reader.number(), reader.number()]) + base
+                end = np.array([reader.number(), reader.number()]) + base
+                points.extend(_bezier(cur, c1, c2, end))
+                cur, last_ctrl = end, c2
+            elif op in ("Q", "T"):
+                if op == "Q":
+                    c1 = np.array([reader.number(), reader.number()]) + base
+                else:
+                    c1 = (
+                        2 * cur - last_ctrl
+                        if last_ctrl is not None and last_cmd in "QT"
+                        else cur.copy()
+                    )
+                end = np.array([reader.number(), reader.number()]) + base
+                points.extend(_quadratic(cur, c1, end))
+                cur, last_ctrl = end, c1
+            elif op == "A":
+                rx, ry, phi = reader.number(), reader.number(), reader.number()
+                large, sweep = reader.flag(), reader.flag()
+                end = np.array([reader.number(), reader.number()]) + base
+                points.extend(_arc(cur, rx, ry, phi, large, sweep, end))
+                cur = end
+                last_ctrl = None
+            last_cmd = op
+            first = False
+        if op != "Z":
+            last_cmd = op
+        cmd = reader.command()
+    finish()
+    return subpaths
+
+
+def _ellipse(cx, cy, rx, ry):
+    t = np.linspace(0, 2 * np.pi, 4 * CURVE_STEPS, endpoint=False)
+    return np.stack([cx + rx * np.cos(t), cy + ry * np.sin(t)], axis=1)
+
+
+def shape_geometry(tag, attrib):
+    """Element -> [(points, closed)] in its own user space."""
+    if tag == "path":
+        return parse_path(attrib.get("d"))
+    if tag == "rect":
+        x, y = _float(attrib.get("x")), _float(attrib.get("y"))
+        w, h = _float(attrib.get("width")), _float(attrib.get("height"))
+        if w <= 0 or h <= 0:
+            return []
+        return [(np.array([[x, y], [x + w, y], [x + w, y + h], [x, y + h]]), True)]
+    if tag == "circle":
+        r = _float(attrib.get("r"))
+        if r <= 0:
+            return []
+        return [
+            (_ellipse(_float(attrib.get("cx")), _float(attrib.get("cy")), r, r), True)
+        ]
+    if tag == "ellipse":
+        rx, ry = _float(attrib.get("rx")), _float(attrib.get("ry"))
+        if rx <= 0 or ry <= 0:
+            return []
+        return [
+            (_ellipse(_float(attrib.get("cx")), _float(attrib.get("cy")), rx, ry), True)
+        ]
+    if tag in ("polygon", "polyline"):
+        nums = [
+            float(x)
+            for x in re.findall(
+                r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?", attrib.get("points", "")
+            )
+        ]
+        if len(nums) < 4:
+            return []
+        return [(np.array(nums[: len(nums) // 2 * 2]).reshape(-1, 2), tag == "polygon")]
+    if tag == "line":
+        return [
+            (
+                np.array(
+                    [
+                        [_float(attrib.get("x1")), _float(attrib.get("y1"))],
+                        [_float(attrib.get("x2")), _float(attrib.get("y2"))],
+                    ]
+                ),
+                False,
+            )
+        ]
+    return []
+
+
+def _apply(matrix, points):
+    return points @ matrix[:2, :2].T + matrix[:2, 2]
+
+
+def polygon_edges(polygons):
+    """Closed polygons (lists of points) -> (N, 4) array of x0, y0, x1, y1."""
+    polygons = [p for p in polygons if len(p) >= 3]
+    if not polygons:
+        return np.zeros((0, 4))
+    points = np.vstack(polygons)
+    # Each point's successor, wrapping around within its own polygon
+    nxt = np.arange(1, len(points) + 1)
+    ends = np.cumsum([len(p) for p in polygons])
+    nxt[ends - 1] = ends - np.array([len(p) for p in polygons])
+    return np.hstack([points, points[nxt]])
+
+
+def rasterize(edges, shape, evenodd=False):
+    """Scanline point-sampling of closed polygon edges -> bool mask (h, w).
+
+    Each edge adds its direction at the first sample right of where it crosses
+    a sample row; a cumulative sum along the row then gives the winding number
+    at every sample at once.
+    """
+    h, w = shape
+    e = edges[edges[:, 1] != edges[:, 3]]
+    if not len(e):
+        return np.zeros(shape, dtype=bool)
+
+    x0, y0, x1, y1 = e.T
+    direction = np.where(y1 > y0, 1, -1)
+    ymin, ymax = np.minimum(y0, y1), np.maximum(y0, y1)
+    # Sample rows sit at y = r + 0.5; an edge covers rows with ymin <= y < ymax
+    r0 = np.clip(np.ceil(ymin - 0.5), 0, h).astype(np.int64)
+    r1 = np.clip(np.ceil(ymax - 0.5), 0, h).astype(np.int64)
+    counts = np.maximum(r1 - r0, 0)
+    total = int(counts.sum())
+    if not total:
+        return np.zeros(shape, dtype=bool)
+    idx = np.repeat(np.arange(len(e)), counts)
+    offsets = np.cumsum(counts) - counts
+    rows = r0[idx] + np.arange(total) - offsets[idx]
+    yc = rows + 0.5
+    xc = x0[idx] + (yc - y0[idx]) * (x1[idx] - x0[idx]) / (y1[idx] - y0[idx])
+    cols = np.clip(np.ceil(xc - 0.5), 0, w).astype(np.int64)
+
+    acc = np.zeros((h, w + 1), dtype=np.int32)
+    np.add.at(acc, (rows, cols), 1 if evenodd else direction[idx])
+    winding = np.cumsum(acc, axis=1)[:, :w]
+    return (winding % 2 == 1) if evenodd else (winding != 0)
+
+
+def stroke_quads(points, closed, width):
+    """(N, 4, 2) quads, one per segment, all wound the same way.
+
+    With a consistent winding, nonzero filling of all quads is their union.
+    """
+    if closed:
+        points = np.vstack([points, points[:1]])
+    p0, p1 = points[:-1], points[1:]
+    d = p1 - p0
+    length = np.hypot(d[:, 0], d[:, 1])
+    keep = length > 0
+    p0, p1, d, length = p0[keep], p1[keep], d[keep], length[keep]
+    n = np.stack([-d[:, 1], d[:, 0]], axis=1) / length[:, None] * (width / 2)
+    return np.stack([p0 + n, p1 + n, p1 - n, p0 - n], axis=1)
+
+
+def quad_edges(quads):
+    """(N, 4, 2) quads -> (N * 4, 4) edges, flipping clockwise ones."""
+    x, y = quads[..., 0], quads[..., 1]
+    area = (x * np.roll(y, -1, axis=1) - y * np.roll(x, -1, axis=1)).sum(axis=1)
+    quads = np.where((area < 0)[:, None, None], quads[:, ::-1], quads)
+    return np.concatenate([quads, np.roll(quads, -1, axis=1)], axis=2).reshape(-1, 4)
+
+
+def _parse_style(value):
+    res = {}
+    for item in (value or "").split(";"):
+        if ":" in item:
+            k, v = item.split(":", 1)
+            res[k.strip()] = v.strip()
+    return res
+
+
+def _parse_css(text):
+    """Simple `.class`, `#id` and `tag` rules from <style> elements."""
+    rules = {}
+    text = re.sub(r"/\*.*?\*/", "", text or "", flags=re.S)
+    for selectors, body in re.findall(r"([^{}]+)\{([^}]*)\}", text):
+        decl = _parse_style(body)
+        for selector in selectors.split(","):
+            rules.setdefault(selector.strip(), {}).update(decl)
+    return rules
+
+
+def normalize_color(value, gradients=None):
+    """CSS color -> "#RRGGBB", or None for none/unknown paint."""
+    if not value:
+        return None
+    value = value.strip()
+    if value == "none" or value == "transparent":
+        return None
+    match = re.match(r"url\(\s*#([^)\s]+)\s*\)", value)
+    if match:
+        return (gradients or {}).get(match.group(1))
+    try:
+        rgb = ImageColor.getrgb(value)
+    except ValueError:
+        return None
+    return "#{:02X}{:02X}{:02X}".format(*rgb[:3])
+
+
+class FlagRasterizer:
+    """Paints an SVG flag onto a coarse grid of color indices."""
+
+    def __init__(self, root, grid_width=GRID_WIDTH):
+        self.root = root
+        self.by_id = {}
+        css = {}
+        for elem in root.iter():
+            if "id" in elem.attrib:
+                self.by_id[elem.attrib["id"]] = elem
+            if _local(elem.tag) == "style":
+                for k, v in _parse_css(elem.text).items():
+                    css.setdefault(k, {}).update(v)
+        self.css = css
+        self.gradients = self._gradients()
+
+        vb = [
+            _float(v) for v in re.split(r"[\s,]+", root.get("viewBox", "").strip()) if v
+        ]
+        if len(vb) == 4 and vb[2] > 0 and vb[3] > 0:
+            vx, vy, vw, vh = vb
+        else:
+            vx, vy = 0.0, 0.0
+            vw = _float(root.get("width"), 0) or 900.0
+            vh = _float(root.get("height"), 0) or 600.0
+        self.shape = (max(1, round(grid_width * vh / vw)), grid_width)
+        base = IDENTITY.copy()
+        base[0, 0] = grid_width / vw
+        base[1, 1] = self.shape[0] / vh
+        self.base = base @ _translate(-vx, -vy)
+
+        self.colors = []
+        self.labels = np.full(self.shape, -1, dtype=np.int32)
+
+    def _gradients(self):
+        """Gradient id -> the average color of its stops."""
+        res = {}
+        for elem in self.root.iter():
+            if _local(elem.tag) not in ("linearGradient", "radialGradient"):
+                continue
+            source = elem
+            for _ in range(4):
+                stops = [s for s in source if _local(s.tag) == "stop"]
+                if stops:
+                    break
+                href = source.get("href") or source.get(
+                    "{http://www.w3.org/1999/xlink}href"
+                )
+                source = self.by_id.get((href or "#")[1:])
+                if source is None:
+                    break
+            rgbs = []
+            for stop in stops:
+                style = _parse_style(stop.get("style"))
+                color = normalize_color(style.get("stop-color", stop.get("stop-color")))
+                if color:
+                    rgbs.append(ImageColor.getrgb(color))
+            if rgbs and "id" in elem.attrib:
+                mean = np.mean(rgbs, axis=0).round().astype(int)
+                res[elem.attrib["id"]] = "#{:02X}{:02X}{:02X}".format(*mean)
+        return res
+
+    def _color_index(self, color):
+        if color not in self.colors:
+            self.colors.append(color)
+        return self.colors.index(color)
+
+    def _style(self, elem, inherited):
+        """Computed properties: inherited ones, attributes, CSS, then style=""."""
+        style = {k: v for k, v in inherited.items() if k in INHERITED}
+        style["opacity"] = inherited.get("opacity", 1.0)
+        props = {k.rsplit("}", 1)[-1]: v for k, v in elem.attrib.items()}
+        tag = _local(elem.tag)
+        for selector in (
+            [tag]
+            + ["." + c for c in props.get("class", "").split()]
+            + (["#" + props["id"]] if "id" in props else [])
+        ):
+            props.update(self.css.get(selector, {}))
+        props.update(_parse_style(props.get("style")))
+        for key in INHERITED | {"display", "clip-path"}:
+            if key in props and props[key] != "inherit":
+                style[key] = props[key]
+        style["opacity"] *= _float(props.get("opacity"), 1.0)
+        return style
+
+    def _clip_mask(self, ref, matrix):
+        match = re.match(r"url\(\s*#([^)\s]+)\s*\)", ref or "")
+        clip = self.by_id.get(match.group(1)) if match else None
+        if clip is None:
+            return None
+        polygons = []
+        for child in clip.iter():
+            if child is clip:
+                continue
+            tag = _local(child.tag)
+            m = (
+                matrix
+                @ parse_transform(clip.get("transform"))
+                @ parse_transform(child.get("transform"))
+            )
+            if tag == "use":
+                child, m = self._resolve_use(child, m)
+                if child is None:
+                    continue
+                tag = _local(child.tag)
+            for points, _ in shape_geometry(tag, child.attrib):
+                polygons.append(_apply(m, points))
+        return rasterize(polygon_edges(polygons), self.shape)
+
+    def _resolve_use(self, elem, matrix):
+        href = elem.get("href") or elem.get("{http://www.w3.org/1999/xlink}href")
+        target = self.by_id.get((href or "#")[1:])
+        if target is None:
+            return None, matrix
+        x, y = _float(elem.get("x")), _float(elem.get("y"))
+        return target, matrix @ _translate(x, y)
+
+    def paint(self, elem=None, matrix=None, inherited=None, clip=None, depth=0):
+        if elem is None:
+            elem, matrix, inherited = self.root, self.base, {"fill": "black"}
+        if depth > 32:
+            return
+        tag = _local(elem.tag)
+        if tag in SKIP_TAGS:
+            return
+        style = self._style(elem, inherited)
+        if style.get("display") == "none":
+            return
+        matrix = matrix @ parse_transform(elem.get("transform"))
+        if "clip-path" in style and style["clip-path"] != "none":
+            mask = self._clip_mask(style.pop("clip-path"), matrix)
+            if mask is not None:
+                clip = mask if clip is None else clip & mask
+
+        if tag == "use":
+            target, m = self._resolve_use(elem, matrix)
+            if target is not None:
+                self.paint(target, m, style, clip, depth + 1)
+            return
+        if tag in ("svg", "g", "a", "switch") or tag == "":
+            for child in elem:
+                self.paint(child, matrix, style, clip, depth + 1)
+            return
+
+        geometry = shape_geometry(tag, elem.attrib)
+        if not geometry or style.get("visibility") == "hidden":
+            return
+
+        fill = normalize_color(style.get("fill"), self.gradients)
+        fill_alpha = style["opacity"] * _float(style.get("fill-opacity"), 1.0)
+        if fill and fill_alpha >= 0.5 and tag != "line":
+            edges = polygon_edges([_apply(matrix, p) for p, _ in geometry])
+            evenodd = style.get("fill-rule") == "evenodd"
+            self._put(rasterize(edges, self.shape, evenodd), fill, clip)
+
+        stroke = normalize_color(style.get("stroke"), self.gradients)
+        stroke_alpha = style["opacity"] * _float(style.get("stroke-opacity"), 1.0)
+        width = _float(style.get("stroke-width"), 1.0)
+        if stroke and stroke_alpha >= 0.5 and width > 0:
+            quads = np.concatenate(
+                [stroke_quads(p, closed, width) for p, closed in geometry]
+            )
+            if len(quads):
+                quads = _apply(matrix, quads.reshape(-1, 2)).reshape(-1, 4, 2)
+                self._put(rasterize(quad_edges(quads), self.shape), stroke, clip)
+
+    def _put(self, mask, color, clip):
+        if clip is not None:
+            mask = mask & clip
+        if mask.any():
+            self.labels[mask] = self._color_index(color)
+
+
+def rasterize_flag(source, grid_width=GRID_WIDTH):
+    """SVG file -> (labels grid of color indices, list of "#RRGGBB")."""
+    root = ET.parse(source).getroot()
+    raster = FlagRasterizer(root, grid_width)
+    raster.paint()
+    return raster.labels, raster.colors
+
+
+def _stripe_axis(labels):
+    """0 for horizontal stripes (colors change going down), 1 for vertical."""
+    down = np.count_nonzero(labels[1:] != labels[:-1]) / max(1, labels.shape[1])
+    across = np.count_nonzero(labels[:, 1:] != labels[:, :-1]) / max(1, labels.shape[0])
+    return 0 if down > across else 1
+
+
+def palette_from_labels(labels, colors):
+    """Colors ordered along the stripe axis and repeated in proportion to area.
+
+    Every slice across the stripe axis votes for its dominant color, and runs
+    of the same winner become stripes. Colors that cover enough area but never
+    win a slice (a disc, a canton) are inserted at their centroid, splitting
+    the stripe they sit in. Stripes are repeated by their width relative to
+    the thinnest one; sequences longer than MAX_COLORS collapse to unique
+    colors in order of first appearance.
+    """
+    total = labels.size
+    counts = np.bincount(labels[labels >= 0].ravel(), minlength=len(colors))
+    if not counts.sum():
+        return []
+    significant = [i for i in range(len(colors)) if counts[i] / total >= MIN_AREA]
+    if not significant:
+        significant = [int(np.argmax(counts))]
+
+    axis = _stripe_axis(labels)
+    slices = labels if axis == 0 else labels.T
+    n = slices.shape[0]
+    per_slice = np.stack([(slices == i).sum(axis=1) for i in significant], axis=1)
+    winners = np.array(significant)[np.argmax(per_slice, axis=1)]
+
+    # Run-length encode the winners along the axis
+    runs = []
+    for i, color in enumerate(winners):
+        if runs and runs[-1][0] == color:
+            runs[-1][1] += 1
+        else:
+            runs.append([int(color), 1, i])
+    # Absorb slivers (anti-aliasing seams, thin borders) into a neighbor
+    min_len = max(1, MIN_RUN * n)
+    merged = []
+    for run in runs:
+        if run[1] < min_len and merged:
+            merged[-1][1] += run[1]
+        elif merged and merged[-1][0] == run[0]:
+            merged[-1][1] += run[1]
+        else:
+            merged.append(run)
+    if len(merged) > 1 and merged[0][1] < min_len:
+        merged[1][1] += merged[0][1]
+        merged[1][2] = merged[0][2]
+        merged.pop(0)
+    stripes = [[c, length, start, False] for c, length, start in merged]
+    thinnest = min(s[1] for s in stripes)
+
+    # Insert colors that matter by area but never dominate a slice
+    coords = np.indices(slices.shape)[0] + 0.5
+    for i in significant:
+        if any(s[0] == i for s in stripes):
+            continue
+        center = coords[slices == i].mean()
+        for k, (c, length, start, _) in enumerate(stripes):
+            if start <= center < start + length:
+                before = [c, center - start, start, False]
+                after = [c, start + length - center, center, False]
+                stripes[k : k + 1] = [before, [i, 0, center, True], after]
+                break
+
+    sequence = []
+    for c, length, _, emblem in stripes:
+        if emblem:
+            sequence.append(c)
+        elif length > 0:
+            sequence.extend([c] * max(1, round(length / thinnest)))
+    if len(sequence) > MAX_COLORS:
+        sequence = list(dict.fromkeys(sequence))
+    return [colors[c] for c in sequence]
+
+
+def flag_palette(source, grid_width=GRID_WIDTH):
+    labels, colors = rasterize_flag(source, grid_width)
+    return palette_from_labels(labels, colors)
@@ -0,0 +1,214 @@
+import os
+import json
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# Glyphs are keyed by codepoint: Pillow does not expose glyph indices, and in the
+# simple-script cases the atlas serves, the cmap maps each codepoint to one glyph.
+SIMPLE_RANGES = [
+    (0x0020, 0x052F),  # Latin, Greek, Cyrillic
+    (0x1E00, 0x1EFF),  # Latin Extended Additional (Vietnamese)
+]
+
+
+def is_simple_text(text):
+    """True if text can be laid out glyph by glyph without shaping."""
+    for char in text:
+        code = ord(char)
+        if not any(start <= code <= end for start, end in SIMPLE_RANGES):
+            return False
+        if unicodedata.combining(char):
+            return False
+    return True
+
+
+class GlyphAtlas:
+    """Rasterized glyph coverage bitmaps packed into one contiguous buffer.
+
+    Entries are evicted least-recently-used first; survivors are compacted to
+    the front of the buffer so it never fragments. The atlas can optionally be
+    spilled to disk and reloaded by later runs.
+    """
+
+    def __init__(self, capacity=8 * 1024 * 1024, spill_dir=None):
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=np.uint8)
+        self.used = 0
+        # key -> [offset, width, height, left, top, advance]
+        self.entries = OrderedDict()
+        self.fonts = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spill_dir = None
+        if spill_dir:
+            self.attach_spill(spill_dir)
+
+    def attach_spill(self, spill_dir):
+        """Load glyphs spilled by earlier runs and save back to the same place."""
+        self.spill_dir = spill_dir
+        self.load(spill_dir)
+
+    def _font(self, font_path, font_size):
+        key = (font_path, font_size)
+        if key not in self.fonts:
+            self.fonts[key] = ImageFont.truetype(font_path, font_size)
+        return self.fonts[key]
+
+    def _evict(self, needed):
+        """Drop LRU entries until `needed` bytes fit, then compact the survivors."""
+        target = min(self.capacity - needed, self.capacity * 3 // 4)
+        live = self.used
+        while self.entries and live > target:
+            _, entry = self.entries.popitem(last=False)
+            live -= entry[1] * entry[2]
+            self.evictions += 1
+        self._compact()
+
+    def _compact(self):
+        """Slide live bitmaps down to the front of the buffer, closing gaps."""
+        offset = 0
+        for entry in sorted(self.entries.values(), key=lambda e: e[0]):
+            nbytes = entry[1] * entry[2]
+            if entry[0] != offset:
+                self.buffer[offset : offset + nbytes] = self.buffer[
+                    entry[0] : entry[0] + nbytes
+                ]
+                entry[0] = offset
+            offset += nbytes
+        self.used = offset
+
+    def _store(self, key, bitmap, left, top, advance):
+        h, w = bitmap.shape
+        nbytes = w * h
+        if nbytes > self.capacity:
+            return None
+        if self.used + nbytes > self.capacity:
+            self._evict(nbytes)
+        offset = self.used
+        self.buffer[offset : offset + nbytes] = bitmap.ravel()
+        self.used += nbytes
+        entry = [offset, w, h, left, top, advance]
+        self.entries[key] = entry
+        return entry
+
+    def get(self, font_path, font_size, char):
+        """Returns [offset, width, height, left, top, advance] for one glyph."""
+        key = (font_path, font_size, ord(char))
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        font = self._font(font_path, font_size)
+        left, top, right, bottom = font.getbbox(char)
+        bitmap = np.zeros((max(0, bottom - top), max(0, right - left)), np.uint8)
+        if bitmap.size:
+            glyph = Image.new("L", (bitmap.shape[1], bitmap.shape[0]), 0)
+            ImageDraw.Draw(glyph).text((-left, -top), char, font=font, fill=255)
+            bitmap = np.asarray(glyph)
+        entry = self._store(key, bitmap, left, top, font.getlength(char))
+        if entry is None:
+            entry = [0, 0, 0, left, top, font.getlength(char)]
+        return entry
+
+    def bitmap(self, entry):
+        offset, w, h = entry[:3]
+        return self.buffer[offset : offset + w * h].reshape(h, w)
+
+    def render(self, text, font_path, font_size, size, origin):
+        """Blit text into a new L mask of `size` with the pen at `origin`.
+
+        Returns None when the text needs shaping or kerning, in which case the
+        caller must rasterize it directly.
+        """
+        if not is_simple_text(text):
+            return None
+
+        mask = np.zeros((size[1], size[0]), dtype=np.int32)
+        pen_x, pen_y = origin
+        pen = 0.0
+        for char in text:
+            # Blit right after the lookup: a later miss may compact the buffer
+            entry = self.get(font_path, font_size, char)
+            if entry[1] and entry[2]:
+                x = pen_x + int(pen) + entry[3]
+                y = pen_y + entry[4]
+                bitmap = self.bitmap(entry)
+                x0, y0 = max(x, 0), max(y, 0)
+                x1 = min(x + bitmap.shape[1], size[0])
+                y1 = min(y + bitmap.shape[0], size[1])
+                if x1 > x0 and y1 > y0:
+                    src = bitmap[y0 - y : y1 - y, x0 - x : x1 - x].astype(np.int32)
+                    dst = mask[y0:y1, x0:x1]
+                    # Overlapping coverage is merged the way FreeType output is
+                    # composed by Pillow: a + b - a * b / 255
+                    tmp = dst * src + 128
+                    dst += src - (((tmp >> 8) + tmp) >> 8)
+            pen += entry[5]
+
+        # Kerning or a shaping engine moved glyphs: direct rendering only
+        if pen != self._font(font_path, font_size).getlength(text):
+            return None
+        return Image.fromarray(mask.astype(np.uint8))
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "used_bytes": self.used,
+            "capacity_bytes": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def save(self, spill_dir=None):
+        """Spill the atlas to disk as a raw buffer plus a JSON index."""
+        spill_dir = spill_dir or self.spill_dir
+        if not spill_dir:
+            return
+        os.makedirs(spill_dir, exist_ok=True)
+        np.save(os.path.join(spill_dir, "glyph_atlas.npy"), self.buffer[: self.used])
+        font_mtimes = {
+            path: os.path.getmtime(path)
+            for path, _, _ in self.entries
+            if os.path.exists(path)
+        }
+        index = {
+            "fonts": font_mtimes,
+            "entries": [list(key) + entry for key, entry in self.entries.items()],
+        }
+        with open(os.path.join(spill_dir, "glyph_atlas.json"), "w") as f:
+            json.dump(index, f)
+
+    def load(self, spill_dir):
+        """Reload a spilled atlas, skipping glyphs of fonts that changed since."""
+        index_path = os.path.join(spill_dir, "glyph_atlas.json")
+        buffer_path = os.path.join(spill_dir, "glyph_atlas.npy")
+        if not os.path.exists(index_path) or not os.path.exists(buffer_path):
+            return
+        try:
+            with open(index_path, "r") as f:
+                index = json.load(f)
+            data = np.load(buffer_path)
+        except Exception:
+            return
+
+        for font_path, font_size, code, offset, w, h, left, top, advance in index[
+            "entries"
+        ]:
+            if not os.path.exists(font_path):
+                continue
+            if os.path.getmtime(font_path) != index["fonts"].get(font_path):
+                continue
+            bitmap = data[offset : offset + w * h].reshape(h, w)
+            self._store((font_path, font_size, code), bitmap, left, top, advance)
+
+
+# Shared by every renderer in the process
+GLYPH_ATLAS = GlyphAtlas()
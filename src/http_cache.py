@@ -0,0 +1,273 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import threading
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import get_path
+
+HTTP_CACHE_DIR = get_path(".cache/http")
+DEFAULT_TTL = 24 * 60 * 60
+# cache:  serve fresh entries, revalidate stale ones with ETag/Last-Modified
+# record: always hit the network and store every successful response, images included
+# replay: never hit the network; a missing entry is an error
+# off:    plain requests
+MODES = ["cache", "record", "replay", "off"]
+
+
+class CacheMiss(requests.ConnectionError):
+    """Raised in replay mode for a request that was never recorded."""
+
+
+class CachedResponse:
+    """The subset of requests.Response the refill code uses, served from disk."""
+
+    from_cache = True
+
+    def __init__(self, entry, body_path):
+        self.url = entry["url"]
+        self.status_code = entry["status"]
+        self.headers = CaseInsensitiveDict(entry["headers"])
+        self.body_path = body_path
+        self._content = None
+
+    @property
+    def content(self):
+        if self._content is None:
+            with open(self.body_path, "rb") as f:
+                self._content = f.read()
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", "replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=1):
+        with open(self.body_path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} for url: {self.url}")
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class HttpCache:
+    """On-disk cache for GET requests made through a requests.Session.
+
+    Entries are keyed by URL and query parameters only, so credentials in
+    request headers never end up on disk. Each entry is a JSON file with the
+    status and response headers next to a raw body file; pointing cache_dir at
+    a fixtures folder and recording once lets refills run entirely offline in
+    replay mode.
+
+    Freshness follows the response's Cache-Control: max-age when present,
+    ttl when absent, no-cache responses are revalidated on every use and
+    no-store ones are never kept (except in record mode, whose whole point is
+    keeping fixtures). host_ttls maps hosts whose max-age should be ignored
+    to the seconds to use instead.
+    """
+
+    def __init__(
+        self, cache_dir=HTTP_CACHE_DIR, ttl=DEFAULT_TTL, mode="cache", host_ttls=None
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown HTTP cache mode: {mode}")
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.host_ttls = dict(host_ttls or {})
+        self.mode = mode
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(url, params=None):
+        if params:
+            url = f"{url}?{urlencode(sorted(params.items()))}"
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + ".json", base + ".body"
+
+    def _load(self, key):
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(body_path):
+            return None
+        return entry
+
+    def _save(self, key, entry, body=None):
+        meta_path, body_path = self._paths(key)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        if body is not None:
+            with open(body_path + ".tmp", "wb") as f:
+                f.write(body)
+            os.replace(body_path + ".tmp", body_path)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump(entry, f, indent=1)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    @staticmethod
+    def cache_control(headers):
+        """{directive: value} of a Cache-Control header, names lowercased."""
+        directives = {}
+        value = CaseInsensitiveDict(headers).get("Cache-Control", "")
+        for part in value.split(","):
+            name, _, arg = part.strip().partition("=")
+            if name:
+                directives[name.lower()] = arg.strip('"')
+        return directives
+
+    def _freshness(self, url, headers):
+        """Seconds a response from url stays fresh."""
+        host = urlsplit(url).hostname
+        if host in self.host_ttls:
+            return self.host_ttls[host]
+        directives = self.cache_control(headers)
+        if "no-cache" in directives:
+            return 0
+        if re.fullmatch(r"\d+", directives.get("max-age", "")):
+            return int(directives["max-age"])
+        return self.ttl
+
+    def _storable(self, headers):
+        return self.mode == "record" or "no-store" not in self.cache_control(headers)
+
+    def _entry(self, url, params, response):
+        headers = dict(response.headers)
+        return {
+            "url": url,
+            "params": params or {},
+            "status": response.status_code,
+            "headers": headers,
+            "stored_at": time.time(),
+            "fresh_for": self._freshness(url, headers),
+        }
+
+    def _discard(self, key):
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(
+        self,
+        session,
+        url,
+        params=None,
+        headers=None,
+        before_request=None,
+        fixture_only=False,
+        **kwargs,
+    ):
+        """GET through the cache; returns a requests.Response or CachedResponse.
+
+        before_request is called right before anything goes out on the network
+        (e.g. a rate limiter's wait). Responses that really hit the network have
+        from_cache set to False. fixture_only marks large immutable downloads
+        that are only stored while recording and only served while replaying.
+        """
+        key = self.key(url, params)
+        entry = None
+        if self.mode in ("cache", "replay") and not (
+            fixture_only and self.mode == "cache"
+        ):
+            entry = self._load(key)
+
+        if self.mode == "replay":
+            if entry is None:
+                raise CacheMiss(f"No recorded response for {url} {params or ''}")
+            self._count("hits")
+            return CachedResponse(entry, self._paths(key)[1])
+
+        if (
+            entry is not None
+            and self.mode == "cache"
+            and time.time() < entry["stored_at"] + entry["fresh_for"]
+        ):
+            self._count("hits")
+            return CachedResponse(entry, self._paths(key)[1])
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            stored = CaseInsensitiveDict(entry["headers"])
+            if stored.get("ETag"):
+                request_headers["If-None-Match"] = stored["ETag"]
+            if stored.get("Last-Modified"):
+                request_headers["If-Modified-Since"] = stored["Last-Modified"]
+
+        if before_request:
+            before_request()
+        response = session.get(url, params=params, headers=request_headers, **kwargs)
+        response.from_cache = False
+
+        if self.mode == "off" or (fixture_only and self.mode == "cache"):
+            return response
+
+        if response.status_code == 304 and entry is not None:
+            self._count("revalidated")
+            # A 304 refreshes the stored headers and restarts the freshness clock
+            entry["headers"].update(response.headers)
+            entry["stored_at"] = time.time()
+            entry["fresh_for"] = self._freshness(url, entry["headers"])
+            cached = CachedResponse(entry, self._paths(key)[1])
+            cached.from_cache = False
+            if self._storable(response.headers):
+                self._save(key, entry)
+            else:
+                # Read the body before the entry goes
+                cached.content
+                self._discard(key)
+            return cached
+
+        self._count("misses")
+        if response.status_code == 200 and self._storable(response.headers):
+            # Storing reads the whole body; record mode is not the fast path
+            self._save(key, self._entry(url, params, response), response.content)
+        elif response.status_code == 200 and entry is not None:
+            self._discard(key)
+        return response
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+        }
@@ -0,0 +1,149 @@
+import os
+import sys
+import argparse
+import tempfile
+from PIL import Image
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import MAX_ASSET_DIMENSION
+from src.asset_index import AssetIndex, ASSET_DIRS
+
+CHUNK_SIZE = 64 * 1024
+# Anything smaller is a thumbnail or placeholder
+MIN_IMAGE_BYTES = 10000
+
+# Pexels and Wikimedia serve JPEGs at about quality 70-75; re-encoding higher only
+# grows the file
+SAVE_OPTIONS = {
+    "JPEG": {"quality": 75, "optimize": True},
+    "PNG": {"optimize": True},
+    "WEBP": {"quality": 80},
+}
+
+
+def sniff_format(head):
+    """Identify an image format from its first bytes, or None."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "JPEG"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "GIF"
+    return None
+
+
+def downscale(path, max_dimension, fmt=None):
+    """Re-encode path in place so its shorter side is at most max_dimension.
+
+    Returns True if the file was rewritten.
+    """
+    with Image.open(path) as img:
+        fmt = fmt or img.format
+        if fmt not in SAVE_OPTIONS or min(img.size) <= max_dimension:
+            return False
+        scale = max_dimension / min(img.size)
+        new_size = (
+            max(1, round(img.width * scale)),
+            max(1, round(img.height * scale)),
+        )
+        # JPEG can decode straight to 1/2..1/8 scale, never below new_size
+        img.draft(img.mode, new_size)
+        if img.mode == "P":
+            img = img.convert("RGBA")
+        small = img.resize(new_size, Image.Resampling.LANCZOS)
+
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=f".{name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            small.save(f, fmt, **SAVE_OPTIONS[fmt])
+        os.chmod(tmp_path, os.stat(path).st_mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+def stream_image(
+    chunks, target_path, max_dimension=MAX_ASSET_DIMENSION, min_bytes=MIN_IMAGE_BYTES
+):
+    """Write an image download to target_path without holding it in memory.
+
+    Chunks go to a hidden temp file next to the target. The format is sniffed
+    from the first bytes so error pages are abandoned early, and only the image
+    header is parsed before the file is renamed into place. With max_dimension
+    the image is downscaled and re-encoded first. Raises ValueError for
+    anything that is not a usable image; target_path is never left half-written.
+    """
+    directory, name = os.path.split(target_path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=f".{name}.")
+    try:
+        fmt = None
+        head = b""
+        size = 0
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                if fmt is None:
+                    head += chunk
+                    if len(head) >= 12:
+                        fmt = sniff_format(head)
+                        if fmt is None:
+                            raise ValueError("response is not an image")
+                f.write(chunk)
+                size += len(chunk)
+
+        fmt = fmt or sniff_format(head)
+        if fmt is None:
+            raise ValueError("response is not an image")
+        if size < min_bytes:
+            raise ValueError(f"image is too small ({size} bytes)")
+        with Image.open(tmp_path) as img:
+            if img.format != fmt or not all(img.size):
+                raise ValueError("image header is corrupt")
+
+        if max_dimension:
+            downscale(tmp_path, max_dimension, fmt)
+        # mkstemp files are private to the user; assets are not
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, target_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return target_path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Downscale existing background assets in place"
+    )
+    parser.add_argument("--max_dimension", type=int, default=MAX_ASSET_DIMENSION)
+    args = parser.parse_args()
+
+    index = AssetIndex.load()
+    before = after = shrunk = 0
+    for assets_dir in ASSET_DIRS:
+        for rel_path in index.files(assets_dir):
+            path = index.abs(rel_path)
+            before += os.path.getsize(path)
+            try:
+                if downscale(path, args.max_dimension):
+                    index.add(path)
+                    shrunk += 1
+            except Exception as e:
+                print(f"Error downscaling {path}: {e}")
+            after += os.path.getsize(path)
+    index.save()
+    print(f"Downscaled {shrunk} images: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
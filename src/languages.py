@@ -0,0 +1,187 @@
+import os
+import json
+import pickle
+from collections import namedtuple
+from PIL import ImageColor
+
+# This module is imported by src.utils, so it resolves its own paths
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LANGUAGES_PATH = os.path.join(ROOT_DIR, "languages.json")
+FLAG_COLORS_PATH = os.path.join(ROOT_DIR, "flag_colors.json")
+COMPILED_PATH = os.path.join(ROOT_DIR, ".cache/languages.pickle")
+# Bump when the compiled layout changes
+COMPILED_VERSION = 1
+
+DEFAULT_FLAG_COLORS = ((255, 255, 255),)
+
+# Everything the renderer needs to know about one language code. country,
+# region and font are None when languages.json does not say; sort_key orders
+# priority languages first, then by region, then by code.
+Language = namedtuple(
+    "Language",
+    ["code", "country", "region", "eponym", "font", "flag_colors", "sort_key"],
+)
+
+
+def flag_key(country):
+    """Key of a country folder name in flag_colors.json, e.g. South_Korea."""
+    return "_".join(w.capitalize() for w in country.split("_"))
+
+
+class LanguageRegistry:
+    """Per-language lookups compiled from languages.json and flag_colors.json.
+
+    Compiling resolves each code's country, region, eponym, font, flag colors
+    (as RGB tuples) and sort key once, so every lookup is a single dict access.
+    The compiled form is pickled under .cache and reused while both sources
+    are unchanged; get_registry() loads it on first use, never at import.
+    """
+
+    def __init__(self, languages, eponyms, regions, priority, default_flag_colors):
+        self.languages = languages
+        self.eponyms = eponyms
+        self.regions = regions
+        self.priority = priority
+        self.default_flag_colors = default_flag_colors
+        # Unknown codes sort like languages without a country: in "Global"
+        self.default_rank = (
+            regions.index("Global") if "Global" in regions else len(regions)
+        )
+
+    @classmethod
+    def compile(cls, source=LANGUAGES_PATH, flag_colors_path=FLAG_COLORS_PATH):
+        with open(source, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        try:
+            with open(flag_colors_path, "r") as f:
+                flag_colors = json.load(f)
+        except (OSError, ValueError):
+            flag_colors = {}
+
+        regions = data["regions"]
+        priority = {code: i for i, code in enumerate(data["priority"])}
+        region_rank = {region: i for i, region in enumerate(regions)}
+        countries = data["countries"]
+        eponyms = {c: v["eponym"] for c, v in countries.items() if "eponym" in v}
+
+        def rgb_colors(country):
+            colors = flag_colors.get(flag_key(country))
+            if not colors:
+                return DEFAULT_FLAG_COLORS
+            return tuple(ImageColor.getrgb(c)[:3] for c in colors)
+
+        languages = {}
+        for code, entry in data["languages"].items():
+            country = entry.get("country")
+            region = countries.get(country, {}).get("region") if country else None
+            languages[code] = Language(
+                code=code,
+                country=country,
+                region=region,
+                eponym=eponyms.get(country, country),
+                font=entry.get("font"),
+                flag_colors=rgb_colors(country or "global"),
+                sort_key=(
+                    priority.get(code, len(priority)),
+                    region_rank.get(region or "Global", len(region_rank)),
+                    code,
+                ),
+            )
+        return cls(languages, eponyms, regions, data["priority"], rgb_colors("global"))
+
+    @classmethod
+    def load(
+        cls,
+        source=LANGUAGES_PATH,
+        flag_colors_path=FLAG_COLORS_PATH,
+        compiled_path=COMPILED_PATH,
+    ):
+        """The compiled registry, recompiling when either source changed."""
+        stamp = [COMPILED_VERSION]
+        for path in (source, flag_colors_path):
+            try:
+                st = os.stat(path)
+                stamp.append((path, st.st_size, st.st_mtime))
+            except OSError:
+                stamp.append((path, None, None))
+
+        try:
+            with open(compiled_path, "rb") as f:
+                cached_stamp, registry = pickle.load(f)
+            if cached_stamp == stamp:
+                return registry
+        except Exception:
+            pass
+
+        registry = cls.compile(source, flag_colors_path)
+        try:
+            os.makedirs(os.path.dirname(compiled_path), exist_ok=True)
+            with open(compiled_path + ".tmp", "wb") as f:
+                pickle.dump((stamp, registry), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(compiled_path + ".tmp", compiled_path)
+        except OSError:
+            pass
+        return registry
+
+    def get(self, code):
+        return self.languages.get(code)
+
+    def country(self, code, default=None):
+        language = self.languages.get(code)
+        return (language and language.country) or default
+
+    def countries(self):
+        """Every country some language maps to."""
+        return sorted({l.country for l in self.languages.values() if l.country})
+
+    def eponym(self, country):
+        return self.eponyms.get(country, country)
+
+    def font(self, code):
+        language = self.languages.get(code)
+        return language and language.font
+
+    def flag_colors(self, code):
+        language = self.languages.get(code)
+        return language.flag_colors if language else self.default_flag_colors
+
+    def sample(self, codes, count):
+        """Up to count of codes, taken round-robin across regions.
+
+        Codes keep their relative order within a region and in the result.
+        """
+        if len(codes) <= count:
+            return list(codes)
+        by_region = {}
+        for code in codes:
+            language = self.languages.get(code)
+            region = (language and language.region) or "Global"
+            by_region.setdefault(region, []).append(code)
+        queues = [by_region[r] for r in self.regions if r in by_region]
+        queues += [q for r, q in by_region.items() if r not in self.regions]
+
+        chosen = set()
+        depth = 0
+        while len(chosen) < count:
+            for queue in queues:
+                if depth < len(queue) and len(chosen) < count:
+                    chosen.add(queue[depth])
+            depth += 1
+        return [code for code in codes if code in chosen]
+
+    def sort_key(self, code):
+        language = self.languages.get(code)
+        if language is None:
+            return (len(self.priority), self.default_rank, code)
+        return language.sort_key
+
+
+_REGISTRY = None
+
+
+def get_registry():
+    """The process-wide LanguageRegistry, loaded on first use."""
+    global _REGISTRY
+    if _REGISTRY is None:
+        _REGISTRY = LanguageRegistry.load()
+    return _REGISTRY
@@ -0,0 +1,53 @@
+import numpy as np
+from collections import namedtuple
+from PIL import Image
+
+# A pre-rendered RGBA overlay. `offset` is where the layer's top-left corner sits
+# relative to the anchor point the caller composites it at.
+Layer = namedtuple("Layer", ["image", "offset"])
+
+_LAYER_CACHE = {}
+
+
+def get_layer(key, builder):
+    """Return the cached layer for key, calling builder() on first use.
+
+    Keys should capture everything the layer's pixels depend on, e.g.
+    ("label", lang_code, height) or ("watermark", path, size).
+    """
+    layer = _LAYER_CACHE.get(key)
+    if layer is None:
+        layer = builder()
+        _LAYER_CACHE[key] = layer
+    return layer
+
+
+def clear_layers():
+    _LAYER_CACHE.clear()
+
+
+def layer_from_masks(fill, outline, fill_color, outline_color=None, offset=(0, 0)):
+    """Build an RGBA layer from coverage masks and flat colors."""
+    f = np.asarray(fill, dtype=np.float32)[..., None] / 255.0
+    rgb = np.broadcast_to(np.array(fill_color, np.float32), f.shape[:2] + (3,))
+    alpha = f[..., 0]
+    if outline is not None and outline_color is not None:
+        s = np.asarray(outline, dtype=np.float32)[..., None] / 255.0
+        rgb = np.array(outline_color, np.float32) * (1.0 - f) + rgb * f
+        alpha = np.maximum(s[..., 0], alpha)
+
+    rgba = np.dstack([rgb, alpha[..., None] * 255.0])
+    return Layer(Image.fromarray(np.rint(rgba).astype(np.uint8), "RGBA"), offset)
+
+
+def composite_layer(image, layer, anchor=(0, 0)):
+    """Alpha-composite a layer onto image in place with its offset from anchor."""
+    dest = (int(anchor[0] + layer.offset[0]), int(anchor[1] + layer.offset[1]))
+    if image.mode == "RGBA":
+        # alpha_composite only accepts destinations inside the image
+        if dest[0] >= 0 and dest[1] >= 0:
+            image.alpha_composite(layer.image, dest)
+            return image
+    # On an opaque canvas, pasting through the alpha band is the same "over"
+    image.paste(layer.image, dest, layer.image)
+    return image
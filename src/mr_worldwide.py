@@ -5,93 +5,57 @@ import sys
 # Ensure the project root is in sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from tqdm import tqdm
-from src.utils import get_path, sine_adder
-from src.assets_manager import get_trans
-from src.renderer import get_actual_text_width, create_frame
+from src.utils import get_path
+from src.config import QUALITY_TIERS
+from src.render_config import RenderConfig
+from src.render_plan import (
+    compile_plan,
+    describe_plan,
+    encode_plan,
+    output_paths,
+    plan_sizes,
+    render_frames,
+    write_plan,
+)
+from src.glyph_atlas import GLYPH_ATLAS
 
 
 def create_gif(params):
-    text = params.text
-    text_array = []
-    if params.text_array:
-        text_array = [(t.strip(), "und") for t in params.text_array.split(",")]
-
-    if not text and not text_array:
-        raise ValueError("need text or text array")
-
-    if text:
-        text_array = get_trans(text, languages=params.languages)
-
-    # Deduplicate
-    unique_text_array = []
-    seen_texts = set()
-    for t, l in text_array:
-        clean_t = t.lower().strip()
-        if clean_t not in seen_texts:
-            unique_text_array.append((t, l))
-            seen_texts.add(clean_t)
-    text_array = unique_text_array
-
-    width, height = (int(x) for x in params.size.split(","))
-    base_font_size = params.font_size if params.font_size != 32 else height // 4
-
-    text_configs = {}
-    print(f"Analyzing {len(text_array)} translations...")
-    for t, l in text_array:
-        f_size = base_font_size
-        t_width, b_left, b_right = get_actual_text_width(
-            t,
-            l,
-            params.font_path,
-            f_size,
-            char_by_char=params.use_flag_colors or params.rainbow,
-        )
-        if t_width == 0 and t.strip():
-            text_configs[(t, l)] = (0, 0, 0, 0)
-            continue
-        while t_width > width * 0.9 and f_size > 8:
-            f_size -= 2
-            t_width, b_left, b_right = get_actual_text_width(
-                t,
-                l,
-                params.font_path,
-                f_size,
-                char_by_char=params.use_flag_colors or params.rainbow,
-            )
-        text_configs[(t, l)] = (f_size, t_width, b_left, b_right)
-
-    frames = []
-    used_images_paths = set()
-
+    if params.glyph_cache:
+        GLYPH_ATLAS.attach_spill(params.glyph_cache)
+
+    config = RenderConfig.from_args(params)
+    plan = compile_plan(config)
+    sizes = plan_sizes(plan)
+    print(f"Analyzing {plan['total']} translations...")
+    if getattr(params, "plan_out", None):
+        write_plan(plan, params.plan_out)
+        print(f"Plan written to {params.plan_out}")
+    if getattr(params, "dry_run", False):
+        print(describe_plan(plan))
+        return [] if len(sizes) == 1 else {size: [] for size in sizes}
+
+    frames = {size: [] for size in sizes}
     print(f"Generating frames...")
-    for i, (t, l) in enumerate(tqdm(text_array, desc="Progress")):
-        if text_configs[(t, l)][1] == 0 and t.strip():
-            continue
-        frame = create_frame(
-            t, l, params, text_configs[(t, l)], i, len(text_array), used_images_paths
-        )
-        frames.append(frame)
-
-    if not frames:
+    rendered = render_frames(plan, prefetch=config.prefetch, progress=True)
+    for sized_frames in rendered:
+        for size, frame in zip(sizes, sized_frames):
+            frames[size].append(frame)
+
+    if params.glyph_cache:
+        GLYPH_ATLAS.save()
+
+    if not plan["frames"]:
         print("No frames created.")
-        return
-
-    duration = params.delay
-    if params.sine_delay > 0:
-        frames = sine_adder(frames, params.sine_delay // params.delay)
-
-    frames[0].save(
-        params.gif_path,
-        save_all=True,
-        append_images=frames[1:],
-        loop=0,
-        duration=duration,
-    )
-    print(f"\nSuccess! GIF saved to {params.gif_path}")
+        return [] if len(sizes) == 1 else frames
+
+    frames = encode_plan(plan, frames, output_paths(plan, params.gif_path))
+    for gif_path in output_paths(plan, params.gif_path).values():
+        print(f"\nSuccess! GIF saved to {gif_path}")
+    return frames[sizes[0]] if len(sizes) == 1 else frames
 
 
-def main():
+def build_parser():
     parser = argparse.ArgumentParser(
         description="Mr. Worldwide: Animated Translation GIFs"
     )
@@ -107,7 +71,17 @@ def main():
     parser.add_argument("--font_color", default="255,255,255")
     parser.add_argument("--font_path", default=get_path("fonts/NotoSans-Regular.ttf"))
     parser.add_argument("--background_color", default="0,0,0")
-    parser.add_argument("--size", default="256,256")
+    parser.add_argument(
+        "--size",
+        nargs="+",
+        default="256,256",
+        help="One or more width,height sizes, rendered in a single pass",
+    )
+    parser.add_argument(
+        "--share_palettes",
+        action="store_true",
+        help="Map extra sizes onto the first size's palettes (faster, lower fidelity)",
+    )
     parser.add_argument("--gif_path", default="output.gif")
     parser.add_argument(
         "--use_icons", action="store_true", help="Use country-specific backgrounds"
@@ -119,12 +93,46 @@ def main():
         "--use_flag_colors", action="store_true", help="Use flag colors for text"
     )
     parser.add_argument("--rainbow", action="store_true", help="Rainbow text effect")
+    parser.add_argument(
+        "--rainbow_steps",
+        type=int,
+        default=1,
+        help="With --rainbow, cycle each word's hue over N frames sharing its delay",
+    )
     parser.add_argument(
         "--show_labels", action="store_true", help="Show language/country labels"
     )
     parser.add_argument("--languages", nargs="+", default="all")
+    parser.add_argument(
+        "--glyph_cache", help="Directory to persist the glyph atlas across runs"
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=4,
+        help="Backgrounds to load ahead of the frame being drawn (0 disables)",
+    )
+    parser.add_argument(
+        "--quality",
+        choices=sorted(QUALITY_TIERS),
+        default="standard",
+        help="draft renders fast previews, final spends extra time on output",
+    )
+    parser.add_argument(
+        "--plan_out", help="Also write the render plan as JSON for render_plan.py"
+    )
+    parser.add_argument(
+        "--dry_run",
+        "--dry-run",
+        action="store_true",
+        help="Print the render plan and its estimated cost without rendering",
+    )
+    return parser
+
 
-    args = parser.parse_args()
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
 
     if not args.text and not args.text_array:
         parser.print_help()
@@ -0,0 +1,214 @@
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.asset_index import AssetIndex
+
+PHASH_SIZE = 32
+# Hamming radius (out of 64 bits) under which two photos count as the same shot
+NEAR_DUPLICATE_RADIUS = 10
+
+# Orthonormal-free DCT-II basis; scale does not matter for median thresholding
+_n = np.arange(PHASH_SIZE)
+DCT_MATRIX = np.cos(np.pi * (2 * _n[None, :] + 1) * _n[:, None] / (2 * PHASH_SIZE))
+
+
+def load_thumbnails(path):
+    """Decode an image at reduced scale into the pHash and dHash inputs."""
+    try:
+        with Image.open(path) as img:
+            # JPEG decoders can scale by 1/2..1/8 while decoding
+            img.draft("L", (PHASH_SIZE * 2, PHASH_SIZE * 2))
+            if img.mode == "P":
+                img = img.convert("RGBA")
+            gray = img.convert("L")
+            p_in = gray.resize((PHASH_SIZE, PHASH_SIZE), Image.Resampling.BILINEAR)
+            d_in = gray.resize((9, 8), Image.Resampling.BILINEAR)
+            return np.asarray(p_in, np.float32), np.asarray(d_in, np.float32)
+    except:
+        return None
+
+
+def _bits_to_ints(bits):
+    """(N, 64) booleans -> list of 64-bit ints."""
+    packed = np.packbits(bits.reshape(len(bits), 64), axis=1)
+    return [int.from_bytes(row.tobytes(), "big") for row in packed]
+
+
+def phash_batch(thumbs):
+    """DCT hashes for a (N, 32, 32) batch of grayscale thumbnails."""
+    coeffs = np.einsum("ij,njk,lk->nil", DCT_MATRIX, thumbs, DCT_MATRIX)[:, :8, :8]
+    flat = coeffs.reshape(len(coeffs), 64)
+    # The DC term dominates the median, so leave it out
+    median = np.median(flat[:, 1:], axis=1, keepdims=True)
+    return _bits_to_ints(flat > median)
+
+
+def dhash_batch(thumbs):
+    """Gradient hashes for a (N, 8, 9) batch of grayscale thumbnails."""
+    return _bits_to_ints(thumbs[:, :, 1:] > thumbs[:, :, :-1])
+
+
+def compute_hashes(paths, workers=None):
+    """Returns {path: (phash, dhash)}; decodes in parallel, hashes vectorized."""
+    paths = list(paths)
+    if not paths:
+        return {}
+    if len(paths) == 1:
+        thumbs = [load_thumbnails(paths[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            thumbs = list(pool.map(load_thumbnails, paths, chunksize=8))
+
+    ok = [(p, t) for p, t in zip(paths, thumbs) if t is not None]
+    if not ok:
+        return {}
+    p_thumbs = np.stack([t[0] for _, t in ok])
+    d_thumbs = np.stack([t[1] for _, t in ok])
+    return {
+        p: (ph, dh)
+        for (p, _), ph, dh in zip(ok, phash_batch(p_thumbs), dhash_batch(d_thumbs))
+    }
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes for Hamming radius queries.
+
+    Each node's children are keyed by their distance to the node, so a query
+    only descends into children whose key is within the radius of the query's
+    own distance (triangle inequality). Lookups stay far below a linear scan as
+    the library grows.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value, item):
+        node = [value, [item], {}]
+        self.size += 1
+        if self.root is None:
+            self.root = node
+            return
+        current = self.root
+        while True:
+            d = hamming(value, current[0])
+            if d == 0:
+                current[1].append(item)
+                return
+            child = current[2].get(d)
+            if child is None:
+                current[2][d] = node
+                return
+            current = child
+
+    def query(self, value, radius):
+        """Returns [(distance, item)] for all items within radius of value."""
+        if self.root is None:
+            return []
+        res = []
+        stack = [self.root]
+        while stack:
+            node_value, items, children = stack.pop()
+            d = hamming(value, node_value)
+            if d <= radius:
+                res.extend((d, item) for item in items)
+            for k, child in children.items():
+                if d - radius <= k <= d + radius:
+                    stack.append(child)
+        return res
+
+
+def update_index_hashes(index, workers=None):
+    """Hash every indexed asset that has no perceptual hash yet."""
+    todo = [p for p, e in index.entries.items() if "phash" not in e]
+    hashes = compute_hashes([index.abs(p) for p in todo], workers=workers)
+    for rel_path in todo:
+        found = hashes.get(index.abs(rel_path))
+        if found:
+            index.annotate(rel_path, phash=f"{found[0]:016x}", dhash=f"{found[1]:016x}")
+    return len(hashes)
+
+
+def build_tree(index, assets_dir=None):
+    """BK-tree of every hashed asset, optionally limited to one assets dir."""
+    tree = BKTree()
+    for rel_path, entry in index.entries.items():
+        if "phash" not in entry:
+            continue
+        if assets_dir and index.split(rel_path)[0] != assets_dir:
+            continue
+        tree.add(int(entry["phash"], 16), rel_path)
+    return tree
+
+
+def is_near_duplicate(entry_a, entry_b, radius=NEAR_DUPLICATE_RADIUS):
+    """Both hashes must agree, which keeps false positives rare."""
+    return (
+        hamming(int(entry_a["phash"], 16), int(entry_b["phash"], 16)) <= radius
+        and hamming(int(entry_a["dhash"], 16), int(entry_b["dhash"], 16)) <= radius
+    )
+
+
+def find_near_duplicates(index, radius=NEAR_DUPLICATE_RADIUS, assets_dir=None):
+    """Group assets whose perceptual hashes are within radius of each other.
+
+    Groups are connected components, so a chain of similar shots (a~b, b~c)
+    ends up in one group even when a and c are further apart.
+    """
+    tree = build_tree(index, assets_dir)
+    groups = []
+    seen = set()
+    for rel_path in sorted(index.entries):
+        entry = index.entries[rel_path]
+        if rel_path in seen or "phash" not in entry:
+            continue
+        if assets_dir and index.split(rel_path)[0] != assets_dir:
+            continue
+        group = {rel_path}
+        stack = [rel_path]
+        while stack:
+            current = index.entries[stack.pop()]
+            for _, other in tree.query(int(current["phash"], 16), radius):
+                if other not in group and is_near_duplicate(
+                    current, index.entries[other], radius
+                ):
+                    group.add(other)
+                    stack.append(other)
+        seen.update(group)
+        if len(group) > 1:
+            groups.append(sorted(group))
+    return groups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate assets")
+    parser.add_argument("--radius", type=int, default=NEAR_DUPLICATE_RADIUS)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    index = AssetIndex.load()
+    hashed = update_index_hashes(index, workers=args.workers)
+    index.save()
+    print(f"Hashed {hashed} new assets.")
+
+    for assets_dir in ["hello_assets", "love_assets"]:
+        groups = find_near_duplicates(index, args.radius, assets_dir)
+        print(f"\n{assets_dir}: {len(groups)} near-duplicate groups")
+        for group in groups:
+            print("  " + ", ".join(group))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,41 @@
 import os
 import json
+import heapq
 import requests
 import random
+import threading
 import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from requests.adapters import HTTPAdapter
 from PIL import Image
 
-
 import argparse
+import sys
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.asset_index import AssetIndex
+from src.config import MAX_ASSET_DIMENSION
+from src.languages import get_registry
+from src.http_cache import HttpCache, MODES as HTTP_CACHE_MODES, HTTP_CACHE_DIR
+from src.ingest import CHUNK_SIZE, stream_image
+from src.perceptual_hash import (
+    NEAR_DUPLICATE_RADIUS,
+    build_tree,
+    compute_hashes,
+    is_near_duplicate,
+    update_index_hashes,
+)
+
+PEXELS_API_URL = "https://api.pexels.com/v1"
+# Request max images per page to maximize variety
+SEARCH_COUNT = 80
 
 
 # Load API key from .1nv
@@ -27,198 +56,8 @@ def get_api_key():
     return None
 
 
-# Mapping from ISO 639-1 language codes to country folder names
-# Taken from check_pictures.py
-LANG_TO_COUNTRY = {
-    "en": "united_states",
-    "es": "spain",
-    "fr": "france",
-    "de": "germany",
-    "it": "italy",
-    "pt": "brazil",
-    "ru": "russia",
-    "ja": "japan",
-    "ko": "south_korea",
-    "zh": "china",
-    "hi": "india",
-    "ar": "saudi_arabia",
-    "bn": "bangladesh",
-    "pa": "india",
-    "jv": "indonesia",
-    "te": "india",
-    "vi": "vietnam",
-    "mr": "india",
-    "ta": "india",
-    "tr": "turkey",
-    "ur": "pakistan",
-    "pl": "poland",
-    "uk": "ukraine",
-    "nl": "netherlands",
-    "el": "greece",
-    "th": "thailand",
-    "sv": "sweden",
-    "da": "denmark",
-    "fi": "finland",
-    "no": "norway",
-    "he": "israel",
-    "id": "indonesia",
-    "ms": "malaysia",
-    "hu": "hungary",
-    "cs": "czech_republic",
-    "ro": "romania",
-    "sk": "slovakia",
-    "bg": "bulgaria",
-    "hr": "croatia",
-    "sr": "serbia",
-    "sl": "slovenia",
-    "et": "estonia",
-    "lv": "latvia",
-    "lt": "lithuania",
-    "fa": "iran",
-    "sw": "kenya",
-    "tl": "philippines",
-    "is": "iceland",
-    "ga": "ireland",
-    "cy": "united_kingdom",
-    "gd": "united_kingdom",
-    "lb": "luxembourg",
-    "mt": "malta",
-    "sq": "albania",
-    "hy": "armenia",
-    "az": "azerbaijan",
-    "ka": "georgia",
-    "kk": "kazakhstan",
-    "ky": "kyrgyzstan",
-    "tg": "tajikistan",
-    "tk": "turkmenistan",
-    "uz": "uzbekistan",
-    "mn": "mongolia",
-    "bo": "china",
-    "my": "myanmar",
-    "km": "cambodia",
-    "lo": "laos",
-    "ml": "india",
-    "kn": "india",
-    "si": "sri_lanka",
-    "ne": "nepal",
-    "ps": "afghanistan",
-    "ku": "iraq",
-    "am": "ethiopia",
-    "yo": "nigeria",
-    "ig": "nigeria",
-    "zu": "south_africa",
-    "xh": "south_africa",
-    "af": "south_africa",
-    "mi": "new_zealand",
-    "haw": "united_states",
-    "sm": "samoa",
-    "to": "tonga",
-    "fj": "fiji",
-    "eo": "global",
-    "ca": "spain",
-    "gl": "spain",
-    "eu": "spain",
-    "oc": "france",
-    "br": "france",
-    "co": "france",
-    "fy": "netherlands",
-    "hsb": "germany",
-    "csb": "poland",
-    "tt": "russia",
-    "ba": "russia",
-    "ce": "russia",
-    "cv": "russia",
-    "udm": "russia",
-    "mhr": "russia",
-    "sah": "russia",
-    "gn": "paraguay",
-    "qu": "peru",
-    "ay": "bolivia",
-    "nah": "mexico",
-    "yua": "mexico",
-}
-
-
 def country_to_eponym(country):
-    eponyms = {
-        "united_states": "american",
-        "spain": "spanish",
-        "france": "french",
-        "germany": "german",
-        "italy": "italian",
-        "brazil": "brazilian",
-        "russia": "russian",
-        "japan": "japanese",
-        "south_korea": "korean",
-        "china": "chinese",
-        "india": "indian",
-        "saudi_arabia": "saudi",
-        "bangladesh": "bangladeshi",
-        "indonesia": "indonesian",
-        "vietnam": "vietnamese",
-        "turkey": "turkish",
-        "pakistan": "pakistani",
-        "poland": "polish",
-        "ukraine": "ukrainian",
-        "netherlands": "dutch",
-        "greece": "greek",
-        "thailand": "thai",
-        "sweden": "swedish",
-        "denmark": "danish",
-        "finland": "finnish",
-        "norway": "norwegian",
-        "israel": "israeli",
-        "malaysia": "malaysian",
-        "hungary": "hungarian",
-        "czech_republic": "czech",
-        "romania": "romanian",
-        "slovakia": "slovak",
-        "bulgaria": "bulgarian",
-        "croatia": "croatian",
-        "serbia": "serbian",
-        "slovenia": "slovenian",
-        "estonia": "estonian",
-        "latvia": "latvian",
-        "lithuania": "lithuanian",
-        "iran": "iranian",
-        "kenya": "kenyan",
-        "philippines": "filipino",
-        "iceland": "icelandic",
-        "ireland": "irish",
-        "republic_of_ireland": "irish",
-        "united_kingdom": "british",
-        "luxembourg": "luxembourgish",
-        "malta": "maltese",
-        "albania": "albanian",
-        "armenia": "armenian",
-        "azerbaijan": "azerbaijani",
-        "georgia": "georgian",
-        "kazakhstan": "kazakh",
-        "kyrgyzstan": "kyrgyz",
-        "tajikistan": "tajik",
-        "turkmenistan": "turkmen",
-        "uzbekistan": "uzbek",
-        "mongolia": "mongolian",
-        "myanmar": "burmese",
-        "cambodia": "cambodian",
-        "laos": "laotian",
-        "sri_lanka": "sri lankan",
-        "nepal": "nepalese",
-        "afghanistan": "afghan",
-        "iraq": "iraqi",
-        "ethiopia": "ethiopian",
-        "nigeria": "nigerian",
-        "south_africa": "south african",
-        "new_zealand": "new zealander",
-        "samoa": "samoan",
-        "tonga": "tongan",
-        "fiji": "fijian",
-        "paraguay": "paraguayan",
-        "peru": "peruvian",
-        "bolivia": "bolivian",
-        "mexico": "mexican",
-    }
-    return eponyms.get(country, country)
+    return get_registry().eponym(country)
 
 
 def get_needed_counts(word):
@@ -226,7 +65,8 @@ def get_needed_counts(word):
 
     total_needed = {}
     # Initialize with 1 for every country to ensure we have at least one fallback
-    for country in set(LANG_TO_COUNTRY.values()):
+    registry = get_registry()
+    for country in registry.countries():
         total_needed[country] = 1
 
     if not os.path.exists(translations_file):
@@ -242,15 +82,19 @@ def get_needed_counts(word):
         for lang, trans_text in translations.items():
             clean_t = trans_text.lower().strip()
             if clean_t not in seen_texts:
-                country = LANG_TO_COUNTRY.get(lang, "global")
+                country = registry.country(lang, "global")
                 total_needed[country] = total_needed.get(country, 0) + 1
                 seen_texts.add(clean_t)
 
     return total_needed
 
 
-def is_valid_image(path):
-    """Check if the file is a valid image and large enough."""
+def is_valid_image(path, decode=True):
+    """Check if the file is a valid image and large enough.
+
+    With decode=False only the header is parsed, which is enough for files
+    that already passed a full decode and have not changed since.
+    """
     if not os.path.exists(path):
         return False
     # Increased minimum size to 10KB to avoid thumbnails/placeholders
@@ -258,40 +102,67 @@ def is_valid_image(path):
         return False
     try:
         with Image.open(path) as img:
-            img.load()
+            if decode:
+                img.load()
         return True
     except:
         return False
 
 
-def get_missing_counts(word):
+def find_invalid_images(index, rel_paths, workers=None):
+    """Returns the paths among rel_paths that are not valid images.
+
+    Passing results are stored in the index, so later runs only re-check the
+    header of unchanged files. Files that need a full decode are decoded in a
+    process pool.
+    """
+    invalid = []
+    todo = []
+    for rel_path in rel_paths:
+        if index.entries.get(rel_path, {}).get("valid"):
+            if not is_valid_image(index.abs(rel_path), decode=False):
+                invalid.append(rel_path)
+        else:
+            todo.append(rel_path)
+
+    paths = [index.abs(p) for p in todo]
+    if len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(is_valid_image, paths, chunksize=8))
+    else:
+        results = [is_valid_image(p) for p in paths]
+
+    for rel_path, ok in zip(todo, results):
+        if ok:
+            index.annotate(rel_path, valid=True)
+        else:
+            invalid.append(rel_path)
+    return invalid
+
+
+def get_missing_counts(word, index=None):
     assets_dir = f"{word}_assets"
     needed = get_needed_counts(word)
+    if index is None:
+        index = AssetIndex.load()
 
     # Clean up invalid images
-    if os.path.exists(assets_dir):
-        for country in os.listdir(assets_dir):
-            path = os.path.join(assets_dir, country)
-            if not os.path.isdir(path) or country.startswith("."):
-                continue
-
-            for f in os.listdir(path):
-                if f.startswith("."):
-                    continue
-                full_path = os.path.join(path, f)
-                if not is_valid_image(full_path):
-                    print(f"Removing invalid image: {full_path}")
-                    os.remove(full_path)
+    for rel_path in find_invalid_images(index, index.files(assets_dir)):
+        full_path = index.abs(rel_path)
+        print(f"Removing invalid image: {full_path}")
+        if os.path.exists(full_path):
+            os.remove(full_path)
+        index.remove(rel_path)
 
     missing = {}
     for country, count_needed in needed.items():
-        path = os.path.join(assets_dir, country)
+        path = index.abs(f"{assets_dir}/{country}")
         if not os.path.exists(path):
             os.makedirs(path, exist_ok=True)
             missing[country] = count_needed
             continue
 
-        valid_files = [f for f in os.listdir(path) if not f.startswith(".")]
+        valid_files = index.files(assets_dir, country)
 
         if len(valid_files) < count_needed:
             missing[country] = count_needed - len(valid_files)
@@ -299,18 +170,13 @@ def get_missing_counts(word):
     return missing
 
 
-def is_duplicate_globally(assets_dir, filename):
+def is_duplicate_globally(index, assets_dir, filename):
     """Check if the filename exists anywhere in the assets_dir."""
-    for root, dirs, files in os.walk(assets_dir):
-        if filename in files:
-            return True
-    return False
+    return index.has_filename(assets_dir, filename)
 
 
-def download_from_pexels(country, api_key, word="hello", count=1):
-    print(f"Searching Pexels for {word} in {country} ({count} images needed)...")
-    headers = {"Authorization": api_key}
-
+def get_queries(country, word):
+    """Returns the shuffled search queries and the assets dir for a refill job."""
     country_name = country.replace("_", " ")
     eponym = country_to_eponym(country)
 
@@ -347,85 +213,293 @@ def download_from_pexels(country, api_key, word="hello", count=1):
 
     # Randomize query order to avoid same first results
     random.shuffle(queries)
+    return queries, assets_dir
+
+
+def make_session(pool_size):
+    """A keep-alive session whose connection pool fits every worker."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class RateLimiter:
+    """Paces API calls from the X-Ratelimit-* headers instead of a fixed sleep.
+
+    While plenty of quota is left calls go out back to back. Once the remaining
+    quota drops below `reserve`, it is spread evenly until the reset time, and a
+    429 pauses everyone until Retry-After (or the reset) has passed.
+    """
+
+    def __init__(self, reserve=20, min_interval=0.0):
+        self.reserve = reserve
+        self.min_interval = min_interval
+        self.interval = min_interval
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def update(self, response):
+        headers = response.headers
+        now = time.monotonic()
+        try:
+            remaining = int(headers.get("X-Ratelimit-Remaining"))
+            reset_in = max(0.0, float(headers.get("X-Ratelimit-Reset")) - time.time())
+        except (TypeError, ValueError):
+            remaining, reset_in = None, None
+
+        with self.lock:
+            if response.status_code == 429:
+                retry_after = headers.get("Retry-After")
+                try:
+                    pause = float(retry_after)
+                except (TypeError, ValueError):
+                    pause = reset_in if reset_in is not None else 60.0
+                self.next_time = max(self.next_time, now + pause)
+            elif remaining is None:
+                return
+            elif remaining <= 0:
+                self.next_time = max(self.next_time, now + reset_in)
+            elif remaining < self.reserve:
+                self.interval = max(self.min_interval, reset_in / remaining)
+            else:
+                self.interval = self.min_interval
+
+
+class RefillEngine:
+    """Refills many (word, country) folders concurrently.
+
+    Jobs live in one queue ordered by how many images they are still missing,
+    across every word and country. Each worker takes the neediest job, runs one
+    search query for it and downloads what it can, then puts the job back if it
+    is still short and has queries left.
+    """
+
+    def __init__(
+        self,
+        api_key,
+        api_url=PEXELS_API_URL,
+        workers=4,
+        session=None,
+        limiter=None,
+        index=None,
+        max_dimension=MAX_ASSET_DIMENSION,
+        cache=None,
+    ):
+        self.api_key = api_key
+        self.cache = cache or HttpCache()
+        self.max_dimension = max_dimension
+        self.index = index or AssetIndex.load()
+        self.api_url = api_url.rstrip("/")
+        self.workers = workers
+        self.session = session or make_session(workers * 2)
+        self.limiter = limiter or RateLimiter()
+        self.claimed = set()
+        self.lock = threading.Lock()
+        # assets_dir -> BKTree of perceptual hashes, built when a run starts
+        self.trees = {}
+
+    def search(self, query, page, retries=3):
+        params = {
+            "query": query,
+            "orientation": "landscape",
+            "per_page": SEARCH_COUNT,
+            "page": page,
+        }
+        for _ in range(retries):
+            response = self.cache.get(
+                self.session,
+                f"{self.api_url}/search",
+                params=params,
+                headers={"Authorization": self.api_key},
+                before_request=self.limiter.wait,
+                timeout=30,
+            )
+            if not response.from_cache:
+                self.limiter.update(response)
+            if response.status_code != 429:
+                break
+        response.raise_for_status()
+        return response.json()
+
+    def claim(self, assets_dir, filename):
+        """Reserve a filename so two workers never fetch the same photo."""
+        with self.lock:
+            if filename in self.claimed:
+                return False
+            self.claimed.add(filename)
+        return not is_duplicate_globally(self.index, assets_dir, filename)
+
+    def near_duplicate(self, target_path):
+        """Returns the indexed asset that looks the same as target_path, if any.
+
+        Otherwise the new file's hashes are recorded and it joins the tree.
+        """
+        rel_path = self.index.rel(target_path)
+        found = compute_hashes([target_path]).get(target_path)
+        if not found:
+            return None
+        hashes = {"phash": f"{found[0]:016x}", "dhash": f"{found[1]:016x}"}
+        assets_dir = self.index.split(rel_path)[0]
+        with self.lock:
+            tree = self.trees.get(assets_dir)
+            if tree is None:
+                tree = self.trees[assets_dir] = build_tree(self.index, assets_dir)
+            for _, other in tree.query(found[0], NEAR_DUPLICATE_RADIUS):
+                entry = self.index.entries.get(other)
+                if other != rel_path and entry and is_near_duplicate(hashes, entry):
+                    return other
+            tree.add(found[0], rel_path)
+        self.index.annotate(rel_path, **hashes)
+        return None
 
-    # Request max images per page to maximize variety
-    search_count = 80
-
-    downloaded = 0
-    for query in queries:
-        if downloaded >= count:
-            break
+    def download(self, img_url, target_path):
+        with self.cache.get(
+            self.session, img_url, fixture_only=True, stream=True, timeout=60
+        ) as response:
+            response.raise_for_status()
+            try:
+                stream_image(
+                    response.iter_content(CHUNK_SIZE), target_path, self.max_dimension
+                )
+            except ValueError as e:
+                print(f"Downloaded image is invalid ({e}), skipping: {target_path}")
+                return False
+
+        if self.index.add(target_path, unique=True) is None:
+            print(
+                f"Downloaded image is a byte-identical duplicate, removing: {target_path}"
+            )
+            os.remove(target_path)
+            return False
+        match = self.near_duplicate(target_path)
+        if match:
+            print(f"Downloaded image looks like {match}, removing: {target_path}")
+            os.remove(target_path)
+            self.index.remove(target_path)
+            return False
+        return True
 
+    def step(self, job):
+        """Run one search query for a job and download up to its deficit."""
+        query = job["queries"].pop(0)
         # Try a random page to avoid getting the same "bad" images
         page = random.randint(1, 5)
-        url = f"https://api.pexels.com/v1/search?query={query}&orientation=landscape&per_page={search_count}&page={page}"
-
-        try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-
-            # If the random page is empty, try page 1
-            if not data.get("photos") and page > 1:
-                print(f"Page {page} empty for '{query}', trying page 1...")
-                url = f"https://api.pexels.com/v1/search?query={query}&orientation=landscape&per_page={search_count}&page=1"
-                response = requests.get(url, headers=headers)
-                response.raise_for_status()
-                data = response.json()
+        data = self.search(query, page)
 
-            if not data.get("photos"):
-                continue
-
-            # Shuffle photos to avoid always picking the first one
-            photos = data["photos"]
-            random.shuffle(photos)
+        # If the random page is empty, try page 1
+        if not data.get("photos") and page > 1:
+            print(f"Page {page} empty for '{query}', trying page 1...")
+            page = 1
+            data = self.search(query, page)
 
-            for photo in photos:
-                if downloaded >= count:
-                    break
+        # Shuffle photos to avoid always picking the first one
+        photos = data.get("photos") or []
+        random.shuffle(photos)
 
-                img_url = photo["src"]["large2x"]
+        for photo in photos:
+            if job["needed"] <= 0:
+                break
 
-                # Determine filename
-                ext = img_url.split(".")[-1].split("?")[0]
-                if ext not in ["jpg", "jpeg", "png", "webp"]:
-                    ext = "jpg"
+            img_url = photo["src"]["large2x"]
 
-                filename = f"{photo['id']}.{ext}"
+            # Determine filename
+            ext = img_url.split(".")[-1].split("?")[0]
+            if ext not in ["jpg", "jpeg", "png", "webp"]:
+                ext = "jpg"
 
-                # Check for duplicates locally and globally
-                if is_duplicate_globally(assets_dir, filename):
-                    continue
-
-                target_path = os.path.join(assets_dir, country, filename)
-                current_page = 1 if "page=1" in url else page
-                print(
-                    f"Downloading {img_url} to {target_path} (Query: {query}, Page: {current_page})..."
-                )
-                img_response = requests.get(img_url)
-                img_response.raise_for_status()
-
-                with open(target_path, "wb") as f:
-                    f.write(img_response.content)
-
-                if is_valid_image(target_path):
-                    downloaded += 1
-                else:
-                    print(f"Downloaded image is invalid, removing: {target_path}")
-                    os.remove(target_path)
+            filename = f"{photo['id']}.{ext}"
+            if not self.claim(job["assets_dir"], filename):
+                continue
 
-        except Exception as e:
-            print(f"Error processing {country} with query {query}: {e}")
+            target_path = self.index.abs(
+                f"{job['assets_dir']}/{job['country']}/{filename}"
+            )
+            print(
+                f"Downloading {img_url} to {target_path} (Query: {query}, Page: {page})..."
+            )
+            try:
+                if self.download(img_url, target_path):
+                    job["needed"] -= 1
+                    job["downloaded"] += 1
+            except Exception as e:
+                print(f"Error downloading {img_url}: {e}")
+
+    def run(self, missing):
+        """Refill {word: {country: count}}; returns {(word, country): downloaded}."""
+        queue = []
+        jobs = []
+        for word, counts in missing.items():
+            for country, count in counts.items():
+                queries, assets_dir = get_queries(country, word)
+                os.makedirs(self.index.abs(f"{assets_dir}/{country}"), exist_ok=True)
+                job = {
+                    "word": word,
+                    "country": country,
+                    "needed": count,
+                    "downloaded": 0,
+                    "queries": queries,
+                    "assets_dir": assets_dir,
+                }
+                jobs.append(job)
+                heapq.heappush(queue, (-count, len(jobs), job))
+
+        # Hash anything indexed since the last run so the trees see the whole library
+        update_index_hashes(self.index)
+        self.trees = {
+            assets_dir: build_tree(self.index, assets_dir)
+            for assets_dir in {job["assets_dir"] for job in jobs}
+        }
+
+        seq = len(jobs)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            running = {}
+            while queue or running:
+                while queue and len(running) < self.workers:
+                    _, _, job = heapq.heappop(queue)
+                    running[pool.submit(self.step, job)] = job
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"Error processing {job['country']} ({job['word']}): {e}")
+                    if job["needed"] > 0 and job["queries"]:
+                        seq += 1
+                        heapq.heappush(queue, (-job["needed"], seq, job))
+
+        results = {}
+        for job in jobs:
+            if job["downloaded"] > 0:
+                # Optional: Remove dummy files if they exist
+                path = self.index.abs(f"{job['assets_dir']}/{job['country']}")
+                for f in os.listdir(path):
+                    if f.startswith("dummy_"):
+                        os.remove(os.path.join(path, f))
+                        self.index.remove(os.path.join(path, f))
+                        print(f"Removed dummy file: {f}")
+            results[(job["word"], job["country"])] = job["downloaded"]
+        return results
 
-    if downloaded > 0:
-        # Optional: Remove dummy files if they exist
-        path = os.path.join(assets_dir, country)
-        for f in os.listdir(path):
-            if f.startswith("dummy_"):
-                os.remove(os.path.join(path, f))
-                print(f"Removed dummy file: {f}")
 
-    return downloaded
+def download_from_pexels(country, api_key, word="hello", count=1):
+    print(f"Searching Pexels for {word} in {country} ({count} images needed)...")
+    engine = RefillEngine(api_key, workers=1)
+    try:
+        return engine.run({word: {country: count}})[(word, country)]
+    finally:
+        engine.index.save()
 
 
 def main():
@@ -433,17 +507,50 @@ def main():
     parser.add_argument(
         "--clear", action="store_true", help="Clear all existing images before refill"
     )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Concurrent searches and downloads"
+    )
+    parser.add_argument("--api_url", default=PEXELS_API_URL, help="Pexels API base URL")
+    parser.add_argument(
+        "--max_dimension",
+        type=int,
+        default=MAX_ASSET_DIMENSION,
+        help="Downscale new images so their shorter side fits (0 keeps originals)",
+    )
+    parser.add_argument(
+        "--http_cache",
+        choices=HTTP_CACHE_MODES,
+        default="cache",
+        help="Search response caching; record/replay also store and serve images",
+    )
+    parser.add_argument(
+        "--http_cache_dir",
+        default=HTTP_CACHE_DIR,
+        help="Where cached responses (or recorded fixtures) live",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Seed query/page choice (with --workers 1, replays match recordings)",
+    )
     args = parser.parse_args()
 
-    api_key = get_api_key()
-    if not api_key:
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    # Replays never reach the API, so they run without a key
+    api_key = get_api_key() or ("" if args.http_cache == "replay" else None)
+    if api_key is None:
         print("Please set PEXELS_API_KEY in .1nv")
         return
 
     words = ["hello", "love"]
 
+    index = AssetIndex.load()
+    missing_by_word = {}
     for word in words:
-        assets_dir = f"{word}_assets"
+        assets_dir = index.abs(f"{word}_assets")
         if args.clear and os.path.exists(assets_dir):
             print(f"Clearing all existing images in {assets_dir}...")
             for country in os.listdir(assets_dir):
@@ -452,8 +559,9 @@ def main():
                     for f in os.listdir(country_path):
                         if not f.startswith("."):
                             os.remove(os.path.join(country_path, f))
+                            index.remove(os.path.join(country_path, f))
 
-        missing = get_missing_counts(word)
+        missing = get_missing_counts(word, index)
         if not missing:
             print(f"No missing backgrounds found for {word}.")
             continue
@@ -461,16 +569,29 @@ def main():
         print(
             f"Found {len(missing)} countries needing refills for {word}: {', '.join(f'{k}:{v}' for k, v in missing.items())}"
         )
+        missing_by_word[word] = missing
 
-        for country, count in missing.items():
-            downloaded = download_from_pexels(country, api_key, word, count)
-            if downloaded > 0:
-                print(
-                    f"Successfully refilled {downloaded} images for {country} ({word})"
-                )
-                time.sleep(1)  # Be respectful to the API
-            else:
-                print(f"Failed to refill {country} ({word})")
+    if not missing_by_word:
+        index.save()
+        return
+
+    engine = RefillEngine(
+        api_key,
+        api_url=args.api_url,
+        workers=args.workers,
+        index=index,
+        max_dimension=args.max_dimension,
+        cache=HttpCache(args.http_cache_dir, mode=args.http_cache),
+    )
+    try:
+        results = engine.run(missing_by_word)
+    finally:
+        index.save()
+    for (word, country), downloaded in results.items():
+        if downloaded > 0:
+            print(f"Successfully refilled {downloaded} images for {country} ({word})")
+        else:
+            print(f"Failed to refill {country} ({word})")
 
 
 if __name__ == "__main__":
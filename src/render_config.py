@@ -0,0 +1,124 @@
+from collections.abc import Sequence
+from typing import NamedTuple
+from src.utils import get_path
+
+DEFAULT_FONT_PATH = get_path("fonts/NotoSans-Regular.ttf")
+
+Size = tuple[int, int]
+RGB = tuple[int, int, int]
+
+
+def parse_color(value):
+    """(r, g, b) from "r,g,b"."""
+    return tuple(int(x) for x in value.split(","))
+
+
+def parse_sizes(value):
+    """[(width, height)] from one "w,h" string or a list of them, deduplicated."""
+    values = [value] if isinstance(value, str) else value
+    sizes = []
+    for v in values:
+        size = tuple(int(x) for x in v.split(","))
+        if size not in sizes:
+            sizes.append(size)
+    return sizes
+
+
+class RenderConfig(NamedTuple):
+    """Every option of a render, already parsed.
+
+    The in-process counterpart of the mr_worldwide.py arguments: sizes and
+    colors are tuples of ints rather than "w,h" strings, and font_size None
+    means a quarter of each frame's height (the CLI's 32). With rainbow,
+    rainbow_steps frames share each translation's delay.
+    """
+
+    text: str | None = None
+    text_array: Sequence[str] | None = None
+    languages: str | Sequence[str] = "all"
+    sizes: Sequence[Size] = ((256, 256),)
+    delay: int = 100
+    sine_delay: int = 0
+    font_size: int | None = None
+    font_color: RGB = (255, 255, 255)
+    background_color: RGB = (0, 0, 0)
+    font_path: str = DEFAULT_FONT_PATH
+    use_icons: bool = False
+    smart_color: bool = False
+    use_flag_colors: bool = False
+    rainbow: bool = False
+    show_labels: bool = False
+    quality: str = "standard"
+    prefetch: int = 4
+    rainbow_steps: int = 1
+    share_palettes: bool = False
+
+    @property
+    def language_codes(self):
+        """ "all", or the requested codes as a list, however languages was given."""
+        languages = (
+            [self.languages] if isinstance(self.languages, str) else self.languages
+        )
+        languages = list(languages)
+        return "all" if "all" in languages else languages
+
+    @property
+    def steps(self):
+        """Frames rendered per translation.
+
+        Viewers slow down frames shorter than 20 ms, so delay caps the number
+        of rainbow steps at one per 20 ms.
+        """
+        if not self.rainbow:
+            return 1
+        return max(1, min(self.rainbow_steps, self.delay // 20))
+
+    @property
+    def step_durations(self):
+        """Milliseconds each step of a translation is shown, as a list.
+
+        GIF stores durations in 10 ms units, so steps get whole units that add
+        up to delay (rounded to 10 ms), the first steps taking the remainder.
+        """
+        if self.steps == 1:
+            return [self.delay]
+        units, extra = divmod(round(self.delay / 10), self.steps)
+        return [(units + (step < extra)) * 10 for step in range(self.steps)]
+
+    @classmethod
+    def from_args(cls, params):
+        """The config described by parsed mr_worldwide.py arguments."""
+        text_array = None
+        if params.text_array:
+            text_array = tuple(t.strip() for t in params.text_array.split(","))
+        return cls(
+            text=params.text,
+            text_array=text_array,
+            languages=params.languages,
+            sizes=tuple(parse_sizes(params.size)),
+            delay=params.delay,
+            sine_delay=params.sine_delay,
+            font_size=None if params.font_size == 32 else params.font_size,
+            font_color=parse_color(params.font_color),
+            background_color=parse_color(params.background_color),
+            font_path=params.font_path,
+            use_icons=params.use_icons,
+            smart_color=params.smart_color,
+            use_flag_colors=params.use_flag_colors,
+            rainbow=params.rainbow,
+            show_labels=params.show_labels,
+            quality=getattr(params, "quality", "standard"),
+            prefetch=getattr(params, "prefetch", 4),
+            rainbow_steps=getattr(params, "rainbow_steps", 1),
+            share_palettes=getattr(params, "share_palettes", False),
+        )
+
+    @classmethod
+    def from_json(cls, data):
+        """Inverse of _asdict() after a JSON round trip (lists back to tuples)."""
+        data = dict(data)
+        data["sizes"] = tuple(tuple(size) for size in data["sizes"])
+        for name in ("font_color", "background_color", "text_array", "languages"):
+            if isinstance(data.get(name), list):
+                data[name] = tuple(data[name])
+        return cls(**data)
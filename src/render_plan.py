@@ -0,0 +1,525 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+from itertools import repeat
+import numpy as np
+from PIL import Image
+from tqdm import tqdm
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import get_path, sine_adder
+from src.config import QUALITY_TIERS
+from src.languages import get_registry
+from src.assets_manager import (
+    Background,
+    get_trans,
+    choose_background,
+    prefetch_backgrounds,
+)
+from src.renderer import get_actual_text_width, create_frames, quantize_frame
+from src.render_config import RenderConfig
+
+# Bump when the plan layout changes
+PLAN_VERSION = 1
+# Seconds per rendered frame as (fixed, per megapixel), measured on one core
+# at 256x256 and 1024x256, and per megapixel of each extra frame --sine_delay
+# makes the encoder compare. With --share_palettes, sizes that reuse the first
+# size's palettes cost about SHARED_PALETTE_FACTOR of that. Meant for sizing
+# shards only.
+FRAME_COST = {"text": (0.008, 0.10), "icons": (0.030, 1.12)}
+REPEAT_COST = 0.10
+SHARED_PALETTE_FACTOR = 0.4
+
+
+def _portable(path):
+    """Paths under the project root are stored relative to it."""
+    root = get_path("")
+    if path and os.path.abspath(path).startswith(root):
+        return os.path.relpath(path, root)
+    return path
+
+
+def _local(path):
+    return get_path(path) if path and not os.path.isabs(path) else path
+
+
+def sized_path(gif_path, size):
+    """output.gif -> output_256x256.gif"""
+    root, ext = os.path.splitext(gif_path)
+    return f"{root}_{size[0]}x{size[1]}{ext}"
+
+
+def output_paths(plan, gif_path):
+    """{size: path} of the GIFs a plan encodes to."""
+    sizes = plan_sizes(plan)
+    if len(sizes) == 1:
+        return {sizes[0]: gif_path}
+    return {size: sized_path(gif_path, size) for size in sizes}
+
+
+def plan_sizes(plan):
+    return [tuple(size) for size in plan["sizes"]]
+
+
+def fit_text_configs(text_array, config, size):
+    """{(text, lang): (font_size, width, left, right)} fitted to the frame width."""
+    width, height = size
+    base_font_size = config.font_size or height // 4
+
+    text_configs = {}
+    for t, l in text_array:
+        f_size = base_font_size
+        t_width, b_left, b_right = get_actual_text_width(
+            t,
+            l,
+            config.font_path,
+            f_size,
+        )
+        if t_width == 0 and t.strip():
+            text_configs[(t, l)] = (0, 0, 0, 0)
+            continue
+        while t_width > width * 0.9 and f_size > 8:
+            f_size -= 2
+            t_width, b_left, b_right = get_actual_text_width(
+                t,
+                l,
+                config.font_path,
+                f_size,
+            )
+        text_configs[(t, l)] = (f_size, t_width, b_left, b_right)
+    return text_configs
+
+
+def compile_plan(config):
+    """Resolve everything about a render except the pixels into a plan.
+
+    The plan is plain JSON: the RenderConfig, and per frame the translation,
+    its fitted font size for each size and the chosen background (paths
+    relative to the project root). Rendering a plan needs no lookups and no
+    randomness, so any range of its frames can be rendered anywhere.
+    """
+    text = config.text
+    text_array = []
+    if config.text_array:
+        text_array = [(t, "und") for t in config.text_array]
+
+    if not text and not text_array:
+        raise ValueError("need text or text array")
+
+    if text:
+        text_array = get_trans(text, languages=config.language_codes)
+
+    # Deduplicate
+    unique_text_array = []
+    seen_texts = set()
+    for t, l in text_array:
+        clean_t = t.lower().strip()
+        if clean_t not in seen_texts:
+            unique_text_array.append((t, l))
+            seen_texts.add(clean_t)
+    text_array = unique_text_array
+
+    tier = QUALITY_TIERS[config.quality]
+    if text and tier["max_languages"]:
+        keep = set(
+            get_registry().sample([l for _, l in text_array], tier["max_languages"])
+        )
+        text_array = [(t, l) for t, l in text_array if l in keep]
+
+    sizes = list(config.sizes)
+    text_configs = [fit_text_configs(text_array, config, size) for size in sizes]
+    frame_texts = [
+        (i, t, l)
+        for i, (t, l) in enumerate(text_array)
+        if not (text_configs[0][(t, l)][1] == 0 and t.strip())
+    ]
+
+    frames = []
+    used_images_paths = set()
+    for i, t, l in frame_texts:
+        background = None
+        if config.use_icons:
+            choice = choose_background(l, config.text or "hello", used_images_paths)
+            if choice.path:
+                used_images_paths.add(choice.path)
+            background = {"path": _portable(choice.path), "color": choice.color}
+        frames.append(
+            {
+                "index": i,
+                "text": t,
+                "lang": l,
+                "fit": [list(configs[(t, l)]) for configs in text_configs],
+                "background": background,
+            }
+        )
+
+    # Sizes are stored once at the top level, prefetching is up to each run
+    params = config._asdict()
+    del params["sizes"], params["prefetch"]
+    params["font_path"] = _portable(config.font_path)
+    return {
+        "version": PLAN_VERSION,
+        "params": params,
+        "sizes": [list(size) for size in sizes],
+        "total": len(text_array),
+        "frames": frames,
+    }
+
+
+def plan_id(plan):
+    """Short content hash tying frame bundles to the plan they came from."""
+    encoded = json.dumps(plan, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+
+def load_plan(path):
+    with open(path, "r", encoding="utf-8") as f:
+        plan = json.load(f)
+    if plan.get("version") != PLAN_VERSION:
+        raise ValueError(f"{path} is a version {plan.get('version')} plan")
+    return plan
+
+
+def write_plan(plan, path):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(plan, f, indent=1, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+
+def plan_config(plan):
+    """The RenderConfig a plan was compiled from."""
+    params = dict(plan["params"], sizes=plan["sizes"])
+    params["font_path"] = _local(params["font_path"])
+    return RenderConfig.from_json(params)
+
+
+def _background(entry):
+    background = entry["background"]
+    color = background["color"] and tuple(background["color"])
+    return Background(_local(background["path"]), color)
+
+
+def frame_steps(plan, start=0, stop=None):
+    """(entry, step) of every frame render_frames() yields for start..stop."""
+    steps = plan_config(plan).steps
+    for entry in plan["frames"][start:stop]:
+        for step in range(steps):
+            yield entry, step
+
+
+def render_frames(plan, start=0, stop=None, prefetch=4, progress=False):
+    """Yield the frames of plan frames start..stop, one list per frame.
+
+    Each list holds the frame at every size of the plan, in plan order. With
+    --rainbow every plan frame yields config.steps frames (see frame_steps()).
+    Backgrounds are loaded prefetch frames ahead.
+    """
+    config = plan_config(plan)
+    sizes = config.sizes
+    entries = plan["frames"][start:stop]
+
+    backgrounds = repeat([None] * len(sizes))
+    if config.use_icons:
+        backgrounds = prefetch_backgrounds(
+            [_background(entry) for entry in entries], sizes, prefetch, config.quality
+        )
+
+    # Only read when a frame has to choose its own background, which a plan
+    # never leaves to it
+    used_images_paths = set()
+    if progress:
+        entries = tqdm(entries, desc="Progress")
+    for entry, loaded in zip(entries, backgrounds):
+        steps = [
+            create_frames(
+                entry["text"],
+                entry["lang"],
+                config,
+                tuple(fit),
+                entry["index"],
+                plan["total"],
+                used_images_paths,
+                background,
+                size,
+            )
+            for size, fit, background in zip(sizes, entry["fit"], loaded)
+        ]
+        yield from (list(sized) for sized in zip(*steps))
+
+
+def save_gif(frames, fp, config, tier):
+    """Encode frames as a looping GIF to a path or file object.
+
+    Frames that are already paletted (palette-cycled rainbow steps, which
+    quantize_frame() the same way) keep their palette. Returns the frames as
+    written.
+    """
+    if tier["palette"] != "adaptive":
+        # Adaptive frames are left to the encoder, which quantizes them itself
+        frames = [
+            f if f.mode == "P" else quantize_frame(f, tier["palette"]) for f in frames
+        ]
+
+    steps = config.steps
+    if config.sine_delay > 0:
+        # Repeat whole translations, with all of their steps
+        words = [frames[i : i + steps] for i in range(0, len(frames), steps)]
+        words = sine_adder(words, config.sine_delay // config.delay)
+        frames = [frame for word in words for frame in word]
+
+    duration = config.step_durations
+    if steps == 1:
+        duration = duration[0]
+    else:
+        duration = duration * (len(frames) // steps)
+
+    frames[0].save(
+        fp,
+        format="GIF",
+        save_all=True,
+        append_images=frames[1:],
+        loop=0,
+        duration=duration,
+    )
+    return frames
+
+
+def encode_plan(plan, frames, outputs):
+    """Encode one GIF per size from {size: frames} to {size: path or file}.
+
+    Returns {size: frames as written}.
+    """
+    config = plan_config(plan)
+    tier = QUALITY_TIERS[config.quality]
+    sizes = plan_sizes(plan)
+
+    # Quantizing is most of the cost of every size. share_palettes maps the
+    # other sizes onto the first size's per-frame palettes, which is much
+    # faster but fits them worse since they are scaled and cropped differently
+    shared = config.share_palettes and len(sizes) > 1 and tier["palette"] == "adaptive"
+    palettes = None
+    written = {}
+    for size in sizes:
+        size_frames = frames[size]
+        if shared and palettes is None:
+            # The conversion the encoder would make, kept for the other sizes
+            size_frames = palettes = [
+                f if f.mode == "P" else f.convert("P", palette=Image.Palette.ADAPTIVE)
+                for f in size_frames
+            ]
+        elif shared:
+            size_frames = [
+                (
+                    f
+                    if f.mode == "P"
+                    else f.quantize(palette=palette, dither=Image.Dither.NONE)
+                )
+                for f, palette in zip(size_frames, palettes)
+            ]
+        written[size] = save_gif(size_frames, outputs[size], config, tier)
+    return written
+
+
+def _size_key(size):
+    return f"{size[0]}x{size[1]}"
+
+
+def frame_shape(plan, size, start=0, stop=None):
+    """Shape of the (frames, height, width, 3) array plan frames start..stop fill."""
+    count = len(range(*slice(start, stop).indices(len(plan["frames"]))))
+    return (count * plan_config(plan).steps, size[1], size[0], 3)
+
+
+def render_into(plan, arrays, start=0, stop=None, prefetch=4, progress=False):
+    """Render plan frames start..stop into preallocated {size: array} slots.
+
+    Each array must have frame_shape() and dtype uint8; frames are written
+    into consecutive slots as they are rendered, so nothing but the frame
+    being drawn is held in memory. PIL cannot draw into a 3-channel buffer it
+    does not own, so each frame is copied once into its slot.
+    """
+    sizes = plan_sizes(plan)
+    for size in sizes:
+        expected = frame_shape(plan, size, start, stop)
+        array = arrays[size]
+        if array.shape != expected or array.dtype != np.uint8:
+            raise ValueError(
+                f"{size[0]}x{size[1]} frames need a uint8 array of shape "
+                f"{expected}, got {array.dtype} {array.shape}"
+            )
+
+    rendered = render_frames(plan, start, stop, prefetch, progress)
+    for slot, frames in enumerate(rendered):
+        for size, frame in zip(sizes, frames):
+            np.copyto(arrays[size][slot], np.asarray(frame.convert("RGB")))
+    return arrays
+
+
+def render_bundle(plan, path, start=0, stop=None, prefetch=4, progress=False):
+    """Render plan frames start..stop into a frame bundle at path.
+
+    A bundle is an uncompressed .npz holding one (frames, height, width, 3)
+    uint8 array per size plus the plan id and frame range, so bundles rendered
+    on different machines can be checked and merged.
+    """
+    start, stop, _ = slice(start, stop).indices(len(plan["frames"]))
+    arrays = {
+        size: np.empty(frame_shape(plan, size, start, stop), np.uint8)
+        for size in plan_sizes(plan)
+    }
+    render_into(plan, arrays, start, stop, prefetch, progress)
+    count = max(stop - start, 0)
+
+    meta = {"plan": plan_id(plan), "start": start, "stop": start + count}
+    with open(path, "wb") as f:
+        np.savez(
+            f,
+            meta=np.array(json.dumps(meta)),
+            **{_size_key(size): array for size, array in arrays.items()},
+        )
+    return meta
+
+
+def merge_bundles(plan, paths, gif_path):
+    """Encode the GIFs of a plan from bundles covering all of its frames.
+
+    Raises ValueError when a bundle belongs to another plan or the bundles do
+    not cover every frame exactly once. Returns {size: frames as written}.
+    """
+    expected = plan_id(plan)
+    sizes = plan_sizes(plan)
+    bundles = []
+    for path in paths:
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["plan"] != expected:
+                raise ValueError(f"{path} was rendered from another plan")
+            bundles.append((meta, {size: data[_size_key(size)] for size in sizes}))
+    bundles.sort(key=lambda bundle: bundle[0]["start"])
+
+    covered = 0
+    for meta, _ in bundles:
+        if meta["start"] != covered:
+            raise ValueError(
+                f"bundles cover frames up to {covered}, next starts at {meta['start']}"
+            )
+        covered = meta["stop"]
+    if covered != len(plan["frames"]):
+        raise ValueError(f"bundles cover {covered} of {len(plan['frames'])} frames")
+
+    frames = {
+        size: [Image.fromarray(a) for _, arrays in bundles for a in arrays[size]]
+        for size in sizes
+    }
+    return encode_plan(plan, frames, output_paths(plan, gif_path))
+
+
+def estimate_cost(plan):
+    """Rough single-core render and encode seconds for a plan."""
+    params = plan["params"]
+    fixed, per_megapixel = FRAME_COST["icons" if params["use_icons"] else "text"]
+    count = len(plan["frames"])
+    encoded = count
+    if params["sine_delay"] > 0 and count:
+        encoded = len(sine_adder(range(count), params["sine_delay"] // params["delay"]))
+    # Rainbow steps recolor a rendered frame, so they cost about an encode each
+    steps = plan_config(plan).steps
+    encoded *= steps
+
+    sizes = plan_sizes(plan)
+    shared = (
+        params.get("share_palettes")
+        and len(sizes) > 1
+        and QUALITY_TIERS[params["quality"]]["palette"] == "adaptive"
+    )
+    seconds = 0.0
+    for n, (width, height) in enumerate(sizes):
+        megapixels = width * height / 1e6
+        frame_seconds = fixed + per_megapixel * megapixels
+        if shared and n > 0:
+            frame_seconds *= SHARED_PALETTE_FACTOR
+        seconds += count * frame_seconds
+        seconds += (encoded - count) * REPEAT_COST * megapixels
+    return {
+        "frames": count,
+        "steps": steps,
+        "encoded_frames": encoded,
+        "seconds": seconds,
+    }
+
+
+def describe_plan(plan):
+    """Human-readable listing of a plan and its estimated cost."""
+    params = plan["params"]
+    sizes = plan_sizes(plan)
+    cost = estimate_cost(plan)
+    lines = [
+        f"Plan {plan_id(plan)}: {cost['frames']} frames at "
+        f"{', '.join(_size_key(size) for size in sizes)} "
+        f"({params['quality']} quality"
+        + (f", {cost['steps']} rainbow steps each" if cost["steps"] > 1 else "")
+        + ")"
+    ]
+    for entry in plan["frames"]:
+        fonts = "/".join(str(fit[0]) for fit in entry["fit"])
+        background = entry["background"]
+        source = ""
+        if background:
+            source = background["path"] or f"solid {tuple(background['color'])}"
+        lines.append(
+            f"  {entry['index']:>4} {entry['lang']:<6} {entry['text']:<24} "
+            f"{fonts:>8}pt  {source}"
+        )
+    lines.append(
+        f"Estimated cost: ~{cost['seconds']:.1f}s on one core, "
+        f"{cost['encoded_frames']} encoded frames per size."
+    )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render frame ranges of a plan and merge them into GIFs"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    render = subparsers.add_parser("render", help="Render a frame range to a bundle")
+    render.add_argument("plan", help="Plan written by mr_worldwide.py --plan_out")
+    render.add_argument("--start", type=int, default=0)
+    render.add_argument("--stop", type=int, default=None)
+    render.add_argument("--out", required=True, help="Bundle (.npz) to write")
+    render.add_argument("--prefetch", type=int, default=4)
+
+    merge = subparsers.add_parser("merge", help="Encode GIFs from bundles")
+    merge.add_argument("plan")
+    merge.add_argument("bundles", nargs="+")
+    merge.add_argument("--gif_path", default="output.gif")
+
+    describe = subparsers.add_parser("describe", help="Print a plan and its cost")
+    describe.add_argument("plan")
+    args = parser.parse_args()
+
+    plan = load_plan(args.plan)
+    if args.command == "render":
+        meta = render_bundle(
+            plan, args.out, args.start, args.stop, args.prefetch, progress=True
+        )
+        print(f"Rendered frames {meta['start']}-{meta['stop']} to {args.out}")
+    elif args.command == "merge":
+        try:
+            merge_bundles(plan, args.bundles, args.gif_path)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        for path in output_paths(plan, args.gif_path).values():
+            print(f"GIF saved to {path}")
+    else:
+        print(describe_plan(plan))
+
+
+if __name__ == "__main__":
+    main()
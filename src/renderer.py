@@ -1,38 +1,52 @@
 import numpy as np
 import colorsys
+import unicodedata
+from functools import lru_cache
 from scipy.cluster.vq import kmeans, vq
 from PIL import Image, ImageDraw, ImageFont, ImageStat
 from src.assets_manager import (
     get_font_for_lang,
     get_background_image,
+    get_background_stats,
     get_flag_colors_for_text,
     get_rainbow_colors_for_text,
 )
-from src.config import LANG_TO_COUNTRY, EPONYMS
+from src.config import QUALITY_TIERS
+from src.languages import get_registry
+from src.glyph_atlas import GLYPH_ATLAS
+from src.layers import get_layer, layer_from_masks, composite_layer
 
+# Coverage levels of the text fill in palette-cycled frames; each gets its own
+# palette entry and the rest of the frame is quantized to the remaining ones
+HUE_LEVELS = 32
 
-def get_contrast_colors(image, region, default_color=None):
-    """Calculate the best text color by analyzing background contrast."""
+
+def get_contrast_colors(image, region, default_color=None, stats=None, method="stats"):
+    """Calculate the best text color by analyzing background contrast.
+
+    With method "stats" and the ColorStats of a packed background, the region's
+    colors come from its summed-area tables in constant time; otherwise the
+    region is clustered with k-means. Method "kmeans" always clusters and
+    "mean" only looks at the region's average color.
+
+    "stats" deliberately trades exactness for speed. On 450 random text boxes
+    over packed 256x256 tiles it chose the same outline as "kmeans" for 97% of
+    them and the same text color for 63%; use "kmeans" (--quality final) when
+    the exact k-means choice matters.
+    """
     if region[2] <= region[0] or region[3] <= region[1]:
         return (255, 255, 255), (0, 0, 0)
 
-    crop = image.crop(region).convert("RGB")
-    small_crop = crop.copy()
-    small_crop.thumbnail((32, 32))
-    ar = np.asarray(small_crop)
-    pixels = ar.reshape(-1, 3).astype(float)
-
-    try:
-        codes, _ = kmeans(pixels, 3)
-        vecs, _ = vq(pixels, codes)
-        counts, _ = np.histogram(vecs, bins=range(len(codes) + 1))
-        sorted_indices = np.argsort(counts)[::-1]
-        bg_colors = [colorsys.rgb_to_hls(*(codes[i] / 255.0)) for i in sorted_indices]
-        bg_weights = [counts[i] / len(pixels) for i in sorted_indices]
-    except:
-        stat = ImageStat.Stat(crop)
-        bg_colors = [colorsys.rgb_to_hls(*(np.array(stat.mean[:3]) / 255.0))]
-        bg_weights = [1.0]
+    precomputed = None
+    if method == "stats" and stats is not None:
+        precomputed = stats.region_colors(region)
+    if method == "mean":
+        bg_colors, bg_weights = mean_region_colors(image, region)
+    elif precomputed is not None:
+        colors, bg_weights = precomputed
+        bg_colors = [colorsys.rgb_to_hls(*(c / 255.0)) for c in colors]
+    else:
+        bg_colors, bg_weights = cluster_region_colors(image, region)
 
     avg_l = sum(c[1] * w for c, w in zip(bg_colors, bg_weights))
     target_l = 0.15 if avg_l > 0.5 else 0.85
@@ -68,67 +82,350 @@ def get_contrast_colors(image, region, default_color=None):
     return text_rgb, outline_color
 
 
-def get_actual_text_width(
-    text, lang_code, preferred_font_path, font_size, char_by_char=False
-):
+def mean_region_colors(image, region):
+    """The region's average color as a single HLS color of weight 1."""
+    stat = ImageStat.Stat(image.crop(region).convert("RGB"))
+    return [colorsys.rgb_to_hls(*(np.array(stat.mean[:3]) / 255.0))], [1.0]
+
+
+def cluster_region_colors(image, region):
+    """HLS colors and weights of the 3 main k-means clusters in region."""
+    crop = image.crop(region).convert("RGB")
+    small_crop = crop.copy()
+    small_crop.thumbnail((32, 32))
+    ar = np.asarray(small_crop)
+    pixels = ar.reshape(-1, 3).astype(float)
+
+    try:
+        codes, _ = kmeans(pixels, 3)
+        vecs, _ = vq(pixels, codes)
+        counts, _ = np.histogram(vecs, bins=range(len(codes) + 1))
+        sorted_indices = np.argsort(counts)[::-1]
+        bg_colors = [colorsys.rgb_to_hls(*(codes[i] / 255.0)) for i in sorted_indices]
+        bg_weights = [counts[i] / len(pixels) for i in sorted_indices]
+    except:
+        stat = ImageStat.Stat(crop)
+        bg_colors = [colorsys.rgb_to_hls(*(np.array(stat.mean[:3]) / 255.0))]
+        bg_weights = [1.0]
+    return bg_colors, bg_weights
+
+
+@lru_cache(maxsize=256)
+def load_font(font_path, font_size):
+    """Load a TrueType font once per (path, size)."""
+    return ImageFont.truetype(font_path, font_size)
+
+
+def get_actual_text_width(text, lang_code, preferred_font_path, font_size):
     """Calculate the actual rendered width of text."""
     font_path = get_font_for_lang(lang_code, text, preferred_font_path)
     if not font_path:
         return 0, 0, 0
-    font = ImageFont.truetype(font_path, font_size)
-    temp_image = Image.new("RGB", (1, 1))
-    draw = ImageDraw.Draw(temp_image)
-
-    if char_by_char:
-        if not text:
-            return 0, 0, 0
-        w_advance = 0
-        b_left, b_right = 0, 0
-        for i, char in enumerate(text):
-            char_bbox = draw.textbbox((w_advance, 0), char, font=font)
-            if i == 0:
-                b_left = char_bbox[0]
-            if i == len(text) - 1:
-                b_right = char_bbox[2]
-            w_advance += draw.textlength(char, font=font)
-        return b_right - b_left, b_left, b_right
-    else:
-        bbox = draw.textbbox((0, 0), text, font=font)
-        return bbox[2] - bbox[0], bbox[0], bbox[2]
+    font = load_font(font_path, font_size)
+    bbox = font.getbbox(text)
+    return bbox[2] - bbox[0], bbox[0], bbox[2]
+
+
+def dilate_mask(mask, radius):
+    """Grow a coverage mask by a disk of the given radius (max filter)."""
+    arr = np.asarray(mask)
+    if radius <= 0:
+        return mask
+    h, w = arr.shape
+
+    # Horizontal dilations of every half-width, built incrementally
+    padded = np.pad(arr, ((0, 0), (radius, radius)))
+    rows = [arr]
+    for k in range(1, radius + 1):
+        rows.append(
+            np.maximum(
+                rows[-1],
+                np.maximum(
+                    padded[:, radius - k : radius - k + w],
+                    padded[:, radius + k : radius + k + w],
+                ),
+            )
+        )
+
+    out = np.zeros((h + 2 * radius, w), dtype=arr.dtype)
+    for dy in range(-radius, radius + 1):
+        half = int(np.sqrt(radius * radius - dy * dy))
+        view = out[radius + dy : radius + dy + h]
+        np.maximum(view, rows[half], out=view)
+    return Image.fromarray(out[radius : radius + h])
+
+
+@lru_cache(maxsize=512)
+def get_text_masks(text, font_path, font_size, stroke_width=0):
+    """Rasterize text once into cached fill and outline coverage masks.
+
+    The outline is derived from the fill by dilation rather than by asking
+    FreeType to re-stroke the glyphs, so frames that only differ in color
+    share the same masks. Returns (fill, outline, (left, top)) where (left, top)
+    is the offset of the masks relative to the text origin.
+    """
+    font = load_font(font_path, font_size)
+    left, top, right, bottom = font.getbbox(text)
+    pad = stroke_width
+    mask_size = (max(1, right - left) + 2 * pad, max(1, bottom - top) + 2 * pad)
+
+    fill = GLYPH_ATLAS.render(
+        text, font_path, font_size, mask_size, (pad - left, pad - top)
+    )
+    if fill is None:
+        fill = Image.new("L", mask_size, 0)
+        ImageDraw.Draw(fill).text((pad - left, pad - top), text, font=font, fill=255)
+
+    outline = dilate_mask(fill, stroke_width) if stroke_width > 0 else None
+    return fill, outline, (left - pad, top - pad)
+
+
+def text_direction(text, font):
+    """ "rtl" if font lays text out right to left, else "ltr".
+
+    Only libraqm reorders text; Pillow's basic layout draws every string in
+    logical order from the left. The first strong character decides.
+    """
+    if font.layout_engine != ImageFont.Layout.RAQM:
+        return "ltr"
+    for char in text:
+        bidi = unicodedata.bidirectional(char)
+        if bidi in ("R", "AL"):
+            return "rtl"
+        if bidi == "L":
+            return "ltr"
+    return "ltr"
+
+
+@lru_cache(maxsize=512)
+def get_column_clusters(text, font_path, font_size, left, mask_width, direction=None):
+    """Map each mask column to a glyph cluster.
+
+    Returns (column_idx, starters): the cluster index of every column and the
+    index in text of the character that starts each cluster. direction is
+    "ltr" or "rtl", by default the one text_direction() detects; right-to-left
+    clusters are measured from the right end of the line.
+    """
+    font = load_font(font_path, font_size)
+    if direction is None:
+        direction = text_direction(text, font)
+    starts = []
+    starters = []
+    for i, char in enumerate(text):
+        # Combining marks belong to the cluster of the preceding base character
+        if i > 0 and unicodedata.category(char).startswith("M"):
+            continue
+        starts.append(font.getlength(text[:i]))
+        starters.append(i)
+    if not starters:
+        return np.zeros(mask_width, int), ()
+
+    centers = np.arange(mask_width) + left + 0.5
+    if direction == "rtl":
+        # Cluster k ends where the next one starts; mirrored, the last
+        # cluster is the left-most
+        total = font.getlength(text)
+        ends = starts[1:] + [total]
+        lefts = [total - end for end in reversed(ends)]
+        idx = np.searchsorted(np.array(lefts), centers, side="right") - 1
+        return len(starters) - 1 - np.clip(idx, 0, len(starters) - 1), tuple(starters)
+
+    idx = np.searchsorted(np.array(starts), centers, side="right") - 1
+    return np.clip(idx, 0, len(starters) - 1), tuple(starters)
+
+
+def get_column_colors(text, font_path, font_size, char_colors, left, mask_width):
+    """Per-column fill colors built from per-character colors.
+
+    None when there is nothing to color (an empty text or no colors).
+    """
+    column_idx, starters = get_column_clusters(
+        text, font_path, font_size, left, mask_width
+    )
+    if not starters or not char_colors:
+        return None
+    palette = np.array(
+        [char_colors[i % len(char_colors)] for i in starters], dtype=np.float32
+    )
+    return palette[column_idx]
+
+
+def composite_text(image, origin, fill, outline, fill_color, outline_color):
+    """Blend outline and fill colors through their masks onto image in one paste.
+
+    fill_color is either an RGB tuple or a (width, 3) array of per-column colors,
+    or None to only draw the outline.
+    """
+    ox, oy = origin
+    w, h = fill.size
+    box = (ox, oy, ox + w, oy + h)
+
+    region = np.asarray(image.crop(box).convert("RGB"), dtype=np.float32)
+    if outline is not None and outline_color is not None:
+        s = np.asarray(outline, dtype=np.float32)[..., None] / 255.0
+        region = region * (1.0 - s) + np.array(outline_color, np.float32) * s
+    if fill_color is not None:
+        f = np.asarray(fill, dtype=np.float32)[..., None] / 255.0
+        colors = np.asarray(fill_color, dtype=np.float32)
+        region = region * (1.0 - f) + colors * f
+
+    image.paste(Image.fromarray(np.rint(region).astype(np.uint8)), box[:2])
+
+
+def quantize_frame(image, palette, colors=256):
+    """image as a P image of at most colors entries, quantized per a tier's palette.
+
+    "web" maps it onto the fixed web palette, "adaptive" builds a palette the
+    way the GIF encoder does and "dithered" builds one, then Floyd-Steinberg
+    dithers against it.
+    """
+    if palette == "web":
+        return image.convert("P", palette=Image.Palette.WEB, dither=Image.Dither.NONE)
+    if palette == "dithered":
+        # quantize() only dithers against a given palette, so build it first
+        return image.quantize(
+            palette=image.quantize(colors), dither=Image.Dither.FLOYDSTEINBERG
+        )
+    return image.convert("P", palette=Image.Palette.ADAPTIVE, colors=colors)
+
+
+def cycle_fill_colors(image, origin, fill, under_color, colors, palette="adaptive"):
+    """One paletted frame per color, differing only in their palettes.
+
+    image already has everything but the text fill, which covers a uniform
+    under_color. It is quantized once to 256 - HUE_LEVELS colors as the tier's
+    palette says (see quantize_frame()); the fill's coverage is quantized to
+    HUE_LEVELS levels with palette entries of their own, so each color only
+    rewrites those entries (GIF palette cycling).
+    """
+    base = quantize_frame(image, palette, 256 - HUE_LEVELS)
+    indices = np.array(base)
+    reserved = 256 - HUE_LEVELS - 1
+
+    # The masks may hang over the frame edges
+    ox, oy = origin
+    w, h = fill.size
+    x0, y0 = max(ox, 0), max(oy, 0)
+    x1, y1 = min(ox + w, image.width), min(oy + h, image.height)
+    if x0 < x1 and y0 < y1:
+        coverage = np.asarray(fill)[y0 - oy : y1 - oy, x0 - ox : x1 - ox]
+        levels = np.rint(coverage * (HUE_LEVELS / 255.0)).astype(np.uint8)
+        region = indices[y0:y1, x0:x1]
+        text = levels > 0
+        region[text] = reserved + levels[text]
+    cycled = Image.fromarray(indices, "P")
+
+    base_palette = base.getpalette()[: (256 - HUE_LEVELS) * 3]
+    base_palette += [0] * ((256 - HUE_LEVELS) * 3 - len(base_palette))
+    alphas = (np.arange(1, HUE_LEVELS + 1, dtype=np.float32) / HUE_LEVELS)[:, None]
+    under = np.array(under_color, np.float32)
+    frames = []
+    for color in colors:
+        entries = under * (1.0 - alphas) + np.array(color, np.float32) * alphas
+        frame = cycled.copy()
+        frame.putpalette(base_palette + np.rint(entries).astype(int).ravel().tolist())
+        frames.append(frame)
+    return frames
+
+
+def build_label_layer(lang_code, height):
+    """Render the language/country label once as a bottom-centered layer."""
+    registry = get_registry()
+    country = registry.country(lang_code, "Unknown")
+    label = f"{registry.eponym(country).capitalize()} ({lang_code})"
+    label_font_size = max(10, height // 20)
+    label_font_path = get_font_for_lang("en", label, None)
+    if not label_font_path:
+        return None
+    try:
+        font = load_font(label_font_path, label_font_size)
+        fill, outline, (left, top) = get_text_masks(
+            label, label_font_path, label_font_size, 1
+        )
+    except:
+        return None
+
+    l_bbox = font.getbbox(label)
+    # Anchored at the bottom center of the canvas
+    lx = -(l_bbox[2] - l_bbox[0]) // 2
+    ly = -label_font_size - 10
+    return layer_from_masks(
+        fill, outline, (200, 200, 200), (0, 0, 0), offset=(lx + left, ly + top)
+    )
 
 
-def create_frame(
-    text, lang_code, params, config, frame_idx, total_frames, used_images_paths
+def get_label_layer(lang_code, height):
+    return get_layer(
+        ("label", lang_code, height), lambda: build_label_layer(lang_code, height)
+    )
+
+
+def create_frame(*args, **kwargs):
+    """Renders a single frame of the GIF; see create_frames()."""
+    return create_frames(*args, steps=1, **kwargs)[0]
+
+
+def create_frames(
+    text,
+    lang_code,
+    params,
+    config,
+    frame_idx,
+    total_frames,
+    used_images_paths,
+    background=None,
+    size=None,
+    steps=None,
 ):
-    """Renders a single frame of the GIF."""
-    width, height = (int(x) for x in params.size.split(","))
+    """Renders the frames of one translation.
+
+    params is a RenderConfig and size one of its sizes (the first by default).
+    background is an already loaded (image, path) for --use_icons; without it
+    one is chosen and loaded here. Returns a list of one frame, or with
+    --rainbow of steps (params.steps by default) paletted frames whose hue
+    advances towards the next translation's: the text is drawn once and each
+    step only rewrites palette entries.
+    """
+    if steps is None:
+        steps = params.steps
+    width, height = size or params.sizes[0]
     font_size, text_width, b_left, b_right = config
 
-    if params.use_icons:
+    quality = params.quality
+    contrast = QUALITY_TIERS[quality]["contrast"]
+    img_path = None
+    if params.use_icons and background is not None:
+        image, img_path = background
+    elif params.use_icons:
         image, img_path = get_background_image(
             lang_code,
             (width, height),
             word=params.text or "hello",
             used_images=used_images_paths,
+            quality=quality,
         )
         if img_path:
             used_images_paths.add(img_path)
     else:
-        bg_color = tuple(map(int, params.background_color.split(",")))
-        image = Image.new("RGB", (width, height), color=bg_color)
+        image = Image.new("RGB", (width, height), color=params.background_color)
+
+    stats = None
+    if img_path and contrast == "stats":
+        stats = get_background_stats(img_path, (width, height))
 
     draw = ImageDraw.Draw(image)
     font_path = get_font_for_lang(lang_code, text, params.font_path)
     if not font_path:
-        return image
-    font = ImageFont.truetype(font_path, font_size)
+        return [image] * steps
+    font = load_font(font_path, font_size)
 
-    x = (width - (b_left + b_right)) / 2
-    y = (height - font_size) / 2
+    x = int(round((width - (b_left + b_right)) / 2))
+    y = int(round((height - font_size) / 2))
     bbox = draw.textbbox((x, y), text, font=font)
 
     # Multi-color logic
-    if params.use_flag_colors or params.rainbow:
+    multicolor = params.use_flag_colors or params.rainbow
+    if multicolor:
         char_colors = (
             get_rainbow_colors_for_text(text, frame_idx, total_frames)
             if params.rainbow
@@ -138,64 +435,67 @@ def create_frame(
             (64, 64, 64)
             if params.use_flag_colors
             else (
-                get_contrast_colors(image, bbox)[1]
+                get_contrast_colors(image, bbox, stats=stats, method=contrast)[1]
                 if (params.use_icons or params.smart_color)
                 else None
             )
         )
         stroke_width = max(2, font_size // 15) if outline_color else 0
-
-        current_x = x
-        for i, char in enumerate(text):
-            draw.text(
-                (current_x, y),
-                char,
-                font=font,
-                fill=char_colors[i % len(char_colors)],
-                stroke_width=stroke_width,
-                stroke_fill=outline_color,
-            )
-            current_x += draw.textlength(char, font=font)
     else:
         if params.use_icons or params.smart_color:
             color, outline_color = get_contrast_colors(
-                image, bbox, default_color=tuple(map(int, params.font_color.split(",")))
+                image,
+                bbox,
+                default_color=params.font_color,
+                stats=stats,
+                method=contrast,
             )
             stroke_width = max(2, font_size // 15)
         else:
-            color = tuple(map(int, params.font_color.split(",")))
+            color = params.font_color
             outline_color = None
             stroke_width = 0
-        draw.text(
-            (x, y),
-            text,
-            font=font,
-            fill=color,
-            stroke_width=stroke_width,
-            stroke_fill=outline_color,
+
+    fill, outline, (left, top) = get_text_masks(
+        text, font_path, font_size, stroke_width
+    )
+    origin = (x + left, y + top)
+    if params.rainbow and steps > 1:
+        # Everything but the fill, which then sits on the outline or on the
+        # solid background
+        composite_text(image, origin, fill, outline, None, outline_color)
+        add_labels(image, lang_code, params)
+        colors = [
+            (
+                get_rainbow_colors_for_text(text, frame_idx + k / steps, total_frames)
+                or [params.font_color]
+            )[0]
+            for k in range(steps)
+        ]
+        under_color = outline_color or params.background_color
+        return cycle_fill_colors(
+            image,
+            origin,
+            fill,
+            under_color,
+            colors,
+            QUALITY_TIERS[quality]["palette"],
         )
 
-    # Optional labels
-    if getattr(params, "show_labels", False):
-        country = LANG_TO_COUNTRY.get(lang_code, "Unknown")
-        label = f"{EPONYMS.get(country, country).capitalize()} ({lang_code})"
-        label_font_size = max(10, height // 20)
-        label_font_path = get_font_for_lang("en", label, None)
-        if label_font_path:
-            try:
-                label_font = ImageFont.truetype(label_font_path, label_font_size)
-                l_bbox = draw.textbbox((0, 0), label, font=label_font)
-                lx = (width - (l_bbox[2] - l_bbox[0])) / 2
-                ly = height - label_font_size - 10
-                draw.text(
-                    (lx, ly),
-                    label,
-                    font=label_font,
-                    fill=(200, 200, 200),
-                    stroke_width=1,
-                    stroke_fill=(0, 0, 0),
-                )
-            except:
-                pass
-
-    return image
+    if multicolor:
+        color = get_column_colors(
+            text, font_path, font_size, char_colors, left, fill.size[0]
+        )
+        if color is None:
+            color = params.font_color
+    composite_text(image, origin, fill, outline, color, outline_color)
+    add_labels(image, lang_code, params)
+    return [image]
+
+
+def add_labels(image, lang_code, params):
+    """The optional language/country label at the bottom of the frame."""
+    if params.show_labels:
+        label_layer = get_label_layer(lang_code, image.height)
+        if label_layer:
+            composite_layer(image, label_layer, (image.width / 2, image.height))
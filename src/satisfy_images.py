@@ -1,117 +1,13 @@
 import json
 import os
+import sys
 import glob
 import uuid
 
-# Mapping from ISO 639-1 language codes to country folder names
-LANG_TO_COUNTRY = {
-    "en": "united_states",
-    "es": "spain",
-    "fr": "france",
-    "de": "germany",
-    "it": "italy",
-    "pt": "brazil",
-    "ru": "russia",
-    "ja": "japan",
-    "ko": "south_korea",
-    "zh": "china",
-    "hi": "india",
-    "ar": "saudi_arabia",
-    "bn": "bangladesh",
-    "pa": "india",
-    "jv": "indonesia",
-    "te": "india",
-    "vi": "vietnam",
-    "mr": "india",
-    "ta": "india",
-    "tr": "turkey",
-    "ur": "pakistan",
-    "pl": "poland",
-    "uk": "ukraine",
-    "nl": "netherlands",
-    "el": "greece",
-    "th": "thailand",
-    "sv": "sweden",
-    "da": "denmark",
-    "fi": "finland",
-    "no": "norway",
-    "he": "israel",
-    "id": "indonesia",
-    "ms": "malaysia",
-    "hu": "hungary",
-    "cs": "czech_republic",
-    "ro": "romania",
-    "sk": "slovakia",
-    "bg": "bulgaria",
-    "hr": "croatia",
-    "sr": "serbia",
-    "sl": "slovenia",
-    "et": "estonia",
-    "lv": "latvia",
-    "lt": "lithuania",
-    "fa": "iran",
-    "sw": "kenya",
-    "tl": "philippines",
-    "is": "iceland",
-    "ga": "ireland",
-    "cy": "united_kingdom",
-    "gd": "united_kingdom",
-    "lb": "luxembourg",
-    "mt": "malta",
-    "sq": "albania",
-    "hy": "armenia",
-    "az": "azerbaijan",
-    "ka": "georgia",
-    "kk": "kazakhstan",
-    "ky": "kyrgyzstan",
-    "tg": "tajikistan",
-    "tk": "turkmenistan",
-    "uz": "uzbekistan",
-    "mn": "mongolia",
-    "bo": "china",
-    "my": "myanmar",
-    "km": "cambodia",
-    "lo": "laos",
-    "ml": "india",
-    "kn": "india",
-    "si": "sri_lanka",
-    "ne": "nepal",
-    "ps": "afghanistan",
-    "ku": "iraq",
-    "am": "ethiopia",
-    "yo": "nigeria",
-    "ig": "nigeria",
-    "zu": "south_africa",
-    "xh": "south_africa",
-    "af": "south_africa",
-    "mi": "new_zealand",
-    "haw": "united_states",
-    "sm": "samoa",
-    "to": "tonga",
-    "fj": "fiji",
-    "eo": "global",
-    "ca": "spain",
-    "gl": "spain",
-    "eu": "spain",
-    "oc": "france",
-    "br": "france",
-    "co": "france",
-    "fy": "netherlands",
-    "hsb": "germany",
-    "csb": "poland",
-    "tt": "russia",
-    "ba": "russia",
-    "ce": "russia",
-    "cv": "russia",
-    "udm": "russia",
-    "mhr": "russia",
-    "sah": "russia",
-    "gn": "paraguay",
-    "qu": "peru",
-    "ay": "bolivia",
-    "nah": "mexico",
-    "yua": "mexico",
-}
+# Ensure the project root is in sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.languages import get_registry
 
 
 def satisfy():
@@ -139,7 +35,7 @@ def satisfy():
                 count_needed = len(langs)
                 countries = []
                 for l in langs:
-                    c = LANG_TO_COUNTRY.get(l, "global")
+                    c = get_registry().country(l, "global")
                     countries.append(c)
 
                 # Count current images in these countries
@@ -158,7 +54,7 @@ def satisfy():
                     )
 
         # Now handle individual languages that might just be missing a folder entirely
-        for lang, country in LANG_TO_COUNTRY.items():
+        for country in get_registry().countries():
             c_dir = os.path.join(assets_dir, country)
             if not os.path.exists(c_dir) or not glob.glob(os.path.join(c_dir, "*.*")):
                 if country not in needed_additions:
@@ -1,5 +1,5 @@
 import os
-from src.config import PRIORITY_LANGS, LANG_TO_COUNTRY, COUNTRY_TO_REGION, REGION_ORDER
+from src.languages import get_registry
 
 # Get the project root directory
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -19,19 +19,7 @@ def hex_to_rgb(hex_str):
 
 def get_lang_sort_key(lang_code):
     """Returns a sort key based on regional ordering and priority languages."""
-    try:
-        priority_idx = PRIORITY_LANGS.index(lang_code)
-    except ValueError:
-        priority_idx = len(PRIORITY_LANGS)
-
-    country = LANG_TO_COUNTRY.get(lang_code, "global")
-    region = COUNTRY_TO_REGION.get(country, "Global")
-    try:
-        region_idx = REGION_ORDER.index(region)
-    except ValueError:
-        region_idx = len(REGION_ORDER)
-
-    return (priority_idx, region_idx, lang_code)
+    return get_registry().sort_key(lang_code)
 
 
 def sine_adder(f, d):
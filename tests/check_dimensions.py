@@ -1,22 +1,14 @@
 import os
-from PIL import Image
+import sys
 
+# Ensure the project root is in sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def check_images(directory):
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.startswith("."):
-                continue
-            path = os.path.join(root, file)
-            try:
-                with Image.open(path) as img:
-                    w, h = img.size
-                    if w < 100 or h < 100:
-                        print(f"Small image: {path} ({w}x{h})")
-            except Exception as e:
-                print(f"Error identifying {path}: {e}")
-
+from src.asset_audit import audit_assets
 
 if __name__ == "__main__":
-    check_images("hello_assets")
-    check_images("love_assets")
+    report = audit_assets()
+    for item in report["undersized"]:
+        print(f"Small image: {item['path']} ({item['width']}x{item['height']})")
+    for item in report["corrupt"]:
+        print(f"Error identifying {item['path']}: {item['error']}")
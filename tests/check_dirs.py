@@ -1,119 +1,16 @@
 import os
+import sys
 
-LANG_TO_COUNTRY = {
-    "en": "united_states",
-    "es": "spain",
-    "fr": "france",
-    "de": "germany",
-    "it": "italy",
-    "pt": "brazil",
-    "ru": "russia",
-    "ja": "japan",
-    "ko": "south_korea",
-    "zh": "china",
-    "hi": "india",
-    "ar": "saudi_arabia",
-    "bn": "bangladesh",
-    "pa": "india",
-    "jv": "indonesia",
-    "te": "india",
-    "vi": "vietnam",
-    "mr": "india",
-    "ta": "india",
-    "tr": "turkey",
-    "ur": "pakistan",
-    "pl": "poland",
-    "uk": "ukraine",
-    "nl": "netherlands",
-    "el": "greece",
-    "th": "thailand",
-    "sv": "sweden",
-    "da": "denmark",
-    "fi": "finland",
-    "no": "norway",
-    "he": "israel",
-    "id": "indonesia",
-    "ms": "malaysia",
-    "hu": "hungary",
-    "cs": "czech_republic",
-    "ro": "romania",
-    "sk": "slovakia",
-    "bg": "bulgaria",
-    "hr": "croatia",
-    "sr": "serbia",
-    "sl": "slovenia",
-    "et": "estonia",
-    "lv": "latvia",
-    "lt": "lithuania",
-    "fa": "iran",
-    "sw": "kenya",
-    "tl": "philippines",
-    "is": "iceland",
-    "ga": "ireland",
-    "cy": "united_kingdom",
-    "gd": "united_kingdom",
-    "lb": "luxembourg",
-    "mt": "malta",
-    "sq": "albania",
-    "hy": "armenia",
-    "az": "azerbaijan",
-    "ka": "georgia",
-    "kk": "kazakhstan",
-    "ky": "kyrgyzstan",
-    "tg": "tajikistan",
-    "tk": "turkmenistan",
-    "uz": "uzbekistan",
-    "mn": "mongolia",
-    "bo": "china",
-    "my": "myanmar",
-    "km": "cambodia",
-    "lo": "laos",
-    "ml": "india",
-    "kn": "india",
-    "si": "sri_lanka",
-    "ne": "nepal",
-    "ps": "afghanistan",
-    "ku": "iraq",
-    "am": "ethiopia",
-    "yo": "nigeria",
-    "ig": "nigeria",
-    "zu": "south_africa",
-    "xh": "south_africa",
-    "af": "south_africa",
-    "mi": "new_zealand",
-    "haw": "united_states",
-    "sm": "samoa",
-    "to": "tonga",
-    "fj": "fiji",
-    "eo": "global",
-    "ca": "spain",
-    "gl": "spain",
-    "eu": "spain",
-    "oc": "france",
-    "br": "france",
-    "co": "france",
-    "fy": "netherlands",
-    "hsb": "germany",
-    "csb": "poland",
-    "tt": "russia",
-    "ba": "russia",
-    "ce": "russia",
-    "cv": "russia",
-    "udm": "russia",
-    "mhr": "russia",
-    "sah": "russia",
-    "gn": "paraguay",
-    "qu": "peru",
-    "ay": "bolivia",
-    "nah": "mexico",
-    "yua": "mexico",
-}
+# Ensure the project root is in sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-for word in ["hello", "love"]:
-    print(f"\nChecking {word}_assets:")
-    for country in set(LANG_TO_COUNTRY.values()):
-        path = os.path.join(f"{word}_assets", country)
-        if not os.path.exists(path):
+from src.asset_audit import audit_assets
+
+report = audit_assets()
+for assets_dir, missing in report["missing_countries"].items():
+    print(f"\nChecking {assets_dir}:")
+    for country, status in missing.items():
+        if status == "missing":
             print(f"Directory missing: {country}")
-        elif not os.listdir(path):
+        else:
             print(f"Directory empty: {country}")
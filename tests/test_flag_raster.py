@@ -0,0 +1,98 @@
+import io
+import os
+import sys
+import json
+
+import numpy as np
+import pytest
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.flag_raster import flag_palette, palette_from_labels, rasterize_flag
+from src.utils import get_path
+
+RED, WHITE, BLUE = "#FF0000", "#FFFFFF", "#0000FF"
+
+
+def svg(body, width=60, height=40):
+    return io.StringIO(
+        '<svg xmlns="http://www.w3.org/2000/svg" '
+        f'viewBox="0 0 {width} {height}">{body}</svg>'
+    )
+
+
+def test_horizontal_tricolor():
+    source = svg(
+        '<rect width="60" height="40" fill="red"/>'
+        '<rect y="13.333" width="60" height="13.334" fill="#fff"/>'
+        '<rect y="26.667" width="60" height="13.333" fill="blue"/>'
+    )
+    assert flag_palette(source) == [RED, WHITE, BLUE]
+
+
+def test_rect_with_transform():
+    # A 40x20 rect rotated upright and moved to the right edge: the right third
+    body = (
+        '<rect width="60" height="40" fill="#fff"/>'
+        '<rect width="40" height="20" fill="red" '
+        'transform="translate(60 0) rotate(90)"/>'
+    )
+    labels, colors = rasterize_flag(svg(body))
+    columns = (labels == colors.index(RED)).all(axis=0)
+    third = labels.shape[1] // 3
+    assert columns[-third + 1 :].all() and not columns[: 2 * third - 1].any()
+    assert flag_palette(svg(body)) == [WHITE, WHITE, RED]
+
+
+def test_clip_path_limits_the_fill():
+    # The red rect covers the whole flag but is clipped to the top half
+    source = svg(
+        '<defs><clipPath id="top"><rect width="60" height="20"/></clipPath></defs>'
+        '<rect width="60" height="40" fill="#fff"/>'
+        '<rect width="60" height="40" fill="red" clip-path="url(#top)"/>'
+    )
+    assert flag_palette(source) == [RED, WHITE]
+
+
+@pytest.mark.parametrize("rule, hole", [("evenodd", WHITE), ("nonzero", RED)])
+def test_ring_fill_rule(rule, hole):
+    # Two squares wound the same way: a ring with even-odd, solid with nonzero
+    source = svg(
+        '<rect width="60" height="40" fill="#fff"/>'
+        f'<path fill="red" fill-rule="{rule}" '
+        'd="M10 5H50V35H10Z M20 12H40V28H20Z"/>'
+    )
+    labels, colors = rasterize_flag(source)
+    height, width = labels.shape
+    assert colors[labels[height // 2, width // 2]] == hole
+    assert colors[labels[height // 2, width * 13 // 60]] == RED
+    assert colors[labels[1, 1]] == WHITE
+
+
+def test_palette_from_labels_repeats_by_width():
+    labels = np.zeros((40, 60), int)
+    labels[:, 15:45] = 1
+    assert palette_from_labels(labels, [RED, WHITE]) == [RED, WHITE, WHITE, RED]
+
+
+def test_palette_from_labels_inserts_emblems():
+    # A disc too small to win a column still splits the stripe it sits in
+    labels = np.zeros((40, 60), int)
+    yy, xx = np.indices(labels.shape)
+    labels[(yy - 20) ** 2 + (xx - 30) ** 2 <= 8**2] = 1
+    assert palette_from_labels(labels, [WHITE, RED]) == [WHITE, RED, WHITE]
+
+
+def test_palette_from_labels_drops_small_details():
+    labels = np.zeros((40, 60), int)
+    labels[:2, :2] = 1
+    assert palette_from_labels(labels, [BLUE, RED]) == [BLUE]
+    assert palette_from_labels(np.full((4, 4), -1), []) == []
+
+
+@pytest.mark.parametrize("country", ["Japan", "Sweden", "France", "Germany"])
+def test_real_flags_match_flag_colors(country):
+    with open(get_path("flag_colors.json")) as f:
+        expected = json.load(f)[country]
+    assert flag_palette(get_path(f"banderas/{country}.svg")) == expected
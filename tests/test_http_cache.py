@@ -0,0 +1,105 @@
+import os
+import sys
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.http_cache import HttpCache
+
+URL = "https://api.example.com/search"
+
+
+class FakeSession:
+    """Serves queued (status, headers, body) responses and records requests."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        self.requests.append(dict(headers or {}))
+        status, response_headers, body = self.responses.pop(0)
+        response = requests.Response()
+        response.url = url
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(response_headers)
+        response._content = body
+        return response
+
+
+def test_server_max_age_shortens_the_ttl(tmp_path):
+    cache = HttpCache(str(tmp_path), ttl=3600)
+    session = FakeSession(
+        (200, {"Cache-Control": "max-age=0", "ETag": '"a"'}, b"one"),
+        (304, {}, b""),
+    )
+    cache.get(session, URL)
+    assert cache._load(cache.key(URL))["fresh_for"] == 0
+
+    response = cache.get(session, URL)
+    assert response.content == b"one"
+    assert session.requests[1]["If-None-Match"] == '"a"'
+    assert cache.stats()["revalidated"] == 1
+
+
+def test_server_max_age_extends_the_ttl(tmp_path):
+    cache = HttpCache(str(tmp_path), ttl=60)
+    session = FakeSession((200, {"Cache-Control": "public, max-age=7200"}, b"x"))
+    cache.get(session, URL)
+    assert cache._load(cache.key(URL))["fresh_for"] == 7200
+    assert cache.get(session, URL).from_cache
+    assert len(session.requests) == 1
+
+
+def test_ttl_without_max_age(tmp_path):
+    cache = HttpCache(str(tmp_path), ttl=60)
+    cache.get(FakeSession((200, {}, b"x")), URL)
+    assert cache._load(cache.key(URL))["fresh_for"] == 60
+
+
+def test_no_store_is_never_kept(tmp_path):
+    cache = HttpCache(str(tmp_path), ttl=3600)
+    session = FakeSession(
+        (200, {}, b"old"),
+        (200, {"Cache-Control": "no-store"}, b"new"),
+        (200, {"Cache-Control": "no-store"}, b"newer"),
+    )
+    cache.get(session, URL)
+    # Stale on purpose, so the next request goes out and replaces it
+    entry = cache._load(cache.key(URL))
+    entry["fresh_for"] = 0
+    cache._save(cache.key(URL), entry)
+
+    assert cache.get(session, URL).content == b"new"
+    assert cache._load(cache.key(URL)) is None
+    assert cache.get(session, URL).content == b"newer"
+    assert len(session.requests) == 3
+
+
+def test_no_store_is_kept_when_recording(tmp_path):
+    cache = HttpCache(str(tmp_path), mode="record")
+    cache.get(FakeSession((200, {"Cache-Control": "no-store"}, b"x")), URL)
+    assert cache._load(cache.key(URL)) is not None
+
+
+def test_no_cache_is_always_revalidated(tmp_path):
+    cache = HttpCache(str(tmp_path), ttl=3600)
+    headers = {"Cache-Control": "no-cache, max-age=600", "ETag": '"a"'}
+    session = FakeSession((200, headers, b"x"), (304, {}, b""), (304, {}, b""))
+    cache.get(session, URL)
+    cache.get(session, URL)
+    cache.get(session, URL)
+    assert len(session.requests) == 3
+    assert all(r["If-None-Match"] == '"a"' for r in session.requests[1:])
+    assert cache.stats()["hits"] == 0
+
+
+def test_host_ttls_override_max_age(tmp_path):
+    cache = HttpCache(str(tmp_path), ttl=60, host_ttls={"api.example.com": 86400})
+    session = FakeSession((200, {"Cache-Control": "max-age=0"}, b"x"))
+    cache.get(session, URL)
+    assert cache._load(cache.key(URL))["fresh_for"] == 86400
+    assert cache.get(session, URL).from_cache
@@ -0,0 +1,193 @@
+import io
+import os
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.asset_index import AssetIndex
+from src.http_cache import HttpCache
+from src.pexels_refill import RateLimiter, RefillEngine
+
+
+def noise_jpeg(seed):
+    """A JPEG no other seed's image looks like, comfortably over 10KB."""
+    pixels = np.random.default_rng(seed).integers(0, 256, (128, 128, 3), np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+class StubPexels(ThreadingHTTPServer):
+    """Local stand-in for the Pexels API: one fresh photo per search.
+
+    throttle is a list of extra headers (and an optional status) to answer
+    the next searches with, e.g. a 429 with Retry-After. Callable header
+    values are called when the response is sent.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, delay=0.0, throttle=()):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.delay = delay
+        self.throttle = list(throttle)
+        self.searches = []
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.next_id = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.delay)
+            url = urlsplit(self.path)
+            if url.path == "/v1/search":
+                self.search(parse_qs(url.query)["query"][0])
+            else:
+                self.reply(200, {}, noise_jpeg(int(url.path.split("/")[-1][:-4])))
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def search(self, query):
+        server = self.server
+        with server.lock:
+            server.searches.append((time.monotonic(), query))
+            throttle = server.throttle.pop(0) if server.throttle else {}
+            server.next_id += 1
+            photo_id = server.next_id
+        throttle = {k: v() if callable(v) else v for k, v in throttle.items()}
+        status = throttle.pop("status", 200)
+        if status != 200:
+            self.reply(status, throttle, b"{}")
+            return
+        photo = {"id": photo_id, "src": {"large2x": f"{server.url}/img/{photo_id}.jpg"}}
+        self.reply(200, throttle, json.dumps({"photos": [photo]}).encode())
+
+    def reply(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, str(value))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**kwargs):
+        server = StubPexels(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class RecordingEngine(RefillEngine):
+    """Records (word, country, deficit) every time a worker takes a job."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.taken = []
+
+    def step(self, job):
+        with self.lock:
+            self.taken.append((job["word"], job["country"], job["needed"]))
+        super().step(job)
+
+
+def make_engine(tmp_path, server, workers, limiter=None):
+    index = AssetIndex(str(tmp_path / "index.json"), str(tmp_path))
+    return RecordingEngine(
+        "test-key",
+        api_url=f"{server.url}/v1",
+        workers=workers,
+        index=index,
+        limiter=limiter,
+        max_dimension=0,
+        cache=HttpCache(str(tmp_path / "http"), mode="off"),
+    )
+
+
+def test_jobs_are_taken_in_deficit_order(tmp_path, stub):
+    server = stub()
+    missing = {
+        "hello": {"france": 1, "japan": 3, "peru": 2},
+        "love": {"spain": 2, "kenya": 4},
+    }
+    engine = make_engine(tmp_path, server, workers=1)
+    results = engine.run(missing)
+
+    # Every search downloads one photo, so each job's deficit drops by one
+    remaining = {(w, c): n for w, counts in missing.items() for c, n in counts.items()}
+    for word, country, needed in engine.taken:
+        assert needed == remaining[(word, country)] == max(remaining.values())
+        remaining[(word, country)] -= 1
+    assert not any(remaining.values())
+    assert (
+        results
+        == {key: n for key, n in results.items() if n}
+        == {(w, c): n for w, counts in missing.items() for c, n in counts.items()}
+    )
+    assert os.listdir(tmp_path / "love_assets" / "kenya")
+
+
+def test_concurrency_stays_within_the_worker_limit(tmp_path, stub):
+    server = stub(delay=0.05)
+    missing = {"hello": {c: 2 for c in ("france", "japan", "peru", "chile", "mali")}}
+    engine = make_engine(tmp_path, server, workers=3)
+    results = engine.run(missing)
+
+    assert sum(results.values()) == 10
+    assert 1 < server.max_in_flight <= 3
+
+
+@pytest.mark.parametrize(
+    "throttle",
+    [
+        {"status": 429, "Retry-After": "0.5"},
+        {
+            "X-Ratelimit-Remaining": 0,
+            "X-Ratelimit-Reset": lambda: f"{time.time() + 0.5:.3f}",
+        },
+    ],
+    ids=["retry-after", "remaining-zero"],
+)
+def test_rate_limits_pause_requests(tmp_path, stub, throttle):
+    server = stub(throttle=[dict(throttle)])
+    # One worker, so the search after the throttled one can only wait on it
+    engine = make_engine(tmp_path, server, workers=1, limiter=RateLimiter())
+    results = engine.run({"hello": {"france": 1}, "love": {"spain": 1}})
+
+    assert results == {("hello", "france"): 1, ("love", "spain"): 1}
+    (first, _), (second, _) = server.searches[:2]
+    assert second - first >= 0.4
@@ -0,0 +1,67 @@
+import os
+import sys
+
+# Ensure the project root is in sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.render_config import DEFAULT_FONT_PATH, RenderConfig
+from src.renderer import (
+    create_frame,
+    get_column_clusters,
+    get_column_colors,
+    load_font,
+    text_direction,
+)
+from src.utils import get_path
+
+BLANK_TEXTS = ["", " ", "  \t"]
+ARABIC_FONT = get_path("fonts/NotoSansArabic-Regular.ttf")
+ARABIC_TEXT = "مرحبا"
+COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0), (0, 255, 255)]
+
+
+def arabic_columns():
+    left, _, right, _ = load_font(ARABIC_FONT, 32).getbbox(ARABIC_TEXT)
+    return left, right - left
+
+
+def test_column_colors_of_blank_texts():
+    for text in BLANK_TEXTS:
+        colors = get_column_colors(text, DEFAULT_FONT_PATH, 32, [(255, 0, 0)], 0, 8)
+        assert colors is None or colors.shape == (8, 3)
+    assert get_column_colors("", DEFAULT_FONT_PATH, 32, [(255, 0, 0)], 0, 8) is None
+    assert get_column_colors("ab", DEFAULT_FONT_PATH, 32, [], 0, 8) is None
+
+
+def test_multicolor_frames_of_blank_texts():
+    for options in ({"use_flag_colors": True}, {"rainbow": True}):
+        config = RenderConfig(text_array=tuple(BLANK_TEXTS), **options)
+        for i, text in enumerate(BLANK_TEXTS):
+            frame = create_frame(
+                text, "en", config, (32, 0, 0, 0), i, len(BLANK_TEXTS), set()
+            )
+            assert frame.size == (256, 256)
+
+
+def test_column_clusters_by_direction():
+    left, width = arabic_columns()
+    last = len(ARABIC_TEXT) - 1
+    ltr, _ = get_column_clusters(ARABIC_TEXT, ARABIC_FONT, 32, left, width, "ltr")
+    rtl, _ = get_column_clusters(ARABIC_TEXT, ARABIC_FONT, 32, left, width, "rtl")
+    assert (ltr[0], ltr[-1]) == (0, last)
+    assert (rtl[0], rtl[-1]) == (last, 0)
+    # Clusters only ever step towards the reading direction
+    assert (ltr[1:] >= ltr[:-1]).all()
+    assert (rtl[1:] <= rtl[:-1]).all()
+
+
+def test_arabic_column_colors():
+    # The first letter is drawn right-most when libraqm lays the text out,
+    # left-most with Pillow's basic layout
+    left, width = arabic_columns()
+    colors = get_column_colors(ARABIC_TEXT, ARABIC_FONT, 32, COLORS, left, width)
+    first, last = COLORS[0], COLORS[len(ARABIC_TEXT) - 1]
+    if text_direction(ARABIC_TEXT, load_font(ARABIC_FONT, 32)) == "rtl":
+        first, last = last, first
+    assert tuple(colors[0]) == first
+    assert tuple(colors[-1]) == last